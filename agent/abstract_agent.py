@@ -38,8 +38,14 @@
 #     _get_periodic_notif_handler(agent_id, controller_id, mtp_path,
 #                                 subscription_id, param_path) :: Abstract Method
 #   Class: BindingListener(threading.Thread)
-#     __init__(thread_name, binding, msg_handler, timeout=15)
+#     __init__(thread_name, binding, msg_handler, timeout=15, num_workers=1)
 #     run()
+#     process_request(payload, to_addr)
+#   Class: BindingWorker(threading.Thread)
+#     __init__(thread_name, request_handler_func)
+#     run()
+#     put(queue_item)
+#     stop()
 #   Class: AbstractPeriodicNotifHandler(threading.Thread)
 #     __init__(database, thread_name, from_id, to_id, subscription_id, param)
 #     run()
@@ -58,6 +64,7 @@
 
 
 import time
+import queue
 import logging
 import threading
 import importlib
@@ -71,6 +78,14 @@ from agent import request_handler
 
 GPIO_PIN = "gpio.pin"
 CAMERA_IMAGE_DIR = "camera.image.dir"
+DB_FSYNC_POLICY = "db.fsync.policy"
+DB_COMPACT_THRESHOLD = "db.compact.threshold"
+DB_STORAGE_ENGINE = "db.storage.engine"
+REQ_GET_RESP_CACHE = "request.get.resp.cache"
+REQ_NUM_WORKERS = "request.num.workers"
+BINDING_QUEUE_SIZE = "binding.queue.size"
+BINDING_QUEUE_HIGH_WATERMARK = "binding.queue.high.watermark"
+BINDING_QUEUE_LOW_WATERMARK = "binding.queue.low.watermark"
 
 # pylint: disable-msg=no-value-for-parameter
 INCOMING_REQ_SUMMARY_METRIC = \
@@ -101,12 +116,23 @@ class AbstractAgent:
         self._value_change_notif_poller = None
         self._logger = logging.getLogger(self.__class__.__name__)
 
-        self._db = agent_db.Database(dm_file, db_file, net_intf)
+        default_cfg = {DB_FSYNC_POLICY: "always", DB_COMPACT_THRESHOLD: "1000", DB_STORAGE_ENGINE: "dict",
+                       REQ_GET_RESP_CACHE: "false", REQ_NUM_WORKERS: "1", BINDING_QUEUE_SIZE: "1000",
+                       BINDING_QUEUE_HIGH_WATERMARK: "800", BINDING_QUEUE_LOW_WATERMARK: "500"}
+        cfg_mgr = utils.ConfigMgr(self._cfg_file_name, default_cfg)
+        self._db = agent_db.Database(dm_file, db_file, net_intf, cfg_mgr.get_cfg_item(DB_FSYNC_POLICY),
+                                     int(cfg_mgr.get_cfg_item(DB_COMPACT_THRESHOLD)),
+                                     cfg_mgr.get_cfg_item(DB_STORAGE_ENGINE))
         self._endpoint_id = self._db.get("Device.LocalAgent.EndpointID")
 
         self._load_services()
+        get_resp_cache = str(cfg_mgr.get_cfg_item(REQ_GET_RESP_CACHE)).lower() == "true"
+        self._num_request_workers = int(cfg_mgr.get_cfg_item(REQ_NUM_WORKERS))
+        self._binding_queue_size = int(cfg_mgr.get_cfg_item(BINDING_QUEUE_SIZE))
+        self._binding_queue_high_watermark = int(cfg_mgr.get_cfg_item(BINDING_QUEUE_HIGH_WATERMARK))
+        self._binding_queue_low_watermark = int(cfg_mgr.get_cfg_item(BINDING_QUEUE_LOW_WATERMARK))
         self._msg_handler = request_handler.UspRequestHandler(self._endpoint_id, self._db,
-                                                              self._service_map, debug)
+                                                              self._service_map, debug, get_resp_cache)
 
     def get_msg_handler(self):
         """Retrieve the Internal Message Handler"""
@@ -328,22 +354,45 @@ class AbstractAgent:
 
 
 class BindingListener(threading.Thread):
-    """Listen to a specific Binding for incoming Requests"""
-    def __init__(self, thread_name, binding, msg_handler, timeout=15):
+    """Listen to a specific Binding for incoming Requests
+        - With more than 1 worker, Requests are handled concurrently by a pool of BindingWorkers, where every
+           Request from the same source address goes to the same worker (preserving their order)"""
+    def __init__(self, thread_name, binding, msg_handler, timeout=15, num_workers=1):
         """Initialize the Binding Listener"""
         threading.Thread.__init__(self, name="BindingListener-" + thread_name)
         self._binding = binding
         self._timeout = timeout
         self._msg_handler = msg_handler
+        self._worker_list = []
         self._logger = logging.getLogger(self.__class__.__name__)
 
+        if num_workers > 1:
+            for worker_num in range(num_workers):
+                worker_name = thread_name + "-" + str(worker_num + 1)
+                self._worker_list.append(BindingWorker(worker_name, self._handle_request))
+
     def run(self):
         """Start listening for messages and process them"""
-        # Listen for incoming messages
-        queue_items = self._receive_msgs()
-        for queue_item in queue_items:
-            if queue_item is not None:
-                self._handle_request(queue_item)
+        for worker in self._worker_list:
+            worker.start()
+
+        try:
+            # Listen for incoming messages
+            queue_items = self._receive_msgs()
+            for queue_item in queue_items:
+                if queue_item is not None:
+                    self._dispatch_request(queue_item)
+        finally:
+            for worker in self._worker_list:
+                worker.stop()
+
+    def _dispatch_request(self, queue_item):
+        """Handle the Request on this thread, or hand it to the worker that owns its source address"""
+        if self._worker_list:
+            worker_index = hash(queue_item.get_reply_to_addr()) % len(self._worker_list)
+            self._worker_list[worker_index].put(queue_item)
+        else:
+            self._handle_request(queue_item)
 
     def _receive_msgs(self):
         """Receive incoming messages from the binding"""
@@ -354,20 +403,32 @@ class BindingListener(threading.Thread):
         except GeneratorExit:
             self._logger.info("STOMP Binding Listener is Shutting Down as requested...")
 
-    @INCOMING_REQ_SUMMARY_METRIC.time()
     def _handle_request(self, queue_item):
-        """Handle a Request/Response interaction"""
-        resp_msg = None
+        """Handle a Request/Response interaction
+            - The Queue Item is acknowledged once the Response has been sent (or the Request has failed)"""
+        to_addr = queue_item.get_reply_to_addr()
+
+        try:
+            serialized_resp_record = self.process_request(queue_item.get_payload(), to_addr)
+
+            if serialized_resp_record is not None:
+                self._binding.send_msg(serialized_resp_record, to_addr)
+        finally:
+            self._binding.ack_msg(queue_item)
+
+    @INCOMING_REQ_SUMMARY_METRIC.time()
+    def process_request(self, payload, to_addr):
+        """Process the Request payload and retrieve the serialized Response to send to the address (or None)
+            - Used directly by Bindings that handle Requests on their own event loop"""
+        serialized_resp_record = None
 
         try:
-            req_msg, req_record, resp_msg, serialized_resp_record = \
-                self._msg_handler.handle_request(queue_item.get_payload())
+            req_msg, req_record, resp_msg, serialized_resp_record = self._msg_handler.handle_request(payload)
 
-            to_addr = queue_item.get_reply_to_addr()
             if to_addr is not None:
                 self._log_messages(req_msg, req_record, resp_msg, to_addr)
-                self._binding.send_msg(serialized_resp_record, to_addr)
             else:
+                serialized_resp_record = None
                 self._logger.warning("Response not sent because an address could not be determined!")
 
             # TODO: Check with the self._msg_handler if should shutdown, and raise a GeneratorExit
@@ -376,7 +437,7 @@ class BindingListener(threading.Thread):
             self._logger.debug("USP Protocol Violation Encountered - dropping the Request")
             NUM_PROTO_VIOLATIONS_METRIC.inc()
 
-        return resp_msg
+        return serialized_resp_record
 
     def _log_messages(self, req_msg, req_record, resp_msg, to_addr):
         """Logging Helper Static Method"""
@@ -392,6 +453,38 @@ class BindingListener(threading.Thread):
             self._logger.warning("Sending an Unknown Response")
 
 
+class BindingWorker(threading.Thread):
+    """Handle the Requests dispatched by a BindingListener, in the order they were dispatched"""
+    def __init__(self, thread_name, request_handler_func):
+        """Initialize the Binding Worker"""
+        threading.Thread.__init__(self, name="BindingWorker-" + thread_name, daemon=True)
+        self._request_queue = queue.Queue()
+        self._request_handler_func = request_handler_func
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+    def run(self):
+        """Handle Requests until stopped"""
+        while True:
+            queue_item = self._request_queue.get()
+            if queue_item is None:
+                self._logger.info("Binding Worker is Shutting Down as requested...")
+                break
+
+            try:
+                self._request_handler_func(queue_item)
+            except Exception:  # pylint: disable=broad-except
+                # A failed Request must not stop the worker from handling the Requests queued behind it
+                self._logger.exception("Unexpected failure while handling a Request")
+
+    def put(self, queue_item):
+        """Queue a Request for this worker"""
+        self._request_queue.put(queue_item)
+
+    def stop(self):
+        """Stop the worker once the Requests already queued have been handled"""
+        self._request_queue.put(None)
+
+
 class AbstractPeriodicNotifHandler(threading.Thread):
     """An Abstract Periodic Notification Handler that is extended for specific bindings such that
         a Periodic Notification is issued via the appropriate binding every Interval"""
@@ -440,7 +533,9 @@ class AbstractPeriodicNotifHandler(threading.Thread):
 
 class AbstractValueChangeNotifPoller(threading.Thread):
     """An Abstract Value Change Notification Poller that is extended for specific bindings such that
-        ValueChange Notifications can be issued when a Parameter's Value has Changed"""
+        ValueChange Notifications can be issued when a Parameter's Value has Changed
+        - Woken by the Database's change events, only the Parameters with dynamic values (e.g. __UPTIME__)
+           are polled"""
     TO_ID = "to.id"
     FROM_ID = "from.id"
     MTP = "mtp.path"
@@ -454,33 +549,38 @@ class AbstractValueChangeNotifPoller(threading.Thread):
         self._param_poll_list = []
         self._notif_details_dict = {}
         self._cache_lock = threading.Lock()
+        self._changed_param_queue = queue.Queue()
         self._poll_duration = poll_duration
         self._logger = logging.getLogger(self.__class__.__name__)
 
     def run(self):
-        """Thread execution code - poll for a value change and then
+        """Thread execution code - wait for a value change (polling the dynamic Parameters) and then
              send the ValueChange Notification"""
+        # Only listen for change events once this thread is there to consume them
+        self._db.add_change_listener(self._queue_subscribed_changes)
+        next_poll_time = time.monotonic() + self._poll_duration
+
+        # Catch the changes made before the change listener was registered
+        with self._cache_lock:
+            changed_param_set = set(self._param_cache)
+        self._check_value_changes(changed_param_set)
+
         while True:
-            time.sleep(self._poll_duration)
+            timeout = None
+            if self._param_poll_list:
+                timeout = max(0, next_poll_time - time.monotonic())
 
-            for param in self._param_poll_list:
-                self._logger.debug("Checking %s for a Value Change", param)
-                value = self._db.get(param)
+            changed_param_set = self._wait_for_changes(timeout)
+
+            if self._param_poll_list and time.monotonic() >= next_poll_time:
                 with self._cache_lock:
-                    if value != self._param_cache[param]:
-                        self._logger.info("Value Change detected for %s", param)
-                        self._param_cache[param] = value
-                        notif_details = self._notif_details_dict[param]
-                        to_id = notif_details[self.TO_ID]
-                        from_id = notif_details[self.FROM_ID]
-                        subscription_id = notif_details[self.SUBSCRIPTION_ID]
-                        mtp_param_path = notif_details[self.MTP]
-                        NUM_VC_NOTIFS_COUNTER_METRIC.inc()
-                        self._handle_value_change(param, value, to_id, from_id,
-                                                  subscription_id, mtp_param_path)
+                    changed_param_set.update(self._param_poll_list)
+                next_poll_time = time.monotonic() + self._poll_duration
+
+            self._check_value_changes(changed_param_set)
 
     def add_param(self, param, agent_id, controller_id, mtp_param_path, subscription_id):
-        """Add a Parameter to the Polling List"""
+        """Add a Parameter to the ValueChange Notification Poller (to the Polling List if its value is dynamic)"""
         self._logger.info("Adding %s to the ValueChange Notification Poller", param)
         NUM_VC_PARAMS_GAUGE_METRIC.inc()
         value_change_notif_details_dict = {}
@@ -488,21 +588,82 @@ class AbstractValueChangeNotifPoller(threading.Thread):
         value_change_notif_details_dict[self.TO_ID] = controller_id
         value_change_notif_details_dict[self.SUBSCRIPTION_ID] = subscription_id
         value_change_notif_details_dict[self.MTP] = mtp_param_path
+        value = self._db.get(param)
+        is_dynamic = self._db.has_dynamic_values(param)
 
         with self._cache_lock:
-            self._param_cache[param] = self._db.get(param)
-            self._param_poll_list.append(param)
+            self._param_cache[param] = value
             self._notif_details_dict[param] = value_change_notif_details_dict
+            if is_dynamic:
+                self._param_poll_list.append(param)
+
+        # Wake the thread, so it starts polling a dynamic Parameter
+        self._changed_param_queue.put([])
 
     def remove_param(self, param):
-        """Remove a Parameter from the Polling List"""
+        """Remove a Parameter from the ValueChange Notification Poller"""
         self._logger.info("Removing %s from the ValueChange Notification Poller", param)
         NUM_VC_PARAMS_GAUGE_METRIC.dec()
 
         with self._cache_lock:
             del self._param_cache[param]
-            self._param_poll_list.remove(param)
             del self._notif_details_dict[param]
+            if param in self._param_poll_list:
+                self._param_poll_list.remove(param)
+
+    def _queue_subscribed_changes(self, changed_path_list):
+        """Database change listener - queue the changed Parameters that have a ValueChange Subscription
+            - Changes to the other Parameters are dropped here, so they never build up in the queue"""
+        with self._cache_lock:
+            subscribed_param_list = [path for path in changed_path_list if path in self._param_cache]
+
+        if subscribed_param_list:
+            self._changed_param_queue.put(subscribed_param_list)
+
+    def _wait_for_changes(self, timeout):
+        """Wait for the next change event (or the timeout), returning every Parameter changed so far"""
+        changed_param_set = set()
+
+        try:
+            changed_param_set.update(self._changed_param_queue.get(timeout=timeout))
+
+            # Coalesce the change events that are already queued
+            while True:
+                changed_param_set.update(self._changed_param_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        return changed_param_set
+
+    def _check_value_changes(self, changed_param_set):
+        """Compare the changed Parameters to their cached values, sending a ValueChange Notification for each
+            - The Notifications are sent without holding the cache lock"""
+        value_change_list = []
+
+        with self._cache_lock:
+            subscribed_param_list = [param for param in changed_param_set if param in self._param_cache]
+
+        for param in subscribed_param_list:
+            self._logger.debug("Checking %s for a Value Change", param)
+            try:
+                value = self._db.get(param)
+            except agent_db.NoSuchPathError:
+                self._logger.debug("Parameter %s was deleted, skipping the Value Change check", param)
+                continue
+
+            with self._cache_lock:
+                if param in self._param_cache and value != self._param_cache[param]:
+                    self._logger.info("Value Change detected for %s", param)
+                    self._param_cache[param] = value
+                    value_change_list.append((param, value, self._notif_details_dict[param]))
+
+        for param, value, notif_details in value_change_list:
+            to_id = notif_details[self.TO_ID]
+            from_id = notif_details[self.FROM_ID]
+            subscription_id = notif_details[self.SUBSCRIPTION_ID]
+            mtp_param_path = notif_details[self.MTP]
+            NUM_VC_NOTIFS_COUNTER_METRIC.inc()
+            self._handle_value_change(param, value, to_id, from_id, subscription_id, mtp_param_path)
 
     def _handle_value_change(self, param, value, to_id, from_id, subscription_id, mtp_param_path):
         """Handle the Binding Specific Value Change Processing"""
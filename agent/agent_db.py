@@ -24,40 +24,88 @@ SOFTWARE.
 # Description: Rudimentary Agent Database
 #
 # Functionality:
-#  - Dictionary as a database (key=full parameter path, value=parameter value)
-#  - The database is initialized from a JSON formatted file
+#  - Parameters are held by a pluggable db_storage.StorageEngine (key=full parameter path, value=parameter value)
+#  --- "dict": in-memory dictionary initialized from a JSON formatted file (the default)
+#  --- "sqlite": SQLite table seeded from the JSON formatted file
+#  - The implemented data model is compiled once into a supported_dm.SupportedDataModel
 #  - Get command for full parameter path
+#  - Get Resolved Params command for wild-carded or partial paths (1 traversal, grouped by object path)
+#  --- the resolved parameter paths of each path expression are cached until the DB generation changes
+#  - DB generation counter, bumped whenever an insert or delete changes the set of parameter paths
+#  - Version Vector command for parameter paths (write counter of each touched top-level subtree, e.g. Device.Time.)
+#  --- has_dynamic_values: does a path include parameters computed on read (which can't be cached by version)
+#  --- sentinel values (e.g. "__UPTIME__") are computed by a value_provider.ValueProvider,
+#       each caching its values according to its own TTL or invalidation trigger
+#  - Change listeners, called with the parameter paths written by each update, insert and delete
+#  --- called after the write, outside of the DB lock, so they must not block; writes within a batch are
+#       published once the outermost batch is saved, and never if it is rolled back
 #  - Update command for full parameter path
-#  - Insert command for tables
-#  - Delete command for tables
+#  - Update Many command / transaction() for applying several full parameter paths atomically
+#  - batch() for grouping inserts, deletes and updates into a single persisted transaction
+#  --- committed when the outermost batch exits cleanly, and rolled back (from an undo log) when it raises
+#  - Insert command for tables (creates every parameter of the new instance from the Supported Data Model)
+#  - Delete command for tables (removes the whole instance with 1 prefix delete)
 #  - Find commands for wild-carded or partial parameter paths (returns full parameter paths)
+#  --- the Storage Engine resolves paths by segment (or prefix range), so the find commands
+#       don't match every key against a regex
 #  --- find_params: find parameter paths
-#  --- find_instances: find multi-object instance partial paths
+#  --- find_instances: find multi-object instance partial paths (served from the instance index)
+#  - Per-table instance index (table path -> instance number -> number of parameters), maintained
+#     as parameters are added and removed, so NumberOfEntries and find_instances are O(instances)
 #  --- find_impl_objects: find implemented object partial paths
-#  - Save command (saves the contents of the database back to a file)
+#  - Get Instances command for object paths (served from the instance index)
+#  - Save command (commits the pending changes to the Storage Engine as 1 transaction)
+#  - Every read and write of the Storage Engine and the instance index holds the DB lock, so the Database
+#     can be shared by concurrent request workers
 #
 """
 
 
-import re
 import json
 import time
 import logging
 import datetime
 import threading
+import contextlib
 import prometheus_client
 
 from agent import utils
+from agent import db_storage
+from agent import supported_dm
+from agent import value_provider
+from agent import write_ahead_log
+
+UPTIME_SENTINEL = "__UPTIME__"
+IP_ADDR_SENTINEL = "__IPADDR__"
+CURR_TIME_SENTINEL = "__CURR_TIME__"
+NUM_ENTRIES_SENTINEL = supported_dm.NUM_ENTRIES_SENTINEL
+
+# The most path expressions held in the Resolution Cache (it is emptied when full)
+RESOLUTION_CACHE_SIZE = 256
+
+# The IP Address is looked up by forking a process, so only refresh it once a minute (or when invalidated)
+IP_ADDR_CACHE_TTL = 60
+
+# Marks a parameter that didn't exist before a batch wrote it, in the batch's undo log
+NOT_STORED = object()
 
 # pylint: disable-msg=no-value-for-parameter
 DB_GET_SUMMARY_METRIC = \
     prometheus_client.Summary("database_get_processing_seconds",
                               "Time spent handling Database Get Call")
 # pylint: disable-msg=no-value-for-parameter
+DB_GET_RESOLVED_PARAMS_SUMMARY_METRIC = \
+    prometheus_client.Summary("database_get_resolved_params_processing_seconds",
+                              "Time spent handling Database GetResolvedParams Call")
+# pylint: disable-msg=no-value-for-parameter
 DB_UPDATE_SUMMARY_METRIC = \
     prometheus_client.Summary("database_update_processing_seconds",
                               "Time spent handling Database Update Call")
 # pylint: disable-msg=no-value-for-parameter
+DB_UPDATE_MANY_SUMMARY_METRIC = \
+    prometheus_client.Summary("database_update_many_processing_seconds",
+                              "Time spent handling Database UpdateMany Call")
+# pylint: disable-msg=no-value-for-parameter
 DB_INSERT_SUMMARY_METRIC = \
     prometheus_client.Summary("database_insert_processing_seconds",
                               "Time spent handling Database Insert Call")
@@ -74,6 +122,10 @@ DB_FIND_INSTANCES_SUMMARY_METRIC = \
     prometheus_client.Summary("database_find_instances_processing_seconds",
                               "Time spent handling Database FindInstances Call")
 # pylint: disable-msg=no-value-for-parameter
+DB_GET_INSTANCES_SUMMARY_METRIC = \
+    prometheus_client.Summary("database_get_instances_processing_seconds",
+                              "Time spent handling Database GetInstances Call")
+# pylint: disable-msg=no-value-for-parameter
 DB_FIND_OBJECTS_SUMMARY_METRIC = \
     prometheus_client.Summary("database_find_objects_processing_seconds",
                               "Time spent handling Database FindObjects Call")
@@ -81,23 +133,34 @@ DB_FIND_OBJECTS_SUMMARY_METRIC = \
 DB_FIND_IMPL_OBJECTS_SUMMARY_METRIC = \
     prometheus_client.Summary("database_find_impl_objects_processing_seconds",
                               "Time spent handling Database FindImplObjects Call")
+# pylint: disable-msg=no-value-for-parameter
+DB_RESOLUTION_CACHE_HIT_COUNTER = \
+    prometheus_client.Counter("database_resolution_cache_hits",
+                              "Number of Path Expressions resolved from the Database Resolution Cache")
+# pylint: disable-msg=no-value-for-parameter
+DB_RESOLUTION_CACHE_MISS_COUNTER = \
+    prometheus_client.Counter("database_resolution_cache_misses",
+                              "Number of Path Expressions resolved by traversing the Database")
 
 
 class Database:
     """Represents a simple database"""
-    def __init__(self, dm_filename, db_filename, net_intf):
+    def __init__(self, dm_filename, db_filename, net_intf, fsync_policy=write_ahead_log.FSYNC_ALWAYS,
+                 compact_threshold=1000, storage_engine=db_storage.DICT_ENGINE):
         """Initialize the DB from a file"""
         self._net_intf = net_intf
         self._db_filename = db_filename
-        self._file_write_lock = threading.Lock()
-        self._new_inst_num_lock = threading.Lock()
+        self._batch_depth = 0
+        self._undo_dict = None
+        self._batch_start_num_changes = 0
+        self._generation = 0
+        self._resolution_cache = {}
+        self._write_count = 0
+        self._subtree_version_map = {}
+        self._changed_path_list = []
+        self._change_listener_list = []
+        self._db_lock = threading.RLock()
         self._start_time = time.time()
-        self._supported_insert_path_list = [
-            "Device.Services.HomeAutomation.{i}.Camera.{i}.Pic."
-        ]
-        self._supported_delete_path_list = [
-            "Device.Services.HomeAutomation.{i}.Camera.{i}.Pic.{i}."
-        ]
 
         logger = logging.getLogger(self.__class__.__name__)
         logger.debug("Initializing the Database...")
@@ -105,92 +168,197 @@ class Database:
         # Retrieve the Implemented Data Model
         with open(dm_filename, "r") as dm_in_json:
             try:
-                self._dm = json.load(dm_in_json)
+                dm_contents = json.load(dm_in_json)
             except ValueError as parse_err:
-                self._dm = {}
+                dm_contents = {}
                 logger.error("Implemented Data Model is NOT properly formatted JSON: %s", parse_err)
 
+        # Compile the Implemented Data Model once, all DM validation is done against it
+        self._supported_dm = supported_dm.SupportedDataModel(dm_contents)
+
         # Retrieve the Persisted Database
-        with open(db_filename, "r") as db_in_json:
-            try:
-                self._db = json.load(db_in_json)
-            except ValueError as parse_err:
-                self._db = {}
-                logger.error("Persisted Database is NOT properly formatted JSON: %s", parse_err)
+        self._storage = db_storage.create_storage_engine(storage_engine, db_filename, fsync_policy,
+                                                         compact_threshold)
+
+        # Index the instances of every table, kept up to date by _add_param and _remove_param
+        self._table_instance_map = {}
+        for param_path in self._storage.iter_all_params():
+            self._index_instances(param_path, 1)
+
+        # Register the Providers of the dynamic values
+        self._value_providers = value_provider.ValueProviderRegistry()
+        self._value_providers.register(UPTIME_SENTINEL, value_provider.ValueProvider(self._get_uptime, ttl=0))
+        self._value_providers.register(IP_ADDR_SENTINEL,
+                                       value_provider.ValueProvider(self._get_ip_addr, ttl=IP_ADDR_CACHE_TTL))
+        self._value_providers.register(CURR_TIME_SENTINEL, value_provider.ValueProvider(self._get_curr_time, ttl=0))
+        # Read straight from the instance index, so there is nothing worth caching
+        self._value_providers.register(NUM_ENTRIES_SENTINEL, value_provider.ValueProvider(self._get_num_entries, ttl=0))
 
     @DB_GET_SUMMARY_METRIC.time()
     def get(self, path):
         """Retrieve the value of the incoming path, or throw a NoSuchPathError"""
-        value = None
-
-        if path in self._db:
-            if self._db[path] == "__UPTIME__":
-                value = int(time.time() - self._start_time)
-            elif self._db[path] == "__IPADDR__":
-                value = utils.IPAddr.get_ip_addr(self._net_intf)
-            elif self._db[path] == "__CURR_TIME__":
-                time_zone = self._db["Device.Time.LocalTimeZone"]
-                tz_part = time_zone.split(",")[0]
-                now = datetime.datetime.now()
-                now_str = now.strftime("%Y-%m-%dT%H:%M:%S")
-                if tz_part == "CST6CDT":
-                    now_str += "-06:00"
-                else:
-                    now_str += "Z"
-                value = now_str
-            elif self._db[path] == "__NUM_ENTRIES__":
-                inst_path = re.sub(r'NumberOfEntries', '.', path)
-                found_instances = self.find_instances(inst_path)
-                value = len(found_instances)
+        with self._db_lock:
+            if self._storage.contains(path):
+                stored_value = self._storage.get(path)
             else:
-                value = self._db[path]
-        else:
-            raise NoSuchPathError(path)
+                raise NoSuchPathError(path)
+
+        # Dynamic values are computed outside of the lock, so a slow Value Provider doesn't block writers
+        return self._get_value(path, stored_value)
+
+    @DB_GET_RESOLVED_PARAMS_SUMMARY_METRIC.time()
+    def get_resolved_params(self, path):
+        """Retrieve the values for a wild-carded or partial path in a single traversal, or throw a NoSuchPathError
+            - Returns {resolved object path: {parameter path relative to the object: value}}
+            - A partial path includes every parameter contained within each resolved object
+            - A full path includes only that parameter, which must exist in each resolved object"""
+        resolved_dict = {}
+        stored_value_list = []
+
+        # Snapshot the stored values under the lock, so every resolved object is read as of the same DB state
+        with self._db_lock:
+            for resolved_path, param_path_list in self._resolve_param_paths(path):
+                for param_path in param_path_list:
+                    stored_value_list.append((resolved_path, param_path, self._storage.get(param_path)))
+
+                resolved_dict[resolved_path] = {}
+
+        # Dynamic values are computed outside of the lock, so a slow Value Provider doesn't block writers
+        for resolved_path, param_path, stored_value in stored_value_list:
+            resolved_dict[resolved_path][param_path[len(resolved_path):]] = self._get_value(param_path, stored_value)
+
+        return resolved_dict
+
+    def get_version_vector(self, path_list):
+        """Retrieve the version of each subtree touched by the paths, which changes whenever a parameter within it does
+            - A path that spans subtrees (e.g. Device.) is versioned by the write counter of the whole DB"""
+        version_list = []
+
+        with self._db_lock:
+            for path in path_list:
+                subtree_path = self._get_subtree_path(path)
+                if subtree_path is None:
+                    version_list.append(self._write_count)
+                else:
+                    version_list.append(self._subtree_version_map.get(subtree_path, 0))
 
-        return value
+        return tuple(version_list)
+
+    def has_dynamic_values(self, path):
+        """Determine if any parameter of the path is computed on read (e.g. __UPTIME__), or throw a NoSuchPathError"""
+        with self._db_lock:
+            for _resolved_path, param_path_list in self._resolve_param_paths(path):
+                for param_path in param_path_list:
+                    if self._value_providers.is_provided(self._storage.get(param_path)):
+                        return True
+
+        return False
+
+    def get_generation(self):
+        """Retrieve the DB generation, which changes whenever an insert or delete changes the parameter paths"""
+        return self._generation
+
+    def add_change_listener(self, listener):
+        """Register a callable to be called with the list of parameter paths written by each change"""
+        with self._db_lock:
+            self._change_listener_list.append(listener)
+
+    def remove_change_listener(self, listener):
+        """Unregister a change listener"""
+        with self._db_lock:
+            self._change_listener_list.remove(listener)
+
+    def invalidate_dynamic_value(self, sentinel, path=None):
+        """Drop the cached values of the sentinel's Value Provider (e.g. after a network interface change)"""
+        self._value_providers.invalidate(sentinel, path)
 
     @DB_UPDATE_SUMMARY_METRIC.time()
     def update(self, path, value):
         """Change the value of the incoming path, or throw a NoSuchPathError"""
-        if path in self._db:
-            self._db[path] = value
+        with self._db_lock:
+            if self._storage.contains(path):
+                self._record_undo(path)
+                self._storage.set(path, value)
+                self._bump_version(path)
+                self._save()
+            else:
+                raise NoSuchPathError(path)
+
+        self._publish_changes()
+
+    @DB_UPDATE_MANY_SUMMARY_METRIC.time()
+    def update_many(self, param_value_dict):
+        """Change the values of all of the incoming paths as 1 transaction, or throw a NoSuchPathError
+            - Nothing is changed unless every path exists"""
+        with self._db_lock:
+            for path in param_value_dict:
+                if not self._storage.contains(path):
+                    raise NoSuchPathError(path)
+
+            for path, value in param_value_dict.items():
+                self._record_undo(path)
+                self._storage.set(path, value)
+                self._bump_version(path)
+
             self._save()
-        else:
-            raise NoSuchPathError(path)
+
+        self._publish_changes()
+
+    def transaction(self):
+        """Start a Transaction that stages updates and applies them with update_many when it is committed"""
+        return DatabaseTransaction(self)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Group the inserts, deletes and updates made within the block into a single persisted transaction
+            - The Database is locked for the whole block, so reads made to validate the changes stay valid
+            - Saved once the outermost batch exits cleanly, and rolled back if it raises
+            - The change listeners are called once the outermost batch is saved (outside of the DB lock),
+               and not at all for a rolled back batch"""
+        with self._db_lock:
+            if self._batch_depth == 0:
+                self._undo_dict = {}
+                self._batch_start_num_changes = len(self._changed_path_list)
+
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                if self._batch_depth == 1:
+                    self._rollback()
+                raise
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    # Nothing to persist if the batch didn't write anything (a rolled back batch did)
+                    is_written = self._undo_dict is None or len(self._undo_dict) > 0
+                    self._undo_dict = None
+                    if is_written:
+                        self._save()
+
+        # Only reached when the batch exits cleanly; a no-op for a nested batch, as the outer one is still open
+        self._publish_changes()
 
     @DB_FIND_PARAMS_SUMMARY_METRIC.time()
     def find_params(self, path):
         """Retrieve a set of parameter paths that match the incoming path"""
         found_keys = []
-        is_implemented_path = False
         logger = logging.getLogger(self.__class__.__name__)
 
-        # Turn the incoming path into a regex to validate it is in the implemented data model
-        dm_regex_str = self._dm_regex(path, path.endswith("."))
-        logger.debug("find_params: Using regex \"%s\" to validate Path [%s] is in the Implemented Data Model",
-                     dm_regex_str, path)
-
-        # Turn the incoming path into a regex to get the matching paths
-        db_regex_str = self._db_regex(path, path.endswith("."))
-        logger.debug("find_params: Using regex \"%s\" to retrieve values from the Database for Path [%s]",
-                     db_regex_str, path)
-
         # Validate that path is in the Implemented Data Model
-        dm_keys = self._dm.keys()
-        for dm_key in dm_keys:
-            if re.fullmatch(dm_regex_str, dm_key) is not None:
-                is_implemented_path = True
-                break
-
-        # If the path is Valid then retrieve the matching paths
-        if is_implemented_path:
-            for param_path in self._db:
-                if re.fullmatch(db_regex_str, param_path) is not None:
-                    path_parts = param_path.split(".")
-                    path_part_len = len(path_parts) - 1
-
-                    if not self._is_meta_parameter(path_parts, path_part_len):
-                        found_keys.append(param_path)
+        if self._supported_dm.is_implemented(path):
+            logger.debug("find_params: Walking the Database Index for Path [%s]", path)
+
+            with self._db_lock:
+                if path.endswith("."):
+                    for obj_path in self._storage.resolve(path):
+                        for param_path in self._storage.iter_params(obj_path):
+                            if not self._is_meta_param_path(param_path):
+                                found_keys.append(param_path)
+                else:
+                    for param_path in self._storage.resolve(path):
+                        if not self._is_meta_param_path(param_path):
+                            found_keys.append(param_path)
         else:
             raise NoSuchPathError(path)
 
@@ -198,268 +366,454 @@ class Database:
 
     def is_param_writable(self, param_path):
         """Validate whether the supplied parameter path is readWrite (return True)"""
-        is_writable = False
-        dm_param_path = self._generic_dm_path(param_path)
-
         # Validate that path is in the Implemented Data Model
-        if dm_param_path in self._dm:
-            if self._dm[dm_param_path] == "readWrite":
-                is_writable = True
-        else:
-            raise NoSuchPathError(dm_param_path)
+        if self._supported_dm.get_param_access(param_path) is None:
+            raise NoSuchPathError(self._supported_dm.get_generic_path(param_path))
+
+        return self._supported_dm.is_param_writable(param_path)
 
-        return is_writable
+    def get_supported_dm(self):
+        """Retrieve the compiled Supported Data Model (a new one is compiled whenever the DM file is reloaded)"""
+        return self._supported_dm
+
+    def is_multi_instance(self, obj_path):
+        """Determine if the partial path refers to instances of a multi-instance object (e.g. Device.Controller.*.)"""
+        return self._supported_dm.is_multi_instance(obj_path)
+
+    def find_tables(self, partial_path):
+        """Retrieve the multi-instance object tables (whose parent instances exist) that match the incoming path"""
+        if not partial_path.endswith(".") or not self._supported_dm.is_table(partial_path):
+            raise NoSuchPathError(partial_path)
+
+        with self._db_lock:
+            return [table_path for table_path in self._resolve_partial_path(partial_path)
+                    if self._is_instantiated(table_path)]
 
     @DB_FIND_INSTANCES_SUMMARY_METRIC.time()
     def find_instances(self, partial_path):
         """Retrieve a set of object instance paths that match the incoming path"""
         found_keys = []
-        is_implemented_path = False
-        logger = logging.getLogger(self.__class__.__name__)
 
-        if partial_path.endswith("."):
-            # Turn the incoming path into a regex to validate it is in the implemented data model
-            dm_regex_str = self._dm_regex(partial_path, True)
-            logger.debug("find_instances: Using regex \"%s\" to validate Path [%s] is in the Implemented Data Model",
-                         dm_regex_str, partial_path)
+        if not partial_path.endswith("."):
+            raise NoSuchPathError(partial_path)
 
-            # Turn the incoming path into a regex to get the matching paths
-            db_regex_str = self._db_regex(partial_path, True)
-            logger.debug("find_instances: Using regex \"%s\" to retrieve values from the Database for Path [%s]",
-                         db_regex_str, partial_path)
-        else:
+        # Validate that the partial_path is a multi-instance object in the Implemented Data Model
+        if not self._supported_dm.is_table(partial_path):
             raise NoSuchPathError(partial_path)
 
-        # length minus 1 due to the ending "." causing 1 more split
-        partial_path_part_len = len(partial_path.split(".")) - 1
+        # We only want the path to the next level (instance identifiers)
+        with self._db_lock:
+            for table_path in self._resolve_partial_path(partial_path):
+                for inst_num in self._table_instance_map.get(table_path, {}):
+                    found_keys.append(table_path + inst_num + ".")
 
-        # Validate that path is in the Implemented Data Model
-        for dm_key in self._dm:
-            if re.fullmatch(dm_regex_str, dm_key) is not None:
-                # Validate that the partial_path is a multi-instance object
-                dm_key_parts = dm_key.split(".")
-                if dm_key_parts[partial_path_part_len] == "{i}":
-                    is_implemented_path = True
-                    break
-
-        # If the path is Valid then retrieve the matching paths
-        if is_implemented_path:
-            for path in self._db:
-                if re.fullmatch(db_regex_str, path) is not None:
-                    # We only want the path to the next level (instance identifiers)
-                    path_parts = path.split(".")
-                    built_path = utils.PathHelper.build_path_from_parts(path_parts, partial_path_part_len)
-                    found_key = built_path + path_parts[partial_path_part_len] + "."
-
-                    if not self._is_meta_parameter(path_parts, partial_path_part_len):
-                        # Only add it to found_keys if we haven't done so already
-                        if found_key not in found_keys:
-                            found_keys.append(found_key)
-        else:
+        return found_keys
+
+    @DB_GET_INSTANCES_SUMMARY_METRIC.time()
+    def get_instances(self, partial_path, first_level_only=False):
+        """Retrieve the instance paths of the multi-instance objects within the objects matching the incoming path
+            - first_level_only: only the instances of the table itself (or of the object's direct child tables)
+            - Served from the instance index, so no parameters are visited"""
+        found_keys = []
+
+        # Validate that the partial_path is an object in the Implemented Data Model
+        if not partial_path.endswith(".") or not self._supported_dm.is_object(partial_path):
             raise NoSuchPathError(partial_path)
 
+        with self._db_lock:
+            for obj_path in self._resolve_partial_path(partial_path):
+                if not self._is_instantiated(obj_path):
+                    continue
+
+                for table_path, instance_map in self._table_instance_map.items():
+                    if not table_path.startswith(obj_path):
+                        continue
+
+                    if first_level_only:
+                        # The object itself is the table, or the table is a direct child of the object
+                        relative_path = table_path[len(obj_path):]
+                        if relative_path and relative_path.count(".") != 1:
+                            continue
+                        if not relative_path and not self._supported_dm.is_table(table_path):
+                            continue
+
+                    for inst_num in instance_map:
+                        found_keys.append(table_path + inst_num + ".")
+
         return found_keys
 
     @DB_FIND_OBJECTS_SUMMARY_METRIC.time()
     def find_objects(self, partial_path):
         """Retrieve a set of instantiated object paths that match the incoming path"""
-        found_keys = []
-        is_implemented_path = False
-        logger = logging.getLogger(self.__class__.__name__)
-
-        if partial_path.endswith("."):
-            # Turn the incoming path into a regex to validate it is in the implemented data model
-            dm_regex_str = self._dm_regex(partial_path, True)
-            logger.debug("find_objects: Using regex \"%s\" to validate Path [%s] is in the Implemented Data Model",
-                         dm_regex_str, partial_path)
-
-            # Turn the incoming path into a regex to get the matching paths
-            db_regex_str = self._db_regex(partial_path, True)
-            logger.debug("find_objects: Using regex \"%s\" to retrieve values from the Database for Path [%s]",
-                         db_regex_str, partial_path)
-        else:
+        if not partial_path.endswith("."):
             raise NoSuchPathError(partial_path)
 
-        # length minus 1 due to the ending "." causing 1 more split
-        partial_path_part_len = len(partial_path.split(".")) - 1
-
         # Validate that path is in the Implemented Data Model
-        for dm_key in self._dm:
-            if re.fullmatch(dm_regex_str, dm_key) is not None:
-                is_implemented_path = True
-                break
-
-        # If the path is Valid then retrieve the matching paths
-        if is_implemented_path:
-            for path in self._db:
-                if re.fullmatch(db_regex_str, path) is not None:
-                    # We only want the path to the next level (instance identifiers)
-                    path_parts = path.split(".")
-                    found_key = utils.PathHelper.build_path_from_parts(path_parts, partial_path_part_len)
-
-                    if found_key not in found_keys:
-                        found_keys.append(found_key)
-        else:
+        if not self._supported_dm.is_implemented(partial_path):
             raise NoSuchPathError(partial_path)
 
-        return found_keys
+        # Every object left in the index contains at least one parameter
+        with self._db_lock:
+            return self._storage.resolve(partial_path)
 
     @DB_FIND_IMPL_OBJECTS_SUMMARY_METRIC.time()
     def find_impl_objects(self, partial_path, next_level):
         """Retrieve a set of implemented object paths that match the incoming path"""
-        found_keys = []
-        is_implemented_path = False
         logger = logging.getLogger(self.__class__.__name__)
-        generic_partial_path = self._generic_dm_path(partial_path)
-
-        if partial_path.endswith("."):
-            # Turn the incoming path into a regex to validate it is in the implemented data model
-            dm_regex_str = self._dm_regex(partial_path, True)
-            logger.debug(
-                "find_impl_objects: Using regex \"%s\" to validate Path [%s] is in the Implemented Data Model",
-                dm_regex_str, partial_path)
-        else:
-            raise NoSuchPathError(partial_path)
 
-        # length minus 1 due to the ending "." causing 1 more split
-        partial_path_part_len = len(partial_path.split(".")) - 1
+        if not partial_path.endswith("."):
+            raise NoSuchPathError(partial_path)
 
         # Validate that path is in the Implemented Data Model
-        for dm_key in self._dm:
-            if re.fullmatch(dm_regex_str, dm_key) is not None:
-                logger.debug("find_impl_objects: Found full match: %s", dm_key)
-                found_key = None
-                key_parts = dm_key.split(".")
-                key_parts_len = len(key_parts)
-                is_implemented_path = True
-
-                if next_level:
-                    if key_parts_len > partial_path_part_len + 1:
-                        built_path = utils.PathHelper.build_path_from_parts(key_parts, partial_path_part_len)
-                        found_key = built_path + key_parts[partial_path_part_len] + "."
-                    else:
-                        logger.debug("find_impl_objects: key parts [%s] less than partial path parts [%s]",
-                                     str(key_parts_len), str(partial_path_part_len + 1))
-                else:
-                    inx = 0
-                    found_key = ""
-                    while inx < (key_parts_len - 1):
-                        found_key += key_parts[inx]
-                        found_key += "."
-                        inx += 1
-
-                # Only add it to found_keys if we haven't done so already
-                if found_key is not None:
-                    logger.debug("find_impl_objects: Found key: %s", found_key)
-                    if found_key not in found_keys:
-                        logger.debug("find_impl_objects: Found key [%s] not already in the list", found_key)
-                        # Don't add the incoming partial_path
-                        if not found_key == generic_partial_path:
-                            logger.debug("find_impl_objects: Adding found key [%s] to the list", found_key)
-                            found_keys.append(found_key)
-
-        # If the path is Valid then retrieve the matching paths
-        if not is_implemented_path:
+        if not self._supported_dm.is_object(partial_path):
             raise NoSuchPathError(partial_path)
 
+        if next_level:
+            found_keys = self._supported_dm.get_child_objects(partial_path)
+        else:
+            found_keys = self._supported_dm.get_param_objects(partial_path)
+
+        logger.debug("find_impl_objects: Found keys %s for Path [%s]", found_keys, partial_path)
+
         return found_keys
 
     @DB_INSERT_SUMMARY_METRIC.time()
-    def insert(self, partial_path):
-        """Insert a new record in the table"""
+    def insert(self, partial_path, param_value_dict=None):
+        """Insert a new instance, with every parameter of the Supported Data Model, into the table
+            - The instance number comes from the table's __NextInstNum__ (or the highest instance number)
+            - The parameters default to their Supported Data Model value unless provided in param_value_dict
+               (keyed by the parameter name relative to the new instance)
+            - Returns the new instance number, or throws a NoSuchPathError"""
         logger = logging.getLogger(self.__class__.__name__)
 
-        # Check to see if the returned list is not empty
-        if self.find_impl_objects(partial_path, True):
-            dm_regex_str = partial_path
-            dm_regex_str = re.sub(r'\{(.+?)\}', '{i}', dm_regex_str)
-            dm_regex_str = re.sub(r'\.\d+\.', '.{i}.', dm_regex_str)
-            logger.debug("insert: Using regex \"%s\" to validate Path [%s] is in the Supported Insert Path List",
-                         dm_regex_str, partial_path)
-
-            if dm_regex_str in self._supported_insert_path_list:
-                next_inst_num_path = partial_path + "__NextInstNum__"
-                with self._new_inst_num_lock:
-                    next_inst_num = self.get(next_inst_num_path)
-                    self.update(next_inst_num_path, next_inst_num + 1)
-
-                if dm_regex_str == "Device.Services.HomeAutomation.{i}.Camera.{i}.Pic.":
-                    self._db[partial_path + str(next_inst_num) + ".URL"] = ""
-                    self._save()
-                else:
-                    raise NotImplementedError()
-            else:
-                raise NoSuchPathError(partial_path)
-        else:
+        if param_value_dict is None:
+            param_value_dict = {}
+
+        # Validate that the partial_path is an instantiated multi-instance object table
+        if "*" in partial_path or not partial_path.endswith(".") or not self._supported_dm.is_table(partial_path):
             raise NoSuchPathError(partial_path)
 
+        param_name_list = self._supported_dm.get_instance_param_names(partial_path)
+        for param_name in param_value_dict:
+            if param_name not in param_name_list:
+                raise NoSuchPathError(partial_path + param_name)
+
+        with self._db_lock:
+            if not self._is_instantiated(partial_path):
+                raise NoSuchPathError(partial_path)
+
+            next_inst_num = self._allocate_inst_num(partial_path)
+            inst_path = partial_path + str(next_inst_num) + "."
+            logger.debug("insert: Adding instance [%s]", inst_path)
+
+            for param_name in param_name_list:
+                param_path = inst_path + param_name
+                if param_name in param_value_dict:
+                    self._add_param(param_path, param_value_dict[param_name])
+                else:
+                    self._add_param(param_path, self._supported_dm.get_default_value(param_path))
+
+            self._generation += 1
+            self._save()
+
+        self._publish_changes()
+
         return next_inst_num
 
     @DB_DELETE_SUMMARY_METRIC.time()
     def delete(self, partial_path):
-        """Remove an existing record from the table"""
+        """Remove an existing instance, and everything it contains, from its table"""
         logger = logging.getLogger(self.__class__.__name__)
 
-        # Check to see if the returned list is not empty
-        if self.find_objects(partial_path):
-            dm_regex_str = partial_path
-            dm_regex_str = re.sub(r'\{(.+?)\}', '{i}', dm_regex_str)
-            dm_regex_str = re.sub(r'\.\d+\.', '.{i}.', dm_regex_str)
-            logger.debug("delete: Using regex \"%s\" to validate Path [%s] is in the Supported Delete Path List",
-                         dm_regex_str, partial_path)
-
-            if dm_regex_str in self._supported_delete_path_list:
-                if dm_regex_str == "Device.Services.HomeAutomation.{i}.Camera.{i}.Pic.{i}.":
-                    del self._db[partial_path + "URL"]
-                    self._save()
-                else:
-                    raise NotImplementedError()
-            else:
+        # Validate that the partial_path is a multi-instance object instance
+        if "*" in partial_path or not self._supported_dm.is_multi_instance(partial_path):
+            raise NoSuchPathError(partial_path)
+
+        with self._db_lock:
+            if not self._is_instantiated(partial_path):
                 raise NoSuchPathError(partial_path)
+
+            logger.debug("delete: Removing instance [%s]", partial_path)
+            for param_path in self._storage.iter_params(partial_path):
+                self._record_undo(param_path)
+
+            for param_path in self._storage.remove_prefix(partial_path):
+                self._index_instances(param_path, -1)
+                self._bump_version(param_path)
+
+            self._generation += 1
+            self._save()
+
+        self._publish_changes()
+
+    def _resolve_param_paths(self, path):
+        """Resolve the path expression into [(resolved object path, [parameter path])], or throw a NoSuchPathError
+            - Cached per path expression until the DB generation changes"""
+        cached_entry = self._resolution_cache.get(path)
+        if cached_entry is not None and cached_entry[0] == self._generation:
+            DB_RESOLUTION_CACHE_HIT_COUNTER.inc()
+            return cached_entry[1]
+
+        DB_RESOLUTION_CACHE_MISS_COUNTER.inc()
+        resolution_list = []
+
+        if path.endswith("."):
+            obj_path = path
+            param_name = None
         else:
-            raise NoSuchPathError(partial_path)
+            obj_path, param_name = path.rsplit(".", 1)
+            obj_path += "."
+
+        # Validate that the object path is in the Implemented Data Model
+        if not self._supported_dm.is_implemented(obj_path):
+            raise NoSuchPathError(obj_path)
+
+        for resolved_path in self._storage.resolve(obj_path):
+            if param_name is None:
+                param_path_list = [param_path for param_path in self._storage.iter_params(resolved_path)
+                                   if not self._is_meta_param_path(param_path)]
+            else:
+                param_path = resolved_path + param_name
+                if not self._storage.contains(param_path):
+                    raise NoSuchPathError(param_path)
+                param_path_list = [param_path]
+
+            resolution_list.append((resolved_path, param_path_list))
+
+        if len(self._resolution_cache) >= RESOLUTION_CACHE_SIZE:
+            self._resolution_cache.clear()
+        self._resolution_cache[path] = (self._generation, resolution_list)
+
+        return resolution_list
+
+    def _add_param(self, path, value):
+        """Add a new parameter to the DB and the instance index"""
+        self._record_undo(path)
+        if not self._storage.contains(path):
+            self._index_instances(path, 1)
+
+        self._storage.set(path, value)
+        self._bump_version(path)
+
+    def _remove_param(self, path):
+        """Remove an existing parameter from the DB and the instance index"""
+        self._record_undo(path)
+        self._storage.remove(path)
+        self._index_instances(path, -1)
+        self._bump_version(path)
+
+    def _record_undo(self, path):
+        """Record the original value (or absence) of a parameter written within a batch, for its rollback"""
+        if self._undo_dict is not None and path not in self._undo_dict:
+            if self._storage.contains(path):
+                self._undo_dict[path] = self._storage.get(path)
+            else:
+                self._undo_dict[path] = NOT_STORED
+
+    def _rollback(self):
+        """Restore every parameter written within the batch to its original value (caller holds the lock)"""
+        logger = logging.getLogger(self.__class__.__name__)
+        undo_dict = self._undo_dict
+        self._undo_dict = None
+        logger.warning("Rolling back the [%s] parameters changed within the batch", str(len(undo_dict)))
+
+        for path, value in undo_dict.items():
+            if value is NOT_STORED:
+                if self._storage.contains(path):
+                    self._remove_param(path)
+            else:
+                self._add_param(path, value)
+
+        # Neither the batch's writes nor their restoration are published to the change listeners
+        del self._changed_path_list[self._batch_start_num_changes:]
+        self._generation += 1
+
+    def _bump_version(self, path):
+        """Record a write to the parameter path in the version of its top-level subtree (and the pending changes)"""
+        self._write_count += 1
+        self._changed_path_list.append(path)
+        subtree_path = self._get_subtree_path(path)
+        if subtree_path is not None:
+            self._subtree_version_map[subtree_path] = self._write_count
+
+    def _publish_changes(self):
+        """Call the change listeners with the parameter paths written since the last publish
+            - Deferred while in a batch, until the outermost batch is saved"""
+        with self._db_lock:
+            if self._batch_depth > 0:
+                return
+
+            changed_path_list = self._changed_path_list
+            self._changed_path_list = []
+            change_listener_list = list(self._change_listener_list)
+
+        if changed_path_list:
+            for listener in change_listener_list:
+                listener(changed_path_list)
+
+    def _get_subtree_path(self, path):
+        """Retrieve the top-level subtree (e.g. Device.LocalAgent.) of the path, or None if the path spans subtrees"""
+        path_parts = path.split(".")
+
+        if len(path_parts) < 3 or not path_parts[1] or "*" in path_parts[1]:
+            return None
+
+        return ".".join(path_parts[:2]) + "."
+
+    def _is_instantiated(self, partial_path):
+        """Determine if every instance number in the partial path refers to an existing instance"""
+        path_parts = partial_path.split(".")[:-1]
+
+        for index, part in enumerate(path_parts):
+            if part.isdigit():
+                table_path = ".".join(path_parts[:index]) + "."
+                if part not in self._table_instance_map.get(table_path, {}):
+                    return False
+
+        return True
+
+    def _allocate_inst_num(self, table_path):
+        """Allocate the next instance number of the table, persisting it in the table's __NextInstNum__"""
+        instance_map = self._table_instance_map.get(table_path, {})
+        next_inst_num_path = table_path + "__NextInstNum__"
+
+        if self._storage.contains(next_inst_num_path):
+            next_inst_num = self._storage.get(next_inst_num_path)
+        else:
+            next_inst_num = max([int(inst_num) for inst_num in instance_map], default=0) + 1
+
+        # Never hand out an instance number that is still in use
+        while str(next_inst_num) in instance_map:
+            next_inst_num += 1
 
-    def _db_regex(self, path, partial_path):
-        """Generate a regex for determining whether or note a path is in the DB"""
-        db_regex_str = "^" + path
-        # Assuming that the internal storage is instance number based
-        db_regex_str = re.sub(r'\.\*\.', r'.[0-9]+.', db_regex_str)
-        db_regex_str = re.sub(r'\.', r'\.', db_regex_str)
+        self._add_param(next_inst_num_path, next_inst_num + 1)
 
-        if partial_path:
-            db_regex_str = db_regex_str + ".*"
+        return next_inst_num
+
+    def _index_instances(self, param_path, param_count_delta):
+        """Adjust the parameter count of every instance that contains the parameter path
+            - An instance is dropped from its table once it no longer contains any parameters"""
+        path_parts = param_path.split(".")
+
+        for index, part in enumerate(path_parts[:-1]):
+            if part.isdigit():
+                table_path = ".".join(path_parts[:index]) + "."
+                instance_map = self._table_instance_map.setdefault(table_path, {})
+                param_count = instance_map.get(part, 0) + param_count_delta
+
+                if param_count > 0:
+                    instance_map[part] = param_count
+                else:
+                    instance_map.pop(part, None)
+                    if not instance_map:
+                        del self._table_instance_map[table_path]
+
+    def _resolve_partial_path(self, partial_path):
+        """Resolve a partial path that might contain wildcards using the instance index"""
+        resolved_path_list = [""]
+
+        for part in partial_path.split(".")[:-1]:
+            if part == "*":
+                resolved_path_list = [resolved_path + inst_num + "."
+                                      for resolved_path in resolved_path_list
+                                      for inst_num in self._table_instance_map.get(resolved_path, {})]
+            else:
+                resolved_path_list = [resolved_path + part + "." for resolved_path in resolved_path_list]
+
+        return resolved_path_list
+
+    def _get_uptime(self, path):
+        """Value Provider: the number of seconds since the Agent started"""
+        return int(time.time() - self._start_time)
+
+    def _get_ip_addr(self, path):
+        """Value Provider: the IP Address of the Agent's network interface"""
+        return utils.IPAddr.get_ip_addr(self._net_intf)
+
+    def _get_curr_time(self, path):
+        """Value Provider: the current local time, in the Agent's time zone"""
+        time_zone = self._storage.get("Device.Time.LocalTimeZone")
+        tz_part = time_zone.split(",")[0]
+        now = datetime.datetime.now()
+        now_str = now.strftime("%Y-%m-%dT%H:%M:%S")
+        if tz_part == "CST6CDT":
+            now_str += "-06:00"
+        else:
+            now_str += "Z"
+
+        return now_str
 
-        return db_regex_str
+    def _get_num_entries(self, path):
+        """Value Provider: the number of instances in the table that the NumberOfEntries parameter counts"""
+        table_path = path[:-len("NumberOfEntries")] + "."
 
-    def _dm_regex(self, path, partial_path):
-        """Generate a regex for determining whether or not a path is in the DM"""
-        dm_regex_str = "^" + path  # Starts with
-        dm_regex_str = re.sub(r'\.[0-9]+\.', r'.{i}.', dm_regex_str)  # Instance Number Addressing
-        dm_regex_str = re.sub(r'\.\*\.', r'.{i}.', dm_regex_str)  # Wild-card Searching
-        dm_regex_str = re.sub(r'\.', r'\.', dm_regex_str)  # Replace '.' with explicit '.' search
+        with self._db_lock:
+            return len(self._table_instance_map.get(table_path, {}))
 
-        if partial_path:
-            dm_regex_str = dm_regex_str + ".*"
+    def _get_value(self, path, stored_value):
+        """Retrieve the value of the parameter from its stored value (computing it for sentinel values)"""
+        if self._value_providers.is_provided(stored_value):
+            return self._value_providers.get_value(stored_value, path)
 
-        return dm_regex_str
+        return stored_value
 
-    def _generic_dm_path(self, path):
-        """Turn a DM Path into a Generic one by replacing instance numbers and wildcards"""
-        generic_path = re.sub(r'\.[0-9]+\.', r'.{i}.', path)  # Instance Number Addressing
-        generic_path = re.sub(r'\.\*\.', r'.{i}.', generic_path)  # Wild-card Searching
+    def _is_meta_param_path(self, param_path):
+        """Determine if the parameter path refers to a meta parameter"""
+        return self._is_meta_name(param_path.split(".")[-1])
 
-        return generic_path
+    def _is_meta_name(self, name):
+        """Determine if the path segment is a meta parameter name"""
+        return name.startswith("__") and name.endswith("__")
 
-    def _is_meta_parameter(self, path_parts, partial_path_part_len):
-        """Determine if the parameter is a meta parameter"""
-        return path_parts[partial_path_part_len].startswith("__") and \
-               path_parts[partial_path_part_len].endswith("__")
+    def close(self):
+        """Persist any pending changes and close the Storage Engine"""
+        with self._db_lock:
+            self._storage.close()
 
     def _save(self):
-        """Save the contents of the DB back into the File"""
-        with self._file_write_lock:
-            with open(self._db_filename, "w") as db_file:
-                json.dump(self._db, db_file, indent=4)
+        """Persist the pending changes as a single Storage Engine transaction (deferred while in a batch)"""
+        with self._db_lock:
+            if self._batch_depth == 0:
+                self._storage.commit()
+
+
+class DatabaseTransaction:
+    """A set of staged Database updates that are applied together when the Transaction is committed
+        - Used as a context manager, the Transaction is committed when the block exits cleanly
+           and discarded when the block raises"""
+    def __init__(self, database):
+        """Initialize the Transaction"""
+        self._database = database
+        self._staged_updates = {}
+
+    def __enter__(self):
+        """Start the Transaction block"""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Commit the staged updates, unless the Transaction block raised an Exception"""
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+        return False
+
+    def update(self, path, value):
+        """Stage a change to the value of the incoming path"""
+        self._staged_updates[path] = value
+
+    def commit(self):
+        """Apply all of the staged updates to the Database as 1 transaction, or throw a NoSuchPathError"""
+        staged_updates = self._staged_updates
+        self._staged_updates = {}
+
+        if staged_updates:
+            self._database.update_many(staged_updates)
+
+    def rollback(self):
+        """Discard all of the staged updates"""
+        self._staged_updates = {}
 
 
 class NoSuchPathError(Exception):
@@ -38,6 +38,8 @@
 """
 
 
+import concurrent.futures
+
 from agent import mdns
 from agent import utils
 from agent import notify
@@ -46,6 +48,12 @@ from agent import abstract_agent
 from agent import coap_usp_binding
 
 
+COAP_BLOCK_SIZE = "coap.block.size"
+COAP_BUSY_MAX_AGE = "coap.busy.max.age"
+COAP_ASYNCIO_NATIVE = "coap.asyncio.native"
+COAP_PIGGYBACK_DEADLINE = "coap.piggyback.deadline"
+
+
 class CoapAgent(abstract_agent.AbstractAgent):
     """A USP Agent that uses the CoAP Binding"""
     def __init__(self, dm_file, db_file, net_intf, port=5683, cfg_file_name="cfg/agent.json", debug=False):
@@ -65,8 +73,20 @@ class CoapAgent(abstract_agent.AbstractAgent):
                 self._mdns_listener = mdns.Listener()
                 self._mdns_listener.listen()
 
+                cfg_mgr = utils.ConfigMgr(cfg_file_name, {COAP_BUSY_MAX_AGE: "5", COAP_ASYNCIO_NATIVE: "false",
+                                                          COAP_PIGGYBACK_DEADLINE: "0", COAP_BLOCK_SIZE: "1024"})
+                block_size = int(cfg_mgr.get_cfg_item(COAP_BLOCK_SIZE))
+                busy_max_age = int(cfg_mgr.get_cfg_item(COAP_BUSY_MAX_AGE))
+                self._piggyback_deadline = float(cfg_mgr.get_cfg_item(COAP_PIGGYBACK_DEADLINE))
+                # Piggybacked Responses need the Requests to be handled on the Binding's Event Loop
+                self._asyncio_native = (str(cfg_mgr.get_cfg_item(COAP_ASYNCIO_NATIVE)).lower() == "true" or
+                                        self._piggyback_deadline > 0)
                 self._binding = coap_usp_binding.CoapUspBinding(ip_addr, self._endpoint_id, port,
-                                                                resource_path=resource_path, debug=debug)
+                                                                resource_path=resource_path, debug=debug,
+                                                                max_queue_size=self._binding_queue_size,
+                                                                high_watermark=self._binding_queue_high_watermark,
+                                                                low_watermark=self._binding_queue_low_watermark,
+                                                                busy_max_age=busy_max_age, block_size=block_size)
                 self._binding.listen(url)
 
                 self._mdns_announcer = mdns.Announcer(ip_addr, port, resource_path, self._endpoint_id)
@@ -93,15 +113,27 @@ class CoapAgent(abstract_agent.AbstractAgent):
             abstract_agent.AbstractAgent.start_listening(self)
 
             msg_handler = self.get_msg_handler()
-            listener = abstract_agent.BindingListener("CoAP", self._binding, msg_handler, timeout)
-            listener.start()
-            listener.join()
+            listener = abstract_agent.BindingListener("CoAP", self._binding, msg_handler, timeout,
+                                                      self._num_request_workers)
+
+            if self._asyncio_native:
+                # The Binding handles the Requests on its Event Loop, so the Listener Thread isn't started
+                self._logger.info("Handling CoAP Requests on the AsyncIO CoAP Event Loop")
+                request_executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._num_request_workers)
+                self._binding.set_request_handler(listener.process_request, request_executor,
+                                                  self._piggyback_deadline)
+                self._binding.wait_until_closed()
+            else:
+                listener.start()
+                listener.join()
 
     def clean_up(self):
         """Clean up the USP Binding"""
         if self._can_start:
             self._binding.clean_up()
 
+        self._db.close()
+
     def _get_ip_addr(self, net_intf):
         """Get the IP Address for this Agent"""
         if len(net_intf) > 1:
@@ -31,32 +31,65 @@
 #    - render_delete(request)
 #    - render_post(request)
 #    - get_link_description()
-#  - CoapReceivingThread(threading.Thread)
-#    - __init__(event_loop, resource_tree, listening_port)
-#    - run()
-#  - CoapSendingThread(threading.Thread)
-#    - __init__(serialized_msg, to_addr, debug=False)
+#  - CoapEventLoopThread(threading.Thread)
+#    - __init__(event_loop, debug=False)
 #    - run()
 #  - CoapUspBinding(generic_usp_binding.GenericUspBinding)
-#    - __init__(listen_port=5683, sending_thr_timeout=5, debug=False)
+#    - __init__(listen_port=5683, send_timeout=5, debug=False, max_queue_size=1000,
+#               high_watermark=None, low_watermark=None, busy_max_age=5, block_size=1024)
 #    - validate_payload(payload)
-#    - send_msg(serialized_msg, to_addr)
+#    - set_request_handler(request_handler_func, request_executor, piggyback_deadline=0)
+#    - is_asyncio_native()
+#    - admit_request() :: returns False if too many Requests are in flight
+#    - handle_request(payload, reply_to_addr) :: coroutine
+#    - get_busy_max_age()
+#    - send_msg(serialized_msg, to_addr) :: returns a concurrent.futures.Future of the response code
 #    - listen()
+#    - wait_until_closed()
 #    - clean_up()
 #
+#  - The Server Context (receiving) and a pooled Client Context (sending) share 1 long-lived AsyncIO
+#     Event Loop, so sending a message doesn't create a thread, an event loop or a socket
+#  - In asyncio-native mode the Requests are handled (and their Responses sent) from the Event Loop itself,
+#     with the Request Handler run in an executor, instead of going through the incoming message queue
+#  --- the Requests in flight count against the same max_queue_size and watermarks as the queue, so a flood
+#       of Requests is answered with 5.03 (and Max-Age) rather than piling up in the executor
+#  --- optionally, a Response that is ready within the piggyback deadline is returned in the CoAP Response
+#       itself; slower Responses fall back to a new CoAP POST to the reply-to address
+#  - Blockwise transfers (RFC 7959) are left to aiocoap: incoming Block1 transfers are reassembled before
+#     render_post is called, and outgoing messages larger than the block size are sent as Block1 transfers
+#     of that block size. Responses that don't fit in 1 block are POSTed rather than piggybacked, so the
+#     Server Context doesn't have to keep Block2 state
+#
 """
 
 import logging
+import functools
 import threading
 
 import asyncio
 import aiocoap
 import aiocoap.error
 import aiocoap.resource
+import aiocoap.optiontypes
+import prometheus_client
 
 from agent import generic_usp_binding
 
 
+# The CoAP Block Sizes, indexed by their SZX (size exponent)
+BLOCK_SIZE_LIST = [16, 32, 64, 128, 256, 512, 1024]
+
+# pylint: disable-msg=no-value-for-parameter
+NUM_PIGGYBACKED_RESPONSES_METRIC = \
+    prometheus_client.Counter("number_of_coap_piggybacked_responses",
+                              "Number of USP Responses returned in the CoAP Response to the Request")
+# pylint: disable-msg=no-value-for-parameter
+NUM_DEFERRED_RESPONSES_METRIC = \
+    prometheus_client.Counter("number_of_coap_deferred_responses",
+                              "Number of USP Responses POSTed because they missed the piggyback deadline")
+
+
 if hasattr(asyncio, 'ensure_future'):
     asyncio_ensure_future = asyncio.ensure_future
 else:  # Deprecated since Python 3.4.4
@@ -109,9 +142,32 @@ class MyCoapResource(aiocoap.resource.Resource):
 
                 if self._binding.validate_payload(request.payload):
                     self._logger.debug("Incoming CoAP POST Request Payload Validated")
-                    asyncio.get_event_loop().call_soon(self._binding.push, request.payload, reply_to_addr)
-                    response = aiocoap.Message(code=aiocoap.Code.CHANGED)
-                    self._logger.info("Responding to the CoAP Request with a 2.04 Status Code")
+                    is_asyncio_native = self._binding.is_asyncio_native()
+
+                    if is_asyncio_native and self._binding.admit_request():
+                        # Handle the Request on this Event Loop instead of queueing it for a Binding Listener
+                        serialized_resp = yield from self._binding.handle_request(request.payload, reply_to_addr)
+                        if serialized_resp is not None:
+                            # Piggyback the USP Response on the CoAP Response
+                            response = aiocoap.Message(code=aiocoap.Code.CHANGED, payload=serialized_resp)
+                            self._logger.info("Responding to the CoAP Request with a 2.04 Status Code and USP Response")
+                        else:
+                            response = aiocoap.Message(code=aiocoap.Code.CHANGED)
+                            self._logger.info("Responding to the CoAP Request with a 2.04 Status Code")
+                    elif (not is_asyncio_native and not self._binding.is_congested() and
+                          self._binding.push(request.payload, reply_to_addr)):
+                        response = aiocoap.Message(code=aiocoap.Code.CHANGED)
+                        self._logger.info("Responding to the CoAP Request with a 2.04 Status Code")
+                    else:
+                        # The incoming message queue (or the in-flight Requests) is congested, respond with 5.03
+                        #  and when to retry
+                        self._logger.warning("The incoming message queue is congested, rejecting the CoAP Request")
+                        response = aiocoap.Message(code=aiocoap.Code.SERVICE_UNAVAILABLE)
+                        # aiocoap 0.3 has no max_age accessor on its Options
+                        busy_max_age = self._binding.get_busy_max_age()
+                        max_age_option = aiocoap.optiontypes.UintOption(aiocoap.OptionNumber.MAX_AGE, busy_max_age)
+                        response.opt.add_option(max_age_option)
+                        self._logger.info("Responding to the CoAP Request with a 5.03 Status Code")
                 else:
                     # Failed Payload Validation, respond with 4.00
                     self._logger.warning("The payload of the Incoming CoAP Request failed the Binding's validation")
@@ -143,98 +199,63 @@ class MyCoapResource(aiocoap.resource.Resource):
         return link
 
 
-class CoapReceivingThread(threading.Thread):
-    """A Thread that executes the AsyncIO Event Loop Processing to receive CoAP messages"""
-    def __init__(self, resource_tree, listening_port, debug=False):
-        """Initialize the CoAP Receiving Thread"""
-        threading.Thread.__init__(self, name="CoAP Receiving Thread")
+class CoapEventLoopThread(threading.Thread):
+    """A Thread that executes the long-lived AsyncIO Event Loop used to both receive and send CoAP messages"""
+    def __init__(self, event_loop, debug=False):
+        """Initialize the CoAP Event Loop Thread"""
+        threading.Thread.__init__(self, name="CoAP Event Loop Thread", daemon=True)
         self._debug = debug
-        self._resource_tree = resource_tree
-        self._listening_port = listening_port
+        self._event_loop = event_loop
         self._logger = logging.getLogger(self.__class__.__name__)
 
     def run(self):
-        """Listen for incoming CoAP messages for the Resources provided"""
-        # The server context contains the "usp" resource, which ties back to our MyCoapResource, so when
-        #  the event loop receives a message against the "usp" resource the render_XXX method in the
-        #  MyCoapResource instance is called, which will push the message onto the binding (if appropriate)
-        self._logger.debug("Creating a new AsyncIO Event Loop")
-        my_event_loop = asyncio.new_event_loop()
-        my_event_loop.set_debug(self._debug)
-        asyncio.set_event_loop(my_event_loop)
-        self._logger.info("Creating a CoAP Server Context for the Resource Tree")
-        asyncio_ensure_future(
-            aiocoap.Context.create_server_context(self._resource_tree, bind=("::", self._listening_port)))
+        """Run the AsyncIO Event Loop until it is stopped"""
+        self._event_loop.set_debug(self._debug)
+        asyncio.set_event_loop(self._event_loop)
 
         self._logger.info("Starting the AsyncIO CoAP Event Loop")
-        my_event_loop.run_forever()
+        self._event_loop.run_forever()
         self._logger.info("The AsyncIO CoAP Event Loop has Terminated")
-        my_event_loop.close()
-
-
-class CoapSendingThread(threading.Thread):
-    """A Thread that executes the AsyncIO Event Loop Processing to send a single CoAP message"""
-    def __init__(self, my_addr, serialized_msg, to_addr, debug=False):
-        """Initialize the CoAP Sending Thread"""
-        threading.Thread.__init__(self, name="CoAP Sending Thread - " + to_addr)
-        self._debug = debug
-        self._to_addr = to_addr
-        self._serialized_msg = serialized_msg
-        self._logger = logging.getLogger(self.__class__.__name__)
-
-        self._reply_to = my_addr.split("://")[1]
-        self._logger.debug("Using [%s] as the value of the reply-to URI Query Option", self._reply_to)
-
-    def run(self):
-        """Send an outgoing CoAP message to the specified CoAP Address"""
-        self._logger.debug("Creating a new AsyncIO Event Loop")
-        my_event_loop = asyncio.new_event_loop()
-        my_event_loop.set_debug(self._debug)
-        asyncio.set_event_loop(my_event_loop)
-
-        try:
-            my_event_loop.run_until_complete(self._issue_request(self._to_addr, self._serialized_msg))
-        except Exception as e:
-            print("AGENT:  CoapSendingThread exception: "+str(e))
-
-        my_event_loop.close()
-
-    @asyncio.coroutine
-    def _issue_request(self, to_addr, serialized_msg):
-        """Send a ProtoBuf Serialized USP Message to the specified CoAP URL via the POST Method"""
-        msg = aiocoap.Message(code=aiocoap.Code.POST, payload=serialized_msg)
-        # Per CoAP this is application/octet-stream
-        msg.opt.content_format = 42
-        msg.set_request_uri(to_addr + "?reply-to=" + self._reply_to)
-
-        self._logger.debug("Creating a CoAP Client Context")
-        context = yield from aiocoap.Context.create_client_context()
-
-        self._logger.info("Sending a CoAP message to the following address: %s", to_addr)
-        self._logger.debug("Payload being sent: [%s]", serialized_msg)
-        try:
-            resp = yield from context.request(msg).response
-            self._logger.info("CoAP Message Sent and [%s] Response received", resp.code)
-        except aiocoap.error.RequestTimedOut:
-            self._logger.warning("CoAP Message Sent, but no Response received due to a Timeout Error")
+        self._event_loop.close()
 
 
 class CoapUspBinding(generic_usp_binding.GenericUspBinding):
     """A COAP to USP Binding"""
-    def __init__(self, my_ip, my_endpoint_id, listen_port=5683, sending_thr_timeout=5, resource_path='usp',
-                 debug=False):
+    def __init__(self, my_ip, my_endpoint_id, listen_port=5683, send_timeout=5, resource_path='usp',
+                 debug=False, max_queue_size=1000, high_watermark=None, low_watermark=None, busy_max_age=5,
+                 block_size=1024):
         """Initialize the CoAP USP Binding for a USP Endpoint
-            - 5683 is the default CoAP port, but 5684 is the default CoAPS port"""
-        generic_usp_binding.GenericUspBinding.__init__(self)
+            - 5683 is the default CoAP port, but 5684 is the default CoAPS port
+            - send_timeout is how long (in seconds) to wait for the response to an outgoing CoAP message
+            - busy_max_age is the Max-Age (seconds) of the 5.03 responses sent while the queue is congested
+            - block_size is the largest payload (a power of 2 from 16 to 1024) sent in a single CoAP message"""
+        generic_usp_binding.GenericUspBinding.__init__(self, max_queue_size, high_watermark, low_watermark)
+
+        if block_size not in BLOCK_SIZE_LIST:
+            raise ValueError("CoAP Block Size must be one of: {}".format(BLOCK_SIZE_LIST))
+
         self._debug = debug
-        self._listen_thread = None
+        self._block_size = block_size
+        self._block_size_exp = BLOCK_SIZE_LIST.index(block_size)
+        self._busy_max_age = busy_max_age
+        self._send_timeout = send_timeout
         self._listen_port = listen_port
         self._resource_path = resource_path
         self._my_endpoint_id = my_endpoint_id
-        self._sending_thr_timeout = sending_thr_timeout
+        self._client_context_future = None
+        self._request_executor = None
+        self._request_handler_func = None
+        self._piggyback_deadline = 0
+        self._num_in_flight = 0
+        self._source_lock_dict = {}
         self._resource = MyCoapResource(self, self._debug)
         self._logger = logging.getLogger(self.__class__.__name__)
         self._my_addr = "coap://" + my_ip + ":" + str(listen_port) + "/" + resource_path
+        self._reply_to = self._my_addr.split("://")[1]
+
+        self._event_loop = asyncio.new_event_loop()
+        self._event_loop_thread = CoapEventLoopThread(self._event_loop, self._debug)
+        self._event_loop_thread.start()
 
     def validate_uri_query(self, uri_query):
         """Validate the URI-Query of the incoming CoAP message to retreive the reply-to address"""
@@ -255,12 +276,152 @@ class CoapUspBinding(generic_usp_binding.GenericUspBinding):
         # TODO: Implement payload validation
         return True
 
+    def set_request_handler(self, request_handler_func, request_executor, piggyback_deadline=0):
+        """Handle incoming Requests on the AsyncIO CoAP Event Loop (asyncio-native mode) instead of queueing them
+            - request_handler_func(payload, reply_to_addr) returns the serialized Response (or None), and is
+               run in the request_executor so the Database work doesn't block the Event Loop
+            - With a piggyback_deadline (seconds), a Response ready within the deadline is returned in the
+               CoAP Response instead of being POSTed to the reply-to address"""
+        self._request_executor = request_executor
+        self._request_handler_func = request_handler_func
+        self._piggyback_deadline = piggyback_deadline
+
+    def is_asyncio_native(self):
+        """Determine if incoming Requests are handled on the AsyncIO CoAP Event Loop"""
+        return self._request_handler_func is not None
+
+    def admit_request(self):
+        """Admit an incoming Request in asyncio-native mode, counting it as in flight (runs on the Event Loop)
+            - Returns False once max_queue_size Requests are in flight, or while congested: from reaching the
+               high watermark until the Requests in flight drop to the low watermark"""
+        if self._is_congested or self._num_in_flight >= self._max_queue_size:
+            generic_usp_binding.NUM_QUEUE_FULL_DROPS_METRIC.inc()
+            return False
+
+        self._num_in_flight += 1
+        if self._num_in_flight >= self._high_watermark:
+            self._logger.warning("The Requests in flight reached the high watermark [%s]", str(self._high_watermark))
+            self._is_congested = True
+            generic_usp_binding.NUM_QUEUE_CONGESTIONS_METRIC.inc()
+
+        return True
+
+    def _finish_request(self, _handling_future):
+        """An admitted Request has been handled (runs on the Event Loop)"""
+        self._num_in_flight -= 1
+        if self._is_congested and self._num_in_flight <= self._low_watermark:
+            self._logger.info("The Requests in flight drained to the low watermark [%s]", str(self._low_watermark))
+            self._is_congested = False
+
+    @asyncio.coroutine
+    def handle_request(self, payload, reply_to_addr):
+        """Handle an incoming Request from the AsyncIO CoAP Event Loop
+            - Returns the serialized Response if it is ready within the piggyback deadline
+            - Otherwise returns None, and the Response is POSTed to the reply-to address once it is ready
+               (without waiting for the Controller to acknowledge it)"""
+        handling_future = asyncio_ensure_future(self._run_request_handler(payload, reply_to_addr))
+        handling_future.add_done_callback(self._finish_request)
+
+        if self._piggyback_deadline > 0:
+            done_set, _pending_set = yield from asyncio.wait([handling_future], timeout=self._piggyback_deadline)
+            if handling_future in done_set:
+                serialized_resp = handling_future.result()
+                # A Response that doesn't fit in 1 block is POSTed with Block1 instead of being piggybacked
+                if serialized_resp is None or len(serialized_resp) <= self._block_size:
+                    NUM_PIGGYBACKED_RESPONSES_METRIC.inc()
+                    return serialized_resp
+
+                self._logger.info("Response is larger than a CoAP block; the Response will be POSTed")
+                self._send_deferred_response(reply_to_addr, handling_future)
+            else:
+                self._logger.info("Request not handled within the piggyback deadline; the Response will be POSTed")
+                handling_future.add_done_callback(functools.partial(self._send_deferred_response, reply_to_addr))
+
+            NUM_DEFERRED_RESPONSES_METRIC.inc()
+        else:
+            yield from handling_future
+            self._send_deferred_response(reply_to_addr, handling_future)
+
+        return None
+
+    @asyncio.coroutine
+    def _run_request_handler(self, payload, reply_to_addr):
+        """Run the Request Handler in the executor; Requests from the same address are handled in order
+            - Each address's entry is [lock, number of holders and waiters], and is dropped once that reaches 0"""
+        if reply_to_addr not in self._source_lock_dict:
+            self._source_lock_dict[reply_to_addr] = [asyncio.Lock(), 0]
+
+        source_lock_entry = self._source_lock_dict[reply_to_addr]
+        source_lock_entry[1] += 1
+
+        try:
+            with (yield from source_lock_entry[0]):
+                serialized_resp = yield from self._event_loop.run_in_executor(
+                    self._request_executor, self._request_handler_func, payload, reply_to_addr)
+        finally:
+            # Only touched on the Event Loop, so nobody can be between the count check and the removal
+            source_lock_entry[1] -= 1
+            if source_lock_entry[1] == 0:
+                del self._source_lock_dict[reply_to_addr]
+
+        return serialized_resp
+
+    def _send_deferred_response(self, reply_to_addr, handling_future):
+        """POST the Response of a handled Request to its reply-to address (runs on the Event Loop)"""
+        if handling_future.exception() is not None:
+            self._logger.error("Request Handling failed: %s", handling_future.exception())
+        elif handling_future.result() is not None:
+            asyncio_ensure_future(self._issue_request(reply_to_addr, handling_future.result()))
+
+    def get_busy_max_age(self):
+        """Retrieve how long (in seconds) a Controller should wait before retrying a rejected CoAP Request"""
+        return self._busy_max_age
+
     def send_msg(self, serialized_msg, to_addr):
-        """Send the ProtoBuf Serialized message to the provided CoAP address"""
-        self._logger.info("Starting a CoAP Sending Thread")
-        coap_send_thr = CoapSendingThread(self._my_addr, serialized_msg, to_addr, self._debug)
-        coap_send_thr.start()
-        coap_send_thr.join(self._sending_thr_timeout)
+        """Send the ProtoBuf Serialized message to the provided CoAP address without waiting for it to be sent
+            - Returns a concurrent.futures.Future of the CoAP response code (None if no response was received)"""
+        self._logger.debug("Scheduling a CoAP message on the AsyncIO CoAP Event Loop")
+        return asyncio.run_coroutine_threadsafe(self._issue_request(to_addr, serialized_msg), self._event_loop)
+
+    @asyncio.coroutine
+    def _get_client_context(self):
+        """Retrieve the pooled CoAP Client Context, creating it on first use (runs on the Event Loop)"""
+        if self._client_context_future is None:
+            self._logger.debug("Creating the pooled CoAP Client Context")
+            self._client_context_future = asyncio_ensure_future(aiocoap.Context.create_client_context())
+
+        context = yield from self._client_context_future
+        return context
+
+    @asyncio.coroutine
+    def _issue_request(self, to_addr, serialized_msg):
+        """Send a ProtoBuf Serialized USP Message to the specified CoAP URL via the POST Method
+            - A message larger than the block size is sent by aiocoap as a Block1 transfer of that block size"""
+        resp_code = None
+        self._logger.info("Sending a CoAP message to the following address: %s", to_addr)
+        self._logger.debug("Payload being sent: [%s]", serialized_msg)
+
+        try:
+            msg = aiocoap.Message(code=aiocoap.Code.POST, payload=serialized_msg)
+            # Per CoAP this is application/octet-stream
+            msg.opt.content_format = 42
+            # An invalid address raises here, and is reported like any other failure to send
+            msg.set_request_uri(to_addr + "?reply-to=" + self._reply_to)
+
+            if len(serialized_msg) > self._block_size:
+                # aiocoap slices the blocks off the first one's size (or a smaller size asked for by the receiver)
+                msg.opt.block1 = aiocoap.optiontypes.BlockOption.BlockwiseTuple(0, True, self._block_size_exp)
+
+            context = yield from self._get_client_context()
+            resp = yield from asyncio.wait_for(context.request(msg).response, self._send_timeout)
+            resp_code = resp.code
+            self._logger.info("CoAP Message Sent and [%s] Response received", resp_code)
+        except (aiocoap.error.RequestTimedOut, asyncio.TimeoutError):
+            self._logger.warning("CoAP Message Sent, but no Response received due to a Timeout Error")
+        except Exception as e:
+            self._logger.error("CoAP Message to [%s] could not be sent: %s", to_addr, e)
+
+        return resp_code
 
     def listen(self, agent_addr):
         """Listen for incoming CoAP messages"""
@@ -271,13 +432,19 @@ class CoapUspBinding(generic_usp_binding.GenericUspBinding):
                                    aiocoap.resource.WKCResource(resource_tree.get_resources_as_linkheader))
         resource_tree.add_resource((self._resource_path,), self._resource)
 
-        # An Endpoint needs a Server Context for the Resource Tree
-        self._logger.info("Starting the CoAP Receiving Thread")
+        # An Endpoint needs a Server Context for the Resource Tree; when the event loop receives a message against
+        #  the "usp" resource the render_XXX method in the MyCoapResource instance is called, which will push the
+        #  message onto the binding (if appropriate)
+        self._logger.info("Creating a CoAP Server Context for the Resource Tree on the AsyncIO CoAP Event Loop")
         self._logger.info("Listening at URL: %s", agent_addr)
-        self._listen_thread = CoapReceivingThread(resource_tree, self._listen_port, self._debug)
-        self._listen_thread.start()
+        asyncio.run_coroutine_threadsafe(
+            aiocoap.Context.create_server_context(resource_tree, bind=("::", self._listen_port)), self._event_loop)
+
+    def wait_until_closed(self):
+        """Block until the AsyncIO CoAP Event Loop has been stopped"""
+        self._event_loop_thread.join()
 
     def clean_up(self):
-        """Clean up the COAP Binding - close the event loop"""
-        # TODO: Maybe terminate the listening thread???
-        pass
+        """Clean up the COAP Binding - stop the event loop"""
+        self._event_loop.call_soon_threadsafe(self._event_loop.stop)
+        self._event_loop_thread.join(self._send_timeout)
@@ -0,0 +1,395 @@
+"""
+Copyright (c) 2016 John Blackford
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+# File Name: db_storage.py
+#
+# Description: Storage Engines for the Agent Database
+#
+# Functionality:
+#   Class: StorageEngine(object)
+#    - contains(path) / get(path) / set(path, value) / remove(path)
+#    - remove_prefix(obj_path) :: remove every parameter contained within the Object Path
+#    - scan_prefix(obj_path) :: (param path, value) pairs contained within the Object Path
+#    - resolve(path) :: expands wildcards into matching Object or Parameter Paths
+#    - get_child_names(obj_path) / iter_params(obj_path) / iter_all_params()
+#    - commit() :: persist the changes made since the last commit as 1 transaction
+#    - close()
+#   Class: DictStorageEngine(StorageEngine)
+#    - In-memory dictionary indexed by a utils.PathTrie, persisted to a JSON file
+#       through a write_ahead_log.WriteAheadLog
+#   Class: SqliteStorageEngine(StorageEngine)
+#    - SQLite table keyed (and so indexed) by the parameter path, values are JSON encoded
+#    - Prefix scans are range queries on the path column (path >= "X." AND path < "X/")
+#    - The SQLite file lives next to the JSON DB file and is seeded from it when first created
+#   Function: create_storage_engine(engine_name, db_filename, fsync_policy, compact_threshold)
+#
+"""
+
+
+import os
+import json
+import logging
+import sqlite3
+import threading
+
+from agent import utils
+from agent import write_ahead_log
+
+
+DICT_ENGINE = "dict"
+SQLITE_ENGINE = "sqlite"
+STORAGE_ENGINE_LIST = [DICT_ENGINE, SQLITE_ENGINE]
+
+
+def create_storage_engine(engine_name, db_filename, fsync_policy=write_ahead_log.FSYNC_ALWAYS,
+                          compact_threshold=1000):
+    """Create the named Storage Engine for the provided DB file"""
+    if engine_name == SQLITE_ENGINE:
+        return SqliteStorageEngine(db_filename, fsync_policy)
+
+    if engine_name != DICT_ENGINE:
+        logging.getLogger(__name__).warning("Unknown storage engine [%s], using [%s]", engine_name, DICT_ENGINE)
+
+    return DictStorageEngine(db_filename, fsync_policy, compact_threshold)
+
+
+def load_db_file(db_filename):
+    """Load the contents of a JSON formatted DB file"""
+    with open(db_filename, "r") as db_in_json:
+        try:
+            db_contents = json.load(db_in_json)
+        except ValueError as parse_err:
+            db_contents = {}
+            logging.getLogger(__name__).error("Persisted Database is NOT properly formatted JSON: %s", parse_err)
+
+    return db_contents
+
+
+class StorageEngine:
+    """The Interface that every Agent Database Storage Engine provides
+        - Object Paths end with a "." and Parameter Paths do not
+        - Wildcards ("*") in a path match any instance number segment"""
+    def contains(self, path):
+        """Determine if the Parameter Path is stored"""
+        raise NotImplementedError()
+
+    def get(self, path):
+        """Retrieve the value of the Parameter Path, or throw a KeyError"""
+        raise NotImplementedError()
+
+    def set(self, path, value):
+        """Store the value of the Parameter Path, adding it if needed"""
+        raise NotImplementedError()
+
+    def remove(self, path):
+        """Remove the Parameter Path, or throw a KeyError"""
+        raise NotImplementedError()
+
+    def remove_prefix(self, obj_path):
+        """Remove every Parameter Path contained within the Object Path, returning the removed paths"""
+        raise NotImplementedError()
+
+    def scan_prefix(self, obj_path):
+        """Iterate over the (Parameter Path, value) pairs contained within the Object Path"""
+        for param_path in self.iter_params(obj_path):
+            yield param_path, self.get(param_path)
+
+    def resolve(self, path):
+        """Resolve a Path that might contain wildcards into the list of matching stored Paths
+            - Partial Paths (ending with a ".") resolve to Object Paths
+            - Full Paths resolve to Parameter Paths"""
+        raise NotImplementedError()
+
+    def get_child_names(self, obj_path):
+        """Retrieve the names of the direct children (Parameters and Objects) of the Object Path"""
+        raise NotImplementedError()
+
+    def iter_params(self, obj_path):
+        """Iterate over all of the Parameter Paths contained within the Object Path"""
+        raise NotImplementedError()
+
+    def iter_all_params(self):
+        """Iterate over every stored Parameter Path"""
+        raise NotImplementedError()
+
+    def commit(self):
+        """Persist the changes made since the last commit as a single transaction"""
+        raise NotImplementedError()
+
+    def close(self):
+        """Persist any outstanding changes and release the underlying storage"""
+        raise NotImplementedError()
+
+
+class DictStorageEngine(StorageEngine):
+    """An in-memory Storage Engine persisted through a Write-Ahead Log into a JSON DB file"""
+    def __init__(self, db_filename, fsync_policy=write_ahead_log.FSYNC_ALWAYS, compact_threshold=1000):
+        """Load the DB file and apply any changes logged since it was written"""
+        self._pending_updates = {}
+        self._pending_deletes = set()
+        self._db = load_db_file(db_filename)
+
+        # Apply any changes made since the last snapshot, and start a fresh log from that state
+        self._wal = write_ahead_log.WriteAheadLog(db_filename, fsync_policy, compact_threshold=compact_threshold)
+        if self._wal.replay(self._db) > 0:
+            self._wal.compact(self._db)
+
+        # Index the Database by path segment
+        self._db_index = utils.PathTrie(self._db)
+
+    def contains(self, path):
+        """Determine if the Parameter Path is stored"""
+        return path in self._db
+
+    def get(self, path):
+        """Retrieve the value of the Parameter Path, or throw a KeyError"""
+        return self._db[path]
+
+    def set(self, path, value):
+        """Store the value of the Parameter Path, adding it if needed"""
+        if path not in self._db:
+            self._db_index.add(path)
+
+        self._db[path] = value
+        self._pending_deletes.discard(path)
+        self._pending_updates[path] = value
+
+    def remove(self, path):
+        """Remove the Parameter Path, or throw a KeyError"""
+        del self._db[path]
+        self._db_index.remove(path)
+        self._pending_updates.pop(path, None)
+        self._pending_deletes.add(path)
+
+    def remove_prefix(self, obj_path):
+        """Remove every Parameter Path contained within the Object Path, returning the removed paths"""
+        removed_path_list = list(self._db_index.iter_params(obj_path))
+
+        for path in removed_path_list:
+            self.remove(path)
+
+        return removed_path_list
+
+    def resolve(self, path):
+        """Resolve a Path that might contain wildcards into the list of matching stored Paths"""
+        return self._db_index.resolve(path)
+
+    def get_child_names(self, obj_path):
+        """Retrieve the names of the direct children (Parameters and Objects) of the Object Path"""
+        return self._db_index.get_child_names(obj_path)
+
+    def iter_params(self, obj_path):
+        """Iterate over all of the Parameter Paths contained within the Object Path"""
+        return self._db_index.iter_params(obj_path)
+
+    def iter_all_params(self):
+        """Iterate over every stored Parameter Path"""
+        return iter(list(self._db))
+
+    def commit(self):
+        """Append the pending changes to the Write-Ahead Log as a single transaction
+            - The log is compacted back into the DB File once it has grown large enough"""
+        updated_params = self._pending_updates
+        deleted_params = self._pending_deletes
+        self._pending_updates = {}
+        self._pending_deletes = set()
+
+        if updated_params or deleted_params:
+            if self._wal.append(updated_params, deleted_params):
+                self._wal.compact(dict(self._db))
+
+    def close(self):
+        """Persist any pending changes, compact the Write-Ahead Log into the DB File, and close it"""
+        self.commit()
+        self._wal.compact(dict(self._db))
+        self._wal.close()
+
+
+class SqliteStorageEngine(StorageEngine):
+    """A Storage Engine backed by an SQLite table, so the parameters don't all need to be held in memory"""
+    def __init__(self, db_filename, fsync_policy=write_ahead_log.FSYNC_ALWAYS):
+        """Open (creating and seeding it from the JSON DB file if needed) the SQLite DB file"""
+        self._lock = threading.RLock()
+        self._sqlite_filename = os.path.splitext(db_filename)[0] + ".sqlite3"
+        self._logger = logging.getLogger(self.__class__.__name__)
+        is_new_db = not os.path.exists(self._sqlite_filename)
+
+        self._conn = sqlite3.connect(self._sqlite_filename, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        if fsync_policy == write_ahead_log.FSYNC_NEVER:
+            self._conn.execute("PRAGMA synchronous=OFF")
+        elif fsync_policy == write_ahead_log.FSYNC_INTERVAL:
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        else:
+            self._conn.execute("PRAGMA synchronous=FULL")
+
+        # The PRIMARY KEY gives the path column its index, which the prefix range queries rely on
+        self._conn.execute("CREATE TABLE IF NOT EXISTS params (path TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        if is_new_db:
+            self._logger.info("Seeding SQLite DB [%s] from [%s]", self._sqlite_filename, db_filename)
+            db_contents = load_db_file(db_filename)
+            self._conn.executemany("INSERT INTO params (path, value) VALUES (?, ?)",
+                                   [(path, json.dumps(value)) for path, value in db_contents.items()])
+
+        self._conn.commit()
+
+    def contains(self, path):
+        """Determine if the Parameter Path is stored"""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM params WHERE path = ?", (path,)).fetchone()
+
+        return row is not None
+
+    def get(self, path):
+        """Retrieve the value of the Parameter Path, or throw a KeyError"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM params WHERE path = ?", (path,)).fetchone()
+
+        if row is None:
+            raise KeyError(path)
+
+        return json.loads(row[0])
+
+    def set(self, path, value):
+        """Store the value of the Parameter Path, adding it if needed"""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO params (path, value) VALUES (?, ?)", (path, json.dumps(value)))
+
+    def remove(self, path):
+        """Remove the Parameter Path, or throw a KeyError"""
+        with self._lock:
+            if self._conn.execute("DELETE FROM params WHERE path = ?", (path,)).rowcount == 0:
+                raise KeyError(path)
+
+    def remove_prefix(self, obj_path):
+        """Remove every Parameter Path contained within the Object Path with 1 range delete"""
+        with self._lock:
+            removed_path_list = [param_path for (param_path,) in self._scan_rows(obj_path, "path")]
+            self._conn.execute("DELETE FROM params WHERE path >= ? AND path < ?",
+                               (obj_path, self._get_upper_bound(obj_path)))
+
+        return removed_path_list
+
+    def scan_prefix(self, obj_path):
+        """Iterate over the (Parameter Path, value) pairs contained within the Object Path"""
+        for param_path, value in self._scan_rows(obj_path, "path, value"):
+            yield param_path, json.loads(value)
+
+    def resolve(self, path):
+        """Resolve a Path that might contain wildcards into the list of matching stored Paths"""
+        found_list = []
+        found_set = set()
+        is_partial_path = path.endswith(".")
+        path_parts = path.split(".")
+
+        if is_partial_path:
+            path_parts = path_parts[:-1]
+
+        # Only the part of the path before the first wildcard can be used to narrow the range scan
+        if "*" in path_parts:
+            scan_prefix = ".".join(path_parts[:path_parts.index("*")]) + "."
+        elif is_partial_path:
+            scan_prefix = path
+        else:
+            return [path] if self.contains(path) else []
+
+        for (param_path,) in self._scan_rows(scan_prefix, "path"):
+            param_parts = param_path.split(".")
+
+            if is_partial_path:
+                if len(param_parts) <= len(path_parts) or not self._is_match(path_parts, param_parts):
+                    continue
+                found_path = ".".join(param_parts[:len(path_parts)]) + "."
+            else:
+                if len(param_parts) != len(path_parts) or not self._is_match(path_parts, param_parts):
+                    continue
+                found_path = param_path
+
+            if found_path not in found_set:
+                found_set.add(found_path)
+                found_list.append(found_path)
+
+        return found_list
+
+    def get_child_names(self, obj_path):
+        """Retrieve the names of the direct children (Parameters and Objects) of the Object Path"""
+        child_name_list = []
+        child_name_set = set()
+
+        for (param_path,) in self._scan_rows(obj_path, "path"):
+            child_name = param_path[len(obj_path):].split(".")[0]
+            if child_name not in child_name_set:
+                child_name_set.add(child_name)
+                child_name_list.append(child_name)
+
+        return child_name_list
+
+    def iter_params(self, obj_path):
+        """Iterate over all of the Parameter Paths contained within the Object Path"""
+        for (param_path,) in self._scan_rows(obj_path, "path"):
+            yield param_path
+
+    def iter_all_params(self):
+        """Iterate over every stored Parameter Path"""
+        with self._lock:
+            row_list = self._conn.execute("SELECT path FROM params").fetchall()
+
+        for (param_path,) in row_list:
+            yield param_path
+
+    def commit(self):
+        """Commit the changes made since the last commit as a single SQLite transaction"""
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        """Commit any outstanding changes and close the SQLite DB file"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def _scan_rows(self, obj_path, columns):
+        """Retrieve the rows for every Parameter Path contained within the Object Path"""
+        query = "SELECT " + columns + " FROM params WHERE path >= ? AND path < ? ORDER BY path"
+
+        with self._lock:
+            row_list = self._conn.execute(query, (obj_path, self._get_upper_bound(obj_path))).fetchall()
+
+        return row_list
+
+    @staticmethod
+    def _get_upper_bound(obj_path):
+        """Retrieve the first path after every path that starts with the Object Path
+            - The "." that ends an Object Path is followed by "/", so [obj_path, upper_bound) covers the prefix"""
+        return obj_path[:-1] + chr(ord(obj_path[-1]) + 1)
+
+    @staticmethod
+    def _is_match(path_parts, param_parts):
+        """Determine if the leading segments of a Parameter Path match the (possibly wild-carded) path segments"""
+        for path_part, param_part in zip(path_parts, param_parts):
+            if path_part == "*":
+                if not param_part.isdigit():
+                    return False
+            elif path_part != param_part:
+                return False
+
+        return True
@@ -27,72 +27,202 @@
 #
 # Class Structure:
 #  - GenericUspBinding(object)
-#    - __init__(sleep_time_interval=1)
-#    - push(payload)
-#    - pop()
-#    - get_msg(timeout=-1)
+#    - __init__(max_queue_size=1000, high_watermark=None, low_watermark=None)
+#    - push(payload, reply_to_addr, ack_id=None) :: returns False if the queue is full and the payload was dropped
+#    - pop() :: never blocks
+#    - get_msg(timeout=-1) :: blocks until a message is pushed (or the timeout elapses)
+#    - ack_msg(queue_item)
+#    - is_congested()
+#    - get_queue_depth()
 #    - not_my_msg(payload)
 #    - send_msg(serialized_msg, to_addr)
 #    - listen()
 #    - clean_up()
 #
+#  - The incoming message queue is bounded, and consumers are woken by a condition variable as soon as a
+#     message is pushed; expired Queue Items are discarded lazily when they reach the front of the queue
+#  - The queue is congested from reaching its high watermark until draining to its low watermark; the
+#     Protocol-specific USP Bindings apply backpressure via _on_queue_congested() and _on_queue_drained()
+#  - Once a Queue Item has been processed (or has expired) it is acknowledged via ack_msg(), which lets the
+#     Protocol-specific USP Bindings acknowledge the underlying message using the Queue Item's ack_id
+#
 """
 
 
 import time
 import logging
+import threading
 import collections
+import prometheus_client
+
+
+# pylint: disable-msg=no-value-for-parameter
+INCOMING_QUEUE_DEPTH_GAUGE_METRIC = \
+    prometheus_client.Gauge("usp_binding_incoming_queue_depth",
+                            "Number of Queue Items waiting in the incoming message queues")
+# pylint: disable-msg=no-value-for-parameter
+INCOMING_QUEUE_WAIT_SUMMARY_METRIC = \
+    prometheus_client.Summary("usp_binding_incoming_queue_wait_seconds",
+                              "Time spent by Queue Items waiting in the incoming message queues")
+# pylint: disable-msg=no-value-for-parameter
+NUM_QUEUE_FULL_DROPS_METRIC = \
+    prometheus_client.Counter("number_of_usp_binding_queue_full_drops",
+                              "Number of incoming messages dropped because the incoming message queue was full")
+# pylint: disable-msg=no-value-for-parameter
+NUM_QUEUE_EXPIRED_DROPS_METRIC = \
+    prometheus_client.Counter("number_of_usp_binding_queue_expired_drops",
+                              "Number of incoming messages dropped because they expired in the incoming message queue")
+# pylint: disable-msg=no-value-for-parameter
+NUM_QUEUE_CONGESTIONS_METRIC = \
+    prometheus_client.Counter("number_of_usp_binding_queue_congestions",
+                              "Number of times an incoming message queue reached its high watermark")
 
 
 class GenericUspBinding:
     """A Generic USP Binding class to be used by specific protocol USP Binding classes"""
-    def __init__(self, sleep_time_interval=1):
-        """Initialize the Generic USP Binding"""
+    def __init__(self, max_queue_size=1000, high_watermark=None, low_watermark=None):
+        """Initialize the Generic USP Binding
+            - The watermarks default to 80% and 50% of the maximum queue size"""
         self._incoming_queue = collections.deque()
-        self._sleep_time_interval = sleep_time_interval
+        self._max_queue_size = max_queue_size
+        self._high_watermark = high_watermark if high_watermark is not None else int(max_queue_size * 0.8)
+        self._low_watermark = low_watermark if low_watermark is not None else int(max_queue_size * 0.5)
+        self._is_congested = False
+        self._queue_cond = threading.Condition()
         self._logger = logging.getLogger(self.__class__.__name__)
 
-    def push(self, payload, reply_to_addr):
-        """Push the provided message payload onto the end of the incoming message queue"""
-        self._logger.debug("Pushing a Queue Item onto the end of the incoming message queue")
-        self._incoming_queue.append(ExpiringQueueItem(payload, reply_to_addr))
+    def push(self, payload, reply_to_addr, ack_id=None):
+        """Push the provided message payload onto the end of the incoming message queue
+            - Returns False (dropping the payload) if the queue is full"""
+        became_congested = False
+
+        with self._queue_cond:
+            if len(self._incoming_queue) >= self._max_queue_size:
+                self._logger.warning("The incoming message queue is full, dropping the Queue Item")
+                NUM_QUEUE_FULL_DROPS_METRIC.inc()
+                return False
+
+            self._logger.debug("Pushing a Queue Item onto the end of the incoming message queue")
+            self._incoming_queue.append(ExpiringQueueItem(payload, reply_to_addr, ack_id=ack_id))
+            INCOMING_QUEUE_DEPTH_GAUGE_METRIC.inc()
+            self._queue_cond.notify()
+
+            if not self._is_congested and len(self._incoming_queue) >= self._high_watermark:
+                self._logger.warning("The incoming message queue reached its high watermark [%s]",
+                                     str(self._high_watermark))
+                self._is_congested = True
+                became_congested = True
+                NUM_QUEUE_CONGESTIONS_METRIC.inc()
+
+        # The hooks are called without holding the lock, as they might do network I/O
+        if became_congested:
+            self._on_queue_congested()
+
+        return True
 
     def pop(self):
-        """Pop the next payload off of the front of the incoming message queue"""
-        queue_item = None
+        """Pop the next payload off of the front of the incoming message queue (without waiting)"""
+        expired_item_list = []
 
-        if self._incoming_queue:
-            queue_item = self._incoming_queue.popleft()
-            if queue_item.is_expired():
-                queue_item = None
-                self._logger.info("Popped an expired Queue Item, try again!")
-            else:
-                self._logger.debug("Popped the next Queue Item from the front of the incoming message queue")
+        with self._queue_cond:
+            queue_item = self._pop_unexpired(expired_item_list)
+            became_drained = self._check_drained()
+
+        self._ack_expired(expired_item_list)
+        if became_drained:
+            self._on_queue_drained()
 
         return queue_item
 
     def get_msg(self, timeout=-1):
         """
-          Retrieve the next incoming Queue Item from the Queue
+          Retrieve the next incoming Queue Item from the Queue, waiting for one to be pushed
             NOTE: timeout is measured in seconds
         """
-        queue_item = None
-        sleep_time = 0
+        expired_item_list = []
+
+        with self._queue_cond:
+            queue_item = self._pop_unexpired(expired_item_list)
+
+            if timeout > 0:
+                deadline = time.monotonic() + timeout
+                while queue_item is None:
+                    remaining_time = deadline - time.monotonic()
+                    if remaining_time <= 0:
+                        break
 
-        if timeout > 0:
-            while queue_item is None and sleep_time < timeout:
-                time.sleep(self._sleep_time_interval)
-                sleep_time += self._sleep_time_interval
-                queue_item = self.pop()
-        else:
-            queue_item = self.pop()
+                    self._queue_cond.wait(remaining_time)
+                    queue_item = self._pop_unexpired(expired_item_list)
+
+            became_drained = self._check_drained()
+
+        self._ack_expired(expired_item_list)
+        if became_drained:
+            self._on_queue_drained()
 
         return queue_item
 
+    def ack_msg(self, queue_item):
+        """Acknowledge that the Queue Item has been processed (and any Response sent)
+            - Protocol-specific USP Bindings that acknowledge their incoming messages override this"""
+        pass
+
+    def is_congested(self):
+        """Determine if the incoming message queue has reached its high watermark (and not yet drained to its low)"""
+        return self._is_congested
+
+    def get_queue_depth(self):
+        """Retrieve the number of Queue Items in the incoming message queue"""
+        return len(self._incoming_queue)
+
     def not_my_msg(self, queue_item):
         """Retrieved the wrong message; Push the payload onto the end of the incoming message queue"""
         self._logger.debug("Not my Message; Re-Pushing a Queue Item onto the end of the incoming message queue")
-        self._incoming_queue.append(queue_item)
+        with self._queue_cond:
+            # The Queue Item was already admitted, so it is re-queued even if the queue has since filled up
+            self._incoming_queue.append(queue_item)
+            INCOMING_QUEUE_DEPTH_GAUGE_METRIC.inc()
+            self._queue_cond.notify()
+
+    def _pop_unexpired(self, expired_item_list):
+        """Pop the first unexpired Queue Item, collecting the expired ones in front of it (caller holds the lock)"""
+        while self._incoming_queue:
+            queue_item = self._incoming_queue.popleft()
+            INCOMING_QUEUE_DEPTH_GAUGE_METRIC.dec()
+            INCOMING_QUEUE_WAIT_SUMMARY_METRIC.observe(queue_item.get_age())
+
+            if not queue_item.is_expired():
+                self._logger.debug("Popped the next Queue Item from the front of the incoming message queue")
+                return queue_item
+
+            self._logger.info("Discarded an expired Queue Item")
+            NUM_QUEUE_EXPIRED_DROPS_METRIC.inc()
+            expired_item_list.append(queue_item)
+
+        return None
+
+    def _ack_expired(self, expired_item_list):
+        """Acknowledge the discarded expired Queue Items, as they will never be processed"""
+        for queue_item in expired_item_list:
+            self.ack_msg(queue_item)
+
+    def _check_drained(self):
+        """Leave the congested state once the queue has drained to its low watermark (caller holds the lock)"""
+        if self._is_congested and len(self._incoming_queue) <= self._low_watermark:
+            self._logger.info("The incoming message queue drained to its low watermark [%s]",
+                              str(self._low_watermark))
+            self._is_congested = False
+            return True
+
+        return False
+
+    def _on_queue_congested(self):
+        """Hook for the Protocol-specific USP Binding: the incoming message queue reached its high watermark"""
+        pass
+
+    def _on_queue_drained(self):
+        """Hook for the Protocol-specific USP Binding: the incoming message queue drained to its low watermark"""
+        pass
 
     def send_msg(self, serialized_msg, to_addr):
         """Send the ProtoBuf Serialized Message to the provided address via the Protocol-specific USP Binding"""
@@ -109,9 +239,11 @@ class GenericUspBinding:
 
 class ExpiringQueueItem:
     """A Queue Item that has a TTL and a Payload"""
-    def __init__(self, payload, reply_to_addr, ttl=60):
-        """Initialize the ExpiringQueueItem with the payload and a TTL (default of 60 seconds)"""
+    def __init__(self, payload, reply_to_addr, ttl=60, ack_id=None):
+        """Initialize the ExpiringQueueItem with the payload and a TTL (default of 60 seconds)
+            - The ack_id identifies the underlying message to the Protocol-specific USP Binding"""
         self._ttl = ttl
+        self._ack_id = ack_id
         self._payload = payload
         self._create_time = time.time()
         self._reply_to_addr = reply_to_addr
@@ -125,6 +257,10 @@ class ExpiringQueueItem:
 
         return False
 
+    def get_age(self):
+        """Retrieve the number of seconds since the Queue Item was created"""
+        return time.time() - self._create_time
+
     def get_payload(self):
         """Retrieve the Payload"""
         return self._payload
@@ -132,3 +268,7 @@ class ExpiringQueueItem:
     def get_reply_to_addr(self):
         """Retrieve the Reply to Address"""
         return self._reply_to_addr
+
+    def get_ack_id(self):
+        """Retrieve the Acknowledgement ID"""
+        return self._ack_id
@@ -25,8 +25,10 @@ SOFTWARE.
 #
 # Functionality:
 #   Class: USPRequestHandler(object)
-#    - __init__(agent_endpoint_id, agent_database, service_map=None, debug=False)
+#    - __init__(agent_endpoint_id, agent_database, service_map=None, debug=False, get_resp_cache=False)
 #    - handle_request(msg_payload)
+#  - With get_resp_cache, the serialized GetResp body of each (ordered) list of Get paths is cached against the DB
+#     version vector of the touched subtrees, so repeat polls only re-encode the Header and the USP Record
 #   Class: ProtocolViolationError(Exception)
 #   Class: ProtocolValidationError(Exception)
 #
@@ -39,21 +41,41 @@ import prometheus_client
 
 from agent import utils
 from agent import agent_db
+from agent import supported_dm
 from agent import usp_msg_pb2 as usp_msg
 from agent import usp_record_pb2 as usp_record
 
 
 TAKE_PICTURE_CAMERA_OP = "Device.Services.HomeAutomation.1.Camera.1.TakePicture()"
 
+# The most sets of Get paths held in the GetResp Cache (it is emptied when full)
+GET_RESP_CACHE_SIZE = 128
+
 # pylint: disable-msg=no-value-for-parameter
 NUM_GET_MSGS_METRIC = \
     prometheus_client.Counter("number_of_usp_get_msgs",
                               "Number of USP Get Messages")
 # pylint: disable-msg=no-value-for-parameter
+NUM_GET_INSTANCES_MSGS_METRIC = \
+    prometheus_client.Counter("number_of_usp_get_instances_msgs",
+                              "Number of USP GetInstances Messages")
+# pylint: disable-msg=no-value-for-parameter
+NUM_GET_SUPPORTED_DM_MSGS_METRIC = \
+    prometheus_client.Counter("number_of_usp_get_supported_dm_msgs",
+                              "Number of USP GetSupportedDM Messages")
+# pylint: disable-msg=no-value-for-parameter
 NUM_SET_MSGS_METRIC = \
     prometheus_client.Counter("number_of_usp_set_msgs",
                               "Number of USP Set Messages")
 # pylint: disable-msg=no-value-for-parameter
+NUM_ADD_MSGS_METRIC = \
+    prometheus_client.Counter("number_of_usp_add_msgs",
+                              "Number of USP Add Messages")
+# pylint: disable-msg=no-value-for-parameter
+NUM_DELETE_MSGS_METRIC = \
+    prometheus_client.Counter("number_of_usp_delete_msgs",
+                              "Number of USP Delete Messages")
+# pylint: disable-msg=no-value-for-parameter
 NUM_OPERATE_MSGS_METRIC = \
     prometheus_client.Counter("number_of_usp_operate_msgs",
                               "Number of USP Operate Messages")
@@ -61,16 +83,27 @@ NUM_OPERATE_MSGS_METRIC = \
 NUM_UNKNOWN_MSGS_METRIC = \
     prometheus_client.Counter("number_of_usp_unknown_msgs",
                               "Number of Unknown USP Messages")
+# pylint: disable-msg=no-value-for-parameter
+NUM_GET_RESP_CACHE_HITS_METRIC = \
+    prometheus_client.Counter("number_of_usp_get_resp_cache_hits",
+                              "Number of USP Get Messages answered from the GetResp Cache")
+# pylint: disable-msg=no-value-for-parameter
+NUM_GET_RESP_CACHE_MISSES_METRIC = \
+    prometheus_client.Counter("number_of_usp_get_resp_cache_misses",
+                              "Number of USP Get Messages processed while the GetResp Cache was enabled")
 
 
 class UspRequestHandler:
     """A USP Message Handler: to be used by a USP Agent"""
-    def __init__(self, endpoint_id, agent_database, service_map=None, debug=False):
+    def __init__(self, endpoint_id, agent_database, service_map=None, debug=False, get_resp_cache=False):
         """Initialize the USP Request Handler"""
         self._debug = debug
+        self._get_resp_cache = {} if get_resp_cache else None
         self._id = endpoint_id
         self._db = agent_database
         self._service_map = service_map
+        self._supported_dm = None
+        self._supported_dm_resp_cache = {}
         self._logger = logging.getLogger(self.__class__.__name__)
 
     def handle_request(self, msg_payload):
@@ -85,7 +118,12 @@ class UspRequestHandler:
             self._logger.info("Received a [%s] Request",
                               req_msg.body.request.WhichOneof("req_type"))
 
-            resp_msg, resp_record = self._process_request(req_record, req_msg)
+            if self._get_resp_cache is not None and self._is_get_request(req_msg):
+                resp_msg, serialized_resp_record = self._process_get_with_cache(req_record, req_msg)
+            else:
+                resp_msg, resp_record = self._process_request(req_record, req_msg)
+                serialized_resp_record = resp_record.SerializeToString()
+
             if self._debug:
                 print("Outgoing Response:\n{}".format(resp_msg))
         except ProtocolValidationError as err:
@@ -93,7 +131,7 @@ class UspRequestHandler:
             self._logger.error("%s", err_msg)
             raise ProtocolViolationError(err_msg)
 
-        return req_msg, req_record, resp_msg, resp_record.SerializeToString()
+        return req_msg, req_record, resp_msg, serialized_resp_record
 
     def _handle_usp_record(self, msg_payload):
         """Deserialize the USP Record in the Incoming Request"""
@@ -164,7 +202,6 @@ class UspRequestHandler:
     def _process_request(self, req_as_record, req_as_msg):
         """Processing the incoming Message and return a Response"""
         to_id = req_as_record.from_id
-        resp_record = usp_record.Record()
         err_msg = "Message Failure: Request body does not match Header msg_type"
         usp_err_msg = utils.UspErrMsg(req_as_msg.header.msg_id)
         resp_msg = usp_err_msg.generate_error(9000, err_msg)
@@ -174,11 +211,31 @@ class UspRequestHandler:
             if req_as_msg.body.request.WhichOneof("req_type") == "get":
                 NUM_GET_MSGS_METRIC.inc()
                 resp_msg = self._process_get(req_as_msg)
+        elif req_as_msg.header.msg_type == usp_msg.Header.GET_SUPPORTED_DM:
+            # Validate that the Request body matches the Header's msg_type
+            if req_as_msg.body.request.WhichOneof("req_type") == "get_supported_dm":
+                NUM_GET_SUPPORTED_DM_MSGS_METRIC.inc()
+                resp_msg = self._process_get_supported_dm(req_as_msg)
+        elif req_as_msg.header.msg_type == usp_msg.Header.GET_INSTANCES:
+            # Validate that the Request body matches the Header's msg_type
+            if req_as_msg.body.request.WhichOneof("req_type") == "get_instances":
+                NUM_GET_INSTANCES_MSGS_METRIC.inc()
+                resp_msg = self._process_get_instances(req_as_msg)
         elif req_as_msg.header.msg_type == usp_msg.Header.SET:
             # Validate that the Request body matches the Header's msg_type
             if req_as_msg.body.request.WhichOneof("req_type") == "set":
                 NUM_SET_MSGS_METRIC.inc()
                 resp_msg = self._process_set(req_as_msg)
+        elif req_as_msg.header.msg_type == usp_msg.Header.ADD:
+            # Validate that the Request body matches the Header's msg_type
+            if req_as_msg.body.request.WhichOneof("req_type") == "add":
+                NUM_ADD_MSGS_METRIC.inc()
+                resp_msg = self._process_add(req_as_msg)
+        elif req_as_msg.header.msg_type == usp_msg.Header.DELETE:
+            # Validate that the Request body matches the Header's msg_type
+            if req_as_msg.body.request.WhichOneof("req_type") == "delete":
+                NUM_DELETE_MSGS_METRIC.inc()
+                resp_msg = self._process_delete(req_as_msg)
         elif req_as_msg.header.msg_type == usp_msg.Header.OPERATE:
             # Validate that the Request body matches the Header's msg_type
             if req_as_msg.body.request.WhichOneof("req_type") == "operate":
@@ -189,14 +246,70 @@ class UspRequestHandler:
             resp_msg = usp_err_msg.generate_error(9000, err_msg)
             NUM_UNKNOWN_MSGS_METRIC.inc()
 
-        # Wrap the USP Message response into a USP Record
+        resp_record = self._wrap_in_record(to_id, resp_msg.SerializeToString())
+
+        return resp_msg, resp_record
+
+    def _wrap_in_record(self, to_id, serialized_resp_msg):
+        """Wrap the serialized USP Message response into a USP Record"""
+        resp_record = usp_record.Record()
         resp_record.version = "1.0"
         resp_record.to_id = to_id
         resp_record.from_id = self._id
         resp_record.payload_security = usp_record.Record.PLAINTEXT
-        resp_record.no_session_context.payload = resp_msg.SerializeToString()
+        resp_record.no_session_context.payload = serialized_resp_msg
+
+        return resp_record
+
+    def _is_get_request(self, req_as_msg):
+        """Determine if the incoming Message is a (well-formed) Get Request"""
+        return (req_as_msg.header.msg_type == usp_msg.Header.GET and
+                req_as_msg.body.request.WhichOneof("req_type") == "get")
+
+    def _process_get_with_cache(self, req_as_record, req_as_msg):
+        """Process an incoming Get using the GetResp Cache, and return the Response and its serialized USP Record
+            - The cached GetResp body is spliced behind a freshly encoded Header (protobuf fields concatenate)
+            - Paths with dynamic (computed on read) values or errors are never cached"""
+        NUM_GET_MSGS_METRIC.inc()
+        # The paths are kept in request order, since the GetResp lists its results in that order
+        cache_key = tuple(req_as_msg.body.request.get.param_paths)
+        # Retrieve the version vector before processing, so a concurrent write can only cause a cache miss
+        version_vector = self._db.get_version_vector(cache_key)
+        cached_entry = self._get_resp_cache.get(cache_key)
+
+        if cached_entry is not None and cached_entry[0] == version_vector:
+            NUM_GET_RESP_CACHE_HITS_METRIC.inc()
+            _version_vector, cached_resp_msg, serialized_body = cached_entry
+            resp_msg = usp_msg.Msg()
+            resp_msg.CopyFrom(cached_resp_msg)
+            resp_msg.header.msg_id = req_as_msg.header.msg_id
+        else:
+            NUM_GET_RESP_CACHE_MISSES_METRIC.inc()
+            resp_msg = self._process_get(req_as_msg)
+            serialized_body = usp_msg.Msg(body=resp_msg.body).SerializeToString()
 
-        return resp_msg, resp_record
+            if self._is_get_resp_cacheable(cache_key):
+                if len(self._get_resp_cache) >= GET_RESP_CACHE_SIZE:
+                    self._get_resp_cache.clear()
+                self._get_resp_cache[cache_key] = (version_vector, resp_msg, serialized_body)
+
+        header_msg = usp_msg.Msg()
+        header_msg.header.msg_id = req_as_msg.header.msg_id
+        header_msg.header.msg_type = usp_msg.Header.GET_RESP
+        resp_record = self._wrap_in_record(req_as_record.from_id, header_msg.SerializeToString() + serialized_body)
+
+        return resp_msg, resp_record.SerializeToString()
+
+    def _is_get_resp_cacheable(self, param_path_list):
+        """Determine if the GetResp for the paths only changes when the DB version vector does"""
+        try:
+            for param_path in param_path_list:
+                if self._db.has_dynamic_values(param_path):
+                    return False
+        except agent_db.NoSuchPathError:
+            return False
+
+        return True
 
     def _process_get(self, req_msg):
         """Process an incoming Get and generate a GetResp"""
@@ -215,24 +328,15 @@ class UspRequestHandler:
 
             try:
                 resolved_path_list = []
-                partial_path, param_name = self._split_path(req_path)
-                self._logger.debug("Split into [%s] and [%s]", partial_path, param_name)
-                affected_path_list = self._get_affected_paths_for_get(partial_path)
+                resolved_params_dict = self._db.get_resolved_params(req_path)
+                self._logger.info("Found [%s] Affected Paths for %s", str(len(resolved_params_dict)), req_path)
 
-                for affected_path in affected_path_list:
-                    self._logger.debug("Requested Path [%s] resolved to: %s", req_path, affected_path)
+                for resolved_path, param_value_dict in resolved_params_dict.items():
                     resolved_path_result = usp_msg.GetResp.ResolvedPathResult()
-                    resolved_path_result.resolved_path = affected_path
+                    resolved_path_result.resolved_path = resolved_path
 
-                    if param_name is None:
-                        items = self._db.find_params(affected_path)
-
-                        for item in items:
-                            param_path = self._diff_paths(affected_path, item)
-                            resolved_path_result.result_params[param_path] = str(self._db.get(item))
-                    else:
-                        param = affected_path + param_name
-                        resolved_path_result.result_params[param_name] = str(self._db.get(param))
+                    for param_path, value in param_value_dict.items():
+                        resolved_path_result.result_params[param_path] = str(value)
 
                     resolved_path_list.append(resolved_path_result)
 
@@ -248,6 +352,121 @@ class UspRequestHandler:
 
         return resp_msg
 
+    def _process_get_supported_dm(self, req_msg):
+        """Process an incoming GetSupportedDM and generate a GetSupportedDMResp
+            - Each RequestedObjectResult is cached (serialized) per obj_path and set of flags, until the
+               Supported Data Model is reloaded"""
+        resp_msg = usp_msg.Msg()
+        path_result_list = []
+        get_supported_dm = req_msg.body.request.get_supported_dm
+        compiled_dm = self._db.get_supported_dm()
+        self._logger.info("Processing a GetSupportedDM Request...")
+
+        # Populate the Response's Header information
+        resp_msg.header.msg_id = req_msg.header.msg_id
+        resp_msg.header.msg_type = usp_msg.Header.GET_SUPPORTED_DM_RESP
+
+        if compiled_dm is not self._supported_dm:
+            self._supported_dm = compiled_dm
+            self._supported_dm_resp_cache = {}
+
+        # Process the Object Paths in the GetSupportedDM Request
+        for req_path in get_supported_dm.obj_paths:
+            cache_key = (req_path, get_supported_dm.first_level_only, get_supported_dm.return_commands,
+                         get_supported_dm.return_events, get_supported_dm.return_params)
+
+            if cache_key not in self._supported_dm_resp_cache:
+                path_result = self._build_supported_dm_result(compiled_dm, req_path, get_supported_dm)
+                self._supported_dm_resp_cache[cache_key] = path_result.SerializeToString()
+
+            path_result = usp_msg.GetSupportedDMResp.RequestedObjectResult()
+            path_result.ParseFromString(self._supported_dm_resp_cache[cache_key])
+            path_result_list.append(path_result)
+
+        resp_msg.body.response.get_supported_dm_resp.req_obj_results.extend(path_result_list)
+
+        return resp_msg
+
+    def _build_supported_dm_result(self, compiled_dm, req_path, get_supported_dm):
+        """Build the RequestedObjectResult of a GetSupportedDM from the Supported Data Model"""
+        path_result = usp_msg.GetSupportedDMResp.RequestedObjectResult()
+        path_result.req_obj_path = req_path
+        supported_obj_list = None
+
+        if req_path.endswith("."):
+            supported_obj_list = compiled_dm.get_supported_objects(req_path, get_supported_dm.first_level_only)
+
+        if supported_obj_list is None:
+            self._logger.warning("Invalid Path encountered: %s", req_path)
+            path_result.err_code = 11002
+            path_result.err_msg = "Invalid Path: " + req_path + " is not a part of the supported data model"
+        else:
+            for supported_obj in supported_obj_list:
+                obj_result = path_result.supported_objs.add()
+                obj_result.supported_obj_path = supported_obj.obj_path
+                obj_result.is_multi_instance = supported_obj.is_multi_instance
+
+                if supported_obj.is_multi_instance:
+                    obj_result.access = usp_msg.GetSupportedDMResp.OBJ_ADD_DELETE
+                else:
+                    obj_result.access = usp_msg.GetSupportedDMResp.OBJ_READ_ONLY
+
+                if get_supported_dm.return_params:
+                    for param_name, access in supported_obj.param_access_dict.items():
+                        param_result = obj_result.supported_params.add()
+                        param_result.param_name = param_name
+                        if access == supported_dm.READ_WRITE:
+                            param_result.access = usp_msg.GetSupportedDMResp.PARAM_READ_WRITE
+                        else:
+                            param_result.access = usp_msg.GetSupportedDMResp.PARAM_READ_ONLY
+
+                if get_supported_dm.return_commands:
+                    for command_name in supported_obj.command_list:
+                        obj_result.supported_commands.add().command_name = command_name
+
+                if get_supported_dm.return_events:
+                    for event_name in supported_obj.event_list:
+                        obj_result.supported_events.add().event_name = event_name
+
+        return path_result
+
+    def _process_get_instances(self, req_msg):
+        """Process an incoming GetInstances and generate a GetInstancesResp"""
+        resp_msg = usp_msg.Msg()
+        path_result_list = []
+        first_level_only = req_msg.body.request.get_instances.first_level_only
+        self._logger.info("Processing a GetInstances Request...")
+
+        # Populate the Response's Header information
+        resp_msg.header.msg_id = req_msg.header.msg_id
+        resp_msg.header.msg_type = usp_msg.Header.GET_INSTANCES_RESP
+
+        # Process the Object Paths in the GetInstances Request
+        for req_path in req_msg.body.request.get_instances.obj_paths:
+            path_result = usp_msg.GetInstancesResp.RequestedPathResult()
+            path_result.requested_path = req_path
+
+            try:
+                curr_inst_list = []
+
+                for inst_path in self._db.get_instances(req_path, first_level_only):
+                    curr_inst = usp_msg.GetInstancesResp.CurrInstance()
+                    curr_inst.instantiated_obj_path = inst_path
+                    curr_inst_list.append(curr_inst)
+
+                self._logger.info("Found [%s] Instances for %s", str(len(curr_inst_list)), req_path)
+                path_result.curr_insts.extend(curr_inst_list)
+            except agent_db.NoSuchPathError:
+                self._logger.warning("Invalid Path encountered: %s", req_path)
+                path_result.err_code = 11002
+                path_result.err_msg = "Invalid Path: " + req_path + " is not a part of the supported data model"
+
+            path_result_list.append(path_result)
+
+        resp_msg.body.response.get_instances_resp.req_path_results.extend(path_result_list)
+
+        return resp_msg
+
     def _process_set(self, req_msg):
         """Process an incoming Set and generate a SetResp"""
         resp_msg = usp_msg.Msg()
@@ -270,9 +489,8 @@ class UspRequestHandler:
             resp_msg = usp_err_msg.generate_error(9000, err_msg)
             resp_msg.body.error.param_errs.extend(set_failure_param_err_list)
         else:
-            # Process the Updates against the database
-            for param_path in path_to_set_dict:
-                self._db.update(param_path, path_to_set_dict[param_path])
+            # Process the Updates against the database as 1 transaction
+            self._db.update_many(path_to_set_dict)
 
             resp_msg.body.response.set_resp.updated_obj_results.extend(update_obj_result_list)
 
@@ -419,6 +637,178 @@ class UspRequestHandler:
             set_failure_param_err.err_msg = sv_err.get_error_message()
             set_failure_param_err_list.append(set_failure_param_err)
 
+    def _process_add(self, req_msg):
+        """Process an incoming Add and generate an AddResp
+            - Every CreateObject is validated, and all of the instances created, within a single Database batch
+            - If the Database fails part way through, nothing is created and an Error is sent"""
+        try:
+            with self._db.batch():
+                resp_msg = self._add_objects(req_msg)
+        except agent_db.NoSuchPathError as err:
+            self._logger.warning("Add failed, the Database changes were rolled back: %s", err)
+            usp_err_msg = utils.UspErrMsg(req_msg.header.msg_id)
+            resp_msg = usp_err_msg.generate_error(9000, "Add failed, no Objects were created: {}".format(err))
+
+        return resp_msg
+
+    def _add_objects(self, req_msg):
+        """Validate the CreateObjects of an Add and create the instances (caller holds a Database batch)"""
+        resp_msg = usp_msg.Msg()
+        create_list = []
+        created_obj_result_list = []
+        add_failure_param_err_list = []
+        allow_partial = req_msg.body.request.add.allow_partial
+        self._logger.info("Processing an Add Request...")
+
+        # Populate the Response's Header information
+        resp_msg.header.msg_id = req_msg.header.msg_id
+        resp_msg.header.msg_type = usp_msg.Header.ADD_RESP
+
+        # Validate each CreateObject
+        for create_obj in req_msg.body.request.add.create_objs:
+            try:
+                table_path_list = self._get_affected_paths_for_add(create_obj.obj_path)
+                param_value_dict, param_err_list = self._validate_add_params(create_obj)
+                create_list.append((create_obj.obj_path, table_path_list, param_value_dict, param_err_list, None))
+            except AddValidationError as av_err:
+                if allow_partial:
+                    created_obj_result = usp_msg.AddResp.CreatedObjectResult()
+                    created_obj_result.requested_path = create_obj.obj_path
+                    created_obj_result.oper_status.oper_failure.err_code = av_err.get_error_code()
+                    created_obj_result.oper_status.oper_failure.err_msg = av_err.get_error_message()
+                    create_list.append((create_obj.obj_path, [], {}, [], created_obj_result))
+                else:
+                    add_failure_param_err = usp_msg.Error.ParamError()
+                    add_failure_param_err.param_path = create_obj.obj_path
+                    add_failure_param_err.err_code = av_err.get_error_code()
+                    add_failure_param_err.err_msg = av_err.get_error_message()
+                    add_failure_param_err_list.append(add_failure_param_err)
+
+        # Finished with all validation, process the errors or create the instances
+        if add_failure_param_err_list:
+            usp_err_msg = utils.UspErrMsg(req_msg.header.msg_id)
+            err_msg = "Invalid Object Found, Allow Partial Updates = False :: Fail the entire Add"
+            resp_msg = usp_err_msg.generate_error(9000, err_msg)
+            resp_msg.body.error.param_errs.extend(add_failure_param_err_list)
+        else:
+            for requested_path, table_path_list, param_value_dict, param_err_list, failure_result in create_list:
+                if failure_result is not None:
+                    created_obj_result_list.append(failure_result)
+
+                for table_path in table_path_list:
+                    inst_num = self._db.insert(table_path, param_value_dict)
+                    created_obj_result = usp_msg.AddResp.CreatedObjectResult()
+                    created_obj_result.requested_path = requested_path
+                    oper_success = created_obj_result.oper_status.oper_success
+                    oper_success.instantiated_path = table_path + str(inst_num) + "."
+                    oper_success.param_errs.extend(param_err_list)
+                    created_obj_result_list.append(created_obj_result)
+
+            resp_msg.body.response.add_resp.created_obj_results.extend(created_obj_result_list)
+
+        return resp_msg
+
+    def _validate_add_params(self, create_obj):
+        """Validate the parameters of a CreateObject
+            - Returns the values to create the instance with and the errors for the non-required parameters"""
+        param_value_dict = {}
+        param_err_list = []
+
+        for param_setting in create_obj.param_settings:
+            err_msg = ""
+            param_path = create_obj.obj_path + "{i}." + param_setting.param
+
+            try:
+                if any(part.isdigit() or part == "*" for part in param_setting.param.split(".")):
+                    err_msg = "Parameter is not a part of the new instance"
+                elif self._db.is_param_writable(param_path):
+                    param_value_dict[param_setting.param] = param_setting.value
+                else:
+                    err_msg = "Parameter is not writable"
+            except agent_db.NoSuchPathError:
+                err_msg = "Parameter does not exist"
+
+            if err_msg:
+                if param_setting.required:
+                    raise AddValidationError(9000, "Required Parameter {} failed: {}".format(param_setting.param,
+                                                                                           err_msg))
+
+                param_err = usp_msg.AddResp.ParameterError()
+                param_err.param = param_setting.param
+                param_err.err_code = 9000
+                param_err.err_msg = err_msg
+                param_err_list.append(param_err)
+
+        return param_value_dict, param_err_list
+
+    def _process_delete(self, req_msg):
+        """Process an incoming Delete and generate a DeleteResp
+            - Every obj_path is validated, and all of the instances deleted, within a single Database batch
+            - If the Database fails part way through, nothing is deleted and an Error is sent"""
+        try:
+            with self._db.batch():
+                resp_msg = self._delete_objects(req_msg)
+        except agent_db.NoSuchPathError as err:
+            self._logger.warning("Delete failed, the Database changes were rolled back: %s", err)
+            usp_err_msg = utils.UspErrMsg(req_msg.header.msg_id)
+            resp_msg = usp_err_msg.generate_error(9000, "Delete failed, no Objects were deleted: {}".format(err))
+
+        return resp_msg
+
+    def _delete_objects(self, req_msg):
+        """Validate the obj_paths of a Delete and delete the instances (caller holds a Database batch)"""
+        resp_msg = usp_msg.Msg()
+        delete_list = []
+        deleted_obj_result_list = []
+        delete_failure_param_err_list = []
+        allow_partial = req_msg.body.request.delete.allow_partial
+        self._logger.info("Processing a Delete Request...")
+
+        # Populate the Response's Header information
+        resp_msg.header.msg_id = req_msg.header.msg_id
+        resp_msg.header.msg_type = usp_msg.Header.DELETE_RESP
+
+        # Validate each obj_path
+        for obj_path in req_msg.body.request.delete.obj_paths:
+            deleted_obj_result = usp_msg.DeleteResp.DeletedObjectResult()
+            deleted_obj_result.requested_path = obj_path
+
+            try:
+                affected_path_list = self._get_affected_paths_for_delete(obj_path)
+                deleted_obj_result.oper_status.oper_success.affected_paths.extend(affected_path_list)
+                delete_list.extend(affected_path_list)
+                deleted_obj_result_list.append(deleted_obj_result)
+            except DeleteValidationError as dv_err:
+                if allow_partial:
+                    deleted_obj_result.oper_status.oper_failure.err_code = dv_err.get_error_code()
+                    deleted_obj_result.oper_status.oper_failure.err_msg = dv_err.get_error_message()
+                    deleted_obj_result_list.append(deleted_obj_result)
+                else:
+                    delete_failure_param_err = usp_msg.Error.ParamError()
+                    delete_failure_param_err.param_path = obj_path
+                    delete_failure_param_err.err_code = dv_err.get_error_code()
+                    delete_failure_param_err.err_msg = dv_err.get_error_message()
+                    delete_failure_param_err_list.append(delete_failure_param_err)
+
+        # Finished with all validation, process the errors or delete the instances
+        if delete_failure_param_err_list:
+            usp_err_msg = utils.UspErrMsg(req_msg.header.msg_id)
+            err_msg = "Invalid Object Found, Allow Partial Updates = False :: Fail the entire Delete"
+            resp_msg = usp_err_msg.generate_error(9000, err_msg)
+            resp_msg.body.error.param_errs.extend(delete_failure_param_err_list)
+        else:
+            deleted_path_list = []
+
+            for affected_path in delete_list:
+                # An earlier obj_path might have already deleted the instance along with its parent
+                if not any(affected_path.startswith(deleted_path) for deleted_path in deleted_path_list):
+                    self._db.delete(affected_path)
+                    deleted_path_list.append(affected_path)
+
+            resp_msg.body.response.delete_resp.deleted_obj_results.extend(deleted_obj_result_list)
+
+        return resp_msg
+
     def _process_operation(self, req_msg):
         """Process an incoming Operate and generate a OperateResp"""
         resp_msg = usp_msg.Msg()
@@ -458,54 +848,6 @@ class UspRequestHandler:
 
         return resp_msg
 
-    def _split_path(self, path):
-        """Split an incoming path into its partial path and parameter name
-            - Return None for param_name if a partial path was provided"""
-        param_name = None
-
-        if path.endswith("."):
-            partial_path = path
-        else:
-            path_parts = path.split(".")
-            partial_path_len = len(path_parts) - 1
-            partial_path = utils.PathHelper.build_path_from_parts(path_parts, partial_path_len)
-            param_name = path_parts[partial_path_len]
-
-        return partial_path, param_name
-
-    def _diff_paths(self, negative_path, full_path):
-        """Construct a path that removes the negative_path portion from the full_path portion"""
-        index = 0
-        return_path = ""
-        negative_path_parts = negative_path.split(".")
-        full_path_parts = full_path.split(".")
-        num_full_path_parts = len(full_path_parts)
-
-        for negative_path_part in negative_path_parts:
-            if negative_path_part == full_path_parts[index]:
-                index += 1
-            else:
-                break
-
-        while index < num_full_path_parts:
-            return_path += full_path_parts[index]
-            if (index + 1) < num_full_path_parts:
-                return_path += "."
-            index += 1
-
-        return return_path
-
-    def _get_affected_paths_for_get(self, partial_path):
-        """
-          Retrieve the affected paths based on the incoming obj_path:
-            - For Get Messages, we only want to validate that it is a supported path, even if instances are not there
-        """
-        affected_path_list = self._db.find_objects(partial_path)
-        num_affected_path_list = len(affected_path_list)
-        self._logger.info("Found [%s] Affected Paths for %s", str(num_affected_path_list), partial_path)
-
-        return affected_path_list
-
     def _get_affected_paths_for_set(self, partial_path):
         """
           Retrieve the affected paths based on the incoming obj_path:
@@ -531,6 +873,44 @@ class UspRequestHandler:
 
         return affected_path_list
 
+    def _get_affected_paths_for_add(self, partial_path):
+        """
+          Retrieve the affected paths based on the incoming obj_path:
+            - For Add Messages, we want the existing tables that a new instance will be created in
+        """
+        try:
+            affected_path_list = self._db.find_tables(partial_path)
+        except agent_db.NoSuchPathError:
+            err_msg = "Invalid obj_path encountered - {}".format(partial_path)
+            raise AddValidationError(9000, err_msg)
+
+        if not affected_path_list:
+            err_msg = "Non-existent obj_path encountered - {}".format(partial_path)
+            raise AddValidationError(9000, err_msg)
+
+        self._logger.info("Found [%s] Affected Paths for %s", str(len(affected_path_list)), partial_path)
+
+        return affected_path_list
+
+    def _get_affected_paths_for_delete(self, partial_path):
+        """
+          Retrieve the affected paths based on the incoming obj_path:
+            - For Delete Messages, we want the existing instances (no instances is not an error)
+        """
+        if not self._db.is_multi_instance(partial_path):
+            err_msg = "Invalid obj_path encountered - {}".format(partial_path)
+            raise DeleteValidationError(9000, err_msg)
+
+        try:
+            affected_path_list = self._db.find_objects(partial_path)
+        except agent_db.NoSuchPathError:
+            err_msg = "Invalid obj_path encountered - {}".format(partial_path)
+            raise DeleteValidationError(9000, err_msg)
+
+        self._logger.info("Found [%s] Affected Paths for %s", str(len(affected_path_list)), partial_path)
+
+        return affected_path_list
+
     def _is_partial_path_static(self, partial_path):
         """
           Check to see that the partial_path doesn't contain:
@@ -580,3 +960,13 @@ class SetValidationError(Exception):
     def get_error_message(self):
         """Retrieve the Error Message"""
         return self._err_msg
+
+
+class AddValidationError(SetValidationError):
+    """A USP Validation Exception for the Add USP Message"""
+    pass
+
+
+class DeleteValidationError(SetValidationError):
+    """A USP Validation Exception for the Delete USP Message"""
+    pass
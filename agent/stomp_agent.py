@@ -43,6 +43,7 @@
 
 
 import time
+import functools
 
 from agent import utils
 from agent import notify
@@ -50,6 +51,16 @@ from agent import abstract_agent
 from agent import stomp_usp_binding
 
 
+STOMP_RECONNECT_INITIAL_INTERVAL = "stomp.reconnect.initial.interval"
+STOMP_RECONNECT_MAX_INTERVAL = "stomp.reconnect.max.interval"
+STOMP_OUTAGE_BUFFER_SIZE = "stomp.outage.buffer.size"
+STOMP_SEND_QUEUE_SIZE = "stomp.send.queue.size"
+STOMP_SEND_BATCH_SIZE = "stomp.send.batch.size"
+STOMP_SEND_RECEIPTS = "stomp.send.receipts"
+STOMP_PREFETCH_COUNT = "stomp.prefetch.count"
+STOMP_RECEIPT_TIMEOUT = "stomp.receipt.timeout"
+
+
 class StompAgent(abstract_agent.AbstractAgent):
     """A USP Agent that uses the STOMP Binding"""
     def __init__(self, dm_file, db_file, net_intf, cfg_file_name="cfg/agent.json", debug=False):
@@ -75,7 +86,8 @@ class StompAgent(abstract_agent.AbstractAgent):
         for binding_key in self._binding_dict:
             msg_handler = self.get_msg_handler()
             binding = self._binding_dict[binding_key]
-            listener = abstract_agent.BindingListener(binding_key, binding, msg_handler, timeout)
+            listener = abstract_agent.BindingListener(binding_key, binding, msg_handler, timeout,
+                                                      self._num_request_workers)
             listener.start()
             binding_listener_list.append(listener)
 
@@ -88,8 +100,11 @@ class StompAgent(abstract_agent.AbstractAgent):
         for key in self._binding_dict:
             self._binding_dict[key].clean_up()
 
+        self._db.close()
+
     def _init_bindings(self):
-        """Initialize all Bindings from the Controller table"""
+        """Initialize all Bindings from the Controller table
+            - The STOMP Connections are established in parallel, in the background"""
         self._build_ctrl_stomp_conn_dict()
         agent_stomp_conn_dict = self._get_agent_stomp_conns()
 
@@ -97,6 +112,10 @@ class StompAgent(abstract_agent.AbstractAgent):
             agent_dest = agent_stomp_conn_dict[agent_stomp_conn]
             self._create_binding(agent_stomp_conn, agent_dest)
 
+        for agent_stomp_conn in agent_stomp_conn_dict:
+            self._logger.info("Connecting to %s", agent_stomp_conn)
+            self._binding_dict[agent_stomp_conn].start_connecting()
+
     def _build_ctrl_stomp_conn_dict(self):
         """Build out the STOMP Connection dictionary for the known Controllers"""
         controller_instances = self._db.find_instances("Device.LocalAgent.Controller.")
@@ -190,26 +209,31 @@ class StompAgent(abstract_agent.AbstractAgent):
         username = self._db.get(stomp_conn_ref + "Username")
         password = self._db.get(stomp_conn_ref + "Password")
         virtual_host = self._db.get(stomp_conn_ref + "VirtualHost")
-        timezone = self._db.get("Device.Time.LocalTimeZone")
+        default_cfg = {STOMP_RECONNECT_INITIAL_INTERVAL: "1", STOMP_RECONNECT_MAX_INTERVAL: "60",
+                       STOMP_OUTAGE_BUFFER_SIZE: "100", STOMP_SEND_QUEUE_SIZE: "1000", STOMP_SEND_BATCH_SIZE: "32",
+                       STOMP_SEND_RECEIPTS: "false", STOMP_PREFETCH_COUNT: "100", STOMP_RECEIPT_TIMEOUT: "30"}
+        cfg_mgr = utils.ConfigMgr(self._cfg_file_name, default_cfg)
 
         if self._db.get(stomp_conn_ref + "EnableHeartbeats"):
             outgoing_heartbeats = self._db.get(stomp_conn_ref + "OutgoingHeartbeat")
             incoming_heartbeats = self._db.get(stomp_conn_ref + "IncomingHeartbeat")
 
-        # Set the STOMP Connection Status to Connecting
-        self._db.update(stomp_conn_ref + "Status", "Connecting")
-        self._db.update(stomp_conn_ref + "LastChangeDate", utils.TimeHelper.get_time_as_str(time.time(), timezone))
-        self._logger.info("Connecting to %s", stomp_conn_ref)
-
-        binding = stomp_usp_binding.StompUspBinding(self._endpoint_id, host, port, username, password, virtual_host,
-                                                    outgoing_heartbeats, incoming_heartbeats)
-
-        # Set the STOMP Connection Status to Enabled
-        self._db.update(stomp_conn_ref + "Status", "Enabled")
-        self._db.update(stomp_conn_ref + "LastChangeDate", utils.TimeHelper.get_time_as_str(time.time(), timezone))
-        self._logger.info("Connected to %s", stomp_conn_ref)
-
-        # Start listening
+        # The Binding keeps the STOMP Connection Status (and LastChangeDate) up to date as it (re)connects
+        status_callback = functools.partial(self._update_stomp_conn_status, stomp_conn_ref)
+        binding = stomp_usp_binding.StompUspBinding(
+            self._endpoint_id, host, port, username, password, virtual_host, outgoing_heartbeats, incoming_heartbeats,
+            max_queue_size=self._binding_queue_size, high_watermark=self._binding_queue_high_watermark,
+            low_watermark=self._binding_queue_low_watermark,
+            reconnect_initial_interval=float(cfg_mgr.get_cfg_item(STOMP_RECONNECT_INITIAL_INTERVAL)),
+            reconnect_max_interval=float(cfg_mgr.get_cfg_item(STOMP_RECONNECT_MAX_INTERVAL)),
+            outage_buffer_size=int(cfg_mgr.get_cfg_item(STOMP_OUTAGE_BUFFER_SIZE)), status_callback=status_callback,
+            send_queue_size=int(cfg_mgr.get_cfg_item(STOMP_SEND_QUEUE_SIZE)),
+            send_batch_size=int(cfg_mgr.get_cfg_item(STOMP_SEND_BATCH_SIZE)),
+            use_receipts=str(cfg_mgr.get_cfg_item(STOMP_SEND_RECEIPTS)).lower() == "true",
+            prefetch_count=int(cfg_mgr.get_cfg_item(STOMP_PREFETCH_COUNT)),
+            receipt_timeout=float(cfg_mgr.get_cfg_item(STOMP_RECEIPT_TIMEOUT)))
+
+        # Start listening, which subscribes once the STOMP Connection is established
         binding.listen(listen_dest)
 
         # Save the binding, and configure the ValueChangeNotifPoller
@@ -221,6 +245,14 @@ class StompAgent(abstract_agent.AbstractAgent):
             self.get_value_change_notif_poller().add_controller_dest(
                 controller_endpoint_id, self._controller_stomp_conn_ref_dict[stomp_conn_ref][controller_endpoint_id])
 
+    def _update_stomp_conn_status(self, stomp_conn_ref, status):
+        """Update the STOMP Connection's Status and LastChangeDate in the Agent DB"""
+        timezone = self._db.get("Device.Time.LocalTimeZone")
+        last_change_date = utils.TimeHelper.get_time_as_str(time.time(), timezone)
+
+        self._db.update_many({stomp_conn_ref + "Status": status, stomp_conn_ref + "LastChangeDate": last_change_date})
+        self._logger.info("STOMP Connection %s is now: %s", stomp_conn_ref, status)
+
     def _get_supported_protocol(self):
         """Return the supported Protocol as a String: CoAP, STOMP, HTTP/2, WebSockets"""
         return "STOMP"
@@ -28,23 +28,99 @@
 #  - MyStompConnListener(stomp.ConnectionListener)
 #    - __init__(binding, debug=False)
 #    - on_error(headers, message)
+#    - on_connected(headers, body)
+#    - on_disconnected()
+#    - on_receipt(headers, body)
 #    - on_message(headers, message)
+#  - StompSendingThread(threading.Thread)
+#    - __init__(binding, send_queue, batch_size=32)
+#    - run()
 #  - StompUspBinding(generic_usp_binding.GenericUspBinding)
-#    - __init__(host="127.0.0.1", port=61613, username="admin", password="admin", debug=False)
+#    - __init__(host="127.0.0.1", port=61613, username="admin", password="admin", debug=False,
+#               max_queue_size=1000, high_watermark=None, low_watermark=None, reconnect_initial_interval=1,
+#               reconnect_max_interval=60, outage_buffer_size=100, status_callback=None,
+#               send_queue_size=1000, send_batch_size=32, use_receipts=False, prefetch_count=100,
+#               receipt_timeout=30)
+#    - start_connecting()
+#    - is_connected()
+#    - push_frame(payload, reply_to_addr, ack_id)
+#    - ack_frame(ack_id)
+#    - ack_msg(queue_item)
+#    - handle_receipt(receipt_id)
 #    - validate_payload(payload)
-#    - send_msg(serialized_msg, to_addr)
+#    - send_msg(serialized_msg, to_addr) :: returns False if the outgoing message queue is full
+#    - send_batch(msg_batch)
 #    - listen()
 #    - clean_up()
 #
+#  - The STOMP Connection is established (and re-established after it is lost) by a background thread,
+#     retrying with a jittered exponential backoff; the destination is re-subscribed after every reconnect
+#  - The status_callback is called with the STOMP Connection's Status whenever it changes
+#  - Messages sent while disconnected are buffered (up to outage_buffer_size, dropping the oldest), and are
+#     sent once the STOMP Connection is re-established
+#  - Outgoing messages are queued (bounded by send_queue_size) and written by a StompSendingThread, so the
+#     threads producing them never block on the socket; the thread drains the queue in batches, taking the
+#     STOMP Connection once per batch rather than once per message
+#  - With use_receipts, each SEND requests a broker RECEIPT; messages still awaiting one when the STOMP
+#     Connection is lost are sent again after it is re-established (at-least-once delivery); a message
+#     still without one after receipt_timeout seconds is given up on, so a broker that never sends RECEIPTs
+#     can't grow the pending set without bound
+#  - Incoming messages are consumed with individual client ACKs: a frame is ACKed only once the Binding
+#     Listener has processed it and its Response has been written (the ACK is queued behind the Response),
+#     so at most prefetch_count frames are held in memory and a crash leaves the rest with the broker; the
+#     prefetch window is clamped to the incoming message queue size, so a full queue doesn't NACK frames
+#     into a redelivery loop
+#
 """
 
+import time
+import queue
+import random
 import logging
+import itertools
+import threading
+import collections
+import prometheus_client
 
 import stomp
+import stomp.exception
 
 from agent import generic_usp_binding
 
 
+# How long (in seconds) to wait for room in the outgoing message queue for the ACK of a processed frame
+ACK_QUEUE_TIMEOUT = 5
+
+# pylint: disable-msg=no-value-for-parameter
+NUM_STOMP_RECONNECTS_METRIC = \
+    prometheus_client.Counter("number_of_stomp_reconnects",
+                              "Number of times a lost STOMP Connection had to be re-established")
+# pylint: disable-msg=no-value-for-parameter
+NUM_STOMP_OUTAGE_DROPS_METRIC = \
+    prometheus_client.Counter("number_of_stomp_outage_buffer_drops",
+                              "Number of outgoing messages dropped because the STOMP outage buffer was full")
+# pylint: disable-msg=no-value-for-parameter
+NUM_STOMP_SEND_QUEUE_FULL_DROPS_METRIC = \
+    prometheus_client.Counter("number_of_stomp_send_queue_full_drops",
+                              "Number of outgoing messages dropped because the STOMP send queue was full")
+# pylint: disable-msg=no-value-for-parameter
+NUM_STOMP_RECEIPT_TIMEOUTS_METRIC = \
+    prometheus_client.Counter("number_of_stomp_receipt_timeouts",
+                              "Number of outgoing messages given up on because no RECEIPT arrived in time")
+# pylint: disable-msg=no-value-for-parameter
+STOMP_SEND_QUEUE_DEPTH_GAUGE_METRIC = \
+    prometheus_client.Gauge("stomp_send_queue_depth",
+                            "Number of outgoing messages waiting in the STOMP send queues")
+# pylint: disable-msg=no-value-for-parameter
+STOMP_SEND_LATENCY_SUMMARY_METRIC = \
+    prometheus_client.Summary("stomp_send_latency_seconds",
+                              "Time from queueing an outgoing message until it is written to the STOMP Connection")
+# pylint: disable-msg=no-value-for-parameter
+STOMP_RECEIPT_LATENCY_SUMMARY_METRIC = \
+    prometheus_client.Summary("stomp_receipt_latency_seconds",
+                              "Time from writing an outgoing message until the broker's RECEIPT for it arrives")
+
+
 class MyStompConnListener(stomp.ConnectionListener):
     """A STOMP Connection Listener for receiving USP messages"""
     def __init__(self, binding, debug=False):
@@ -72,8 +148,19 @@ class MyStompConnListener(stomp.ConnectionListener):
         else:
             self._logger.debug("The 'subscribe-dest' header was NOT found in the CONNECTED frame")
 
+    def on_disconnected(self):
+        """STOMP Connection Listener - the STOMP Connection was lost"""
+        self._logger.warning("The STOMP Connection was lost")
+        self._binding.handle_disconnect()
+
+    def on_receipt(self, headers, body):
+        """STOMP Connection Listener - the broker has received a message that we sent"""
+        self._binding.handle_receipt(headers.get("receipt-id"))
+
     def on_message(self, headers, body):
-        """STOMP Connection Listener - record messages to the incoming queue"""
+        """STOMP Connection Listener - record messages to the incoming queue
+            - Messages that can't be handled are acknowledged straight away, as they will never be processed"""
+        ack_id = headers.get("ack", headers.get("message-id"))
         self._logger.info("Received a STOMP message on my USP Message Queue")
         self._logger.debug("Payload received: [%s]", body)
 
@@ -86,52 +173,388 @@ class MyStompConnListener(stomp.ConnectionListener):
 
                 if "reply-to-dest" in headers:
                     self._logger.debug("STOMP Message has a 'reply-to-dest'")
-                    self._binding.push(body, headers["reply-to-dest"])
+                    self._binding.push_frame(body, headers["reply-to-dest"], ack_id)
                 else:
                     self._logger.warning("Incoming STOMP message had no 'reply-to-dest' header")
+                    self._binding.ack_frame(ack_id)
             else:
                 self._logger.warning("Incoming STOMP message contained an Unsupported Content-Type: %s",
                                      headers["content-type"])
+                self._binding.ack_frame(ack_id)
         else:
             self._logger.warning("Incoming STOMP message had no Content-Type")
+            self._binding.ack_frame(ack_id)
+
+
+class StompSendingThread(threading.Thread):
+    """A Thread that writes the queued outgoing messages to the STOMP Connection"""
+    def __init__(self, binding, send_queue, batch_size=32):
+        """Initialize the STOMP Sending Thread"""
+        threading.Thread.__init__(self, name="STOMP-Sending")
+        self.daemon = True
+        self._binding = binding
+        self._send_queue = send_queue
+        self._batch_size = batch_size
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+    def run(self):
+        """Send the queued messages a batch at a time, until a None is queued"""
+        is_stopped = False
+
+        while not is_stopped:
+            msg_batch = []
+            queue_item = self._send_queue.get()
+
+            # Take whatever else is already queued, up to the batch size, without waiting for more
+            while queue_item is not None:
+                msg_batch.append(queue_item)
+                if len(msg_batch) >= self._batch_size:
+                    break
+
+                try:
+                    queue_item = self._send_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            is_stopped = queue_item is None
+            if msg_batch:
+                STOMP_SEND_QUEUE_DEPTH_GAUGE_METRIC.dec(len(msg_batch))
+                self._logger.debug("Sending a batch of [%s] queued messages", str(len(msg_batch)))
+                self._binding.send_batch(msg_batch)
 
 
 class StompUspBinding(generic_usp_binding.GenericUspBinding):
     """A STOMP to USP Binding"""
     def __init__(self, my_endpoint_id, host="127.0.0.1", port=61613, username="admin", password="admin",
-                 virtual_host="/", outgoing_heartbeats=0, incoming_heartbeats=0, debug=False):
+                 virtual_host="/", outgoing_heartbeats=0, incoming_heartbeats=0, debug=False,
+                 max_queue_size=1000, high_watermark=None, low_watermark=None, reconnect_initial_interval=1,
+                 reconnect_max_interval=60, outage_buffer_size=100, status_callback=None,
+                 send_queue_size=1000, send_batch_size=32, use_receipts=False, prefetch_count=100,
+                 receipt_timeout=30):
         """Initialize the STOMP USP Binding for a USP Endpoint
-            - 61613 is the default STOMP port for RabbitMQ installations"""
-        generic_usp_binding.GenericUspBinding.__init__(self)
+            - 61613 is the default STOMP port for RabbitMQ installations
+            - The STOMP Connection isn't established until start_connecting() is called
+            - The reconnect intervals (in seconds) bound the exponential backoff between connection attempts
+            - use_receipts requests a broker RECEIPT for each outgoing message, waiting up to receipt_timeout
+               seconds for it
+            - prefetch_count is the number of unacknowledged frames the broker may deliver; 0 (no limit) and
+               values larger than max_queue_size are clamped to max_queue_size"""
+        generic_usp_binding.GenericUspBinding.__init__(self, max_queue_size, high_watermark, low_watermark)
         self._host = host
         self._port = port
         self._debug = debug
+        self._status = None
         self._my_dest = None
+        self._listen_dest = None
         self._username = username
         self._password = password
+        self._is_connected = False
+        self._connect_thread = None
+        self._is_transport_started = False
+        self._conn_generation = 0
+        self._prefetch_count = prefetch_count if 0 < prefetch_count <= max_queue_size else max_queue_size
+        self._conn_lock = threading.RLock()
+        self._closing_event = threading.Event()
+        self._status_callback = status_callback
         self._my_endpoint_id = my_endpoint_id
+        self._reconnect_initial_interval = reconnect_initial_interval
+        self._reconnect_max_interval = reconnect_max_interval
+        self._outage_buffer = collections.deque(maxlen=outage_buffer_size)
+        self._use_receipts = use_receipts
+        self._receipt_timeout = receipt_timeout
+        self._receipt_counter = itertools.count(1)
+        self._pending_receipt_dict = collections.OrderedDict()
+        self._send_queue = queue.Queue(maxsize=send_queue_size)
+        self._sending_thread = StompSendingThread(self, self._send_queue, send_batch_size)
         self._listener = MyStompConnListener(self, debug)
         self._logger = logging.getLogger(self.__class__.__name__)
 
+        if self._prefetch_count != prefetch_count:
+            self._logger.warning("STOMP prefetch count [%s] doesn't fit in the incoming message queue, using [%s]",
+                                 str(prefetch_count), str(self._prefetch_count))
+
         # If we don't use auto_decode=False, then we get decode problems
+        #  - The reconnect backoff is ours, so stomp.py only makes 1 attempt per connect
         self._conn = stomp.Connection12([(host, port)], heartbeats=(outgoing_heartbeats, incoming_heartbeats),
-                                        vhost=virtual_host, auto_decode=False)
+                                        vhost=virtual_host, auto_decode=False, reconnect_attempts_max=1)
         self._conn.set_listener("defaultListener", self._listener)
-        self._conn.start()
-        self._conn.connect(username, password, wait=True, headers={"endpoint-id": self._my_endpoint_id})
+        self._sending_thread.start()
+
+    def start_connecting(self):
+        """Establish the STOMP Connection in a background thread (without waiting for it)"""
+        with self._conn_lock:
+            if self._closing_event.is_set() or self._is_connected:
+                return
+
+            if self._connect_thread is None or not self._connect_thread.is_alive():
+                thread_name = "STOMP-Connect-" + str(self._host) + ":" + str(self._port)
+                self._connect_thread = threading.Thread(name=thread_name, target=self._connect_with_backoff)
+                self._connect_thread.daemon = True
+                self._connect_thread.start()
+
+    def is_connected(self):
+        """Determine if the STOMP Connection is currently established"""
+        return self._is_connected
+
+    def handle_disconnect(self):
+        """The STOMP Connection was lost; start re-establishing it"""
+        with self._conn_lock:
+            if not self._is_connected:
+                # A failed connection attempt, which the connect thread is already handling
+                return
+
+            self._is_connected = False
+            self._requeue_unreceipted_msgs()
+
+        if not self._closing_event.is_set():
+            self._set_status("Error")
+            NUM_STOMP_RECONNECTS_METRIC.inc()
+            self.start_connecting()
+
+    def _connect_with_backoff(self):
+        """Attempt to connect until successful (or closed), with a jittered exponential backoff between attempts"""
+        attempt = 0
+        self._set_status("Connecting")
+
+        while not self._closing_event.is_set():
+            if self._attempt_connection():
+                return
+
+            # Equal Jitter: wait between half and all of the exponentially increasing interval
+            interval = min(self._reconnect_max_interval, self._reconnect_initial_interval * (2 ** attempt))
+            delay = random.uniform(interval / 2, interval)
+            self._logger.info("Retrying the STOMP Connection to %s:%s in %.1f seconds",
+                              str(self._host), str(self._port), delay)
+            self._closing_event.wait(delay)
+            attempt += 1
+
+    def _attempt_connection(self):
+        """Make a single attempt to connect, subscribe and flush the outage buffer"""
+        self._logger.info("Connecting to the STOMP Server at %s:%s", str(self._host), str(self._port))
+
+        try:
+            self._conn.start()
+        except (stomp.exception.ConnectFailedException, OSError) as err:
+            # The transport's receiver thread only starts once its socket is open, so there is nothing to stop
+            self._logger.warning("Failed to open a socket to the STOMP Server at %s:%s: %s",
+                                 str(self._host), str(self._port), err)
+            return False
+
+        self._is_transport_started = True
+
+        try:
+            self._conn.connect(self._username, self._password, wait=True,
+                               headers={"endpoint-id": self._my_endpoint_id})
+        except (stomp.exception.ConnectFailedException, stomp.exception.NotConnectedException, OSError) as err:
+            self._logger.warning("Failed to connect to the STOMP Server at %s:%s: %s",
+                                 str(self._host), str(self._port), err)
+            self._stop_conn()
+            return False
+
+        with self._conn_lock:
+            if not self._conn.is_connected():
+                # Lost again before the Connection could be used
+                self._stop_conn()
+                return False
+
+            self._is_connected = True
+            self._conn_generation += 1
+            if self._listen_dest is not None:
+                self._subscribe()
+            self._flush_outage_buffer()
+
+        self._set_status("Enabled")
+        self._logger.info("Connected to the STOMP Server at %s:%s", str(self._host), str(self._port))
+
+        return True
+
+    def _stop_conn(self):
+        """Stop the underlying STOMP transport after a failed connection attempt (if it was started)
+            - Closing the socket first ends the receiver thread, which stop() waits for"""
+        if self._is_transport_started:
+            self._is_transport_started = False
+            self._conn.transport.disconnect_socket()
+            self._conn.stop()
+
+    def _set_status(self, status):
+        """Record the STOMP Connection's Status, reporting it to the status callback if it changed"""
+        if status != self._status:
+            self._status = status
+            if self._status_callback is not None:
+                self._status_callback(status)
+
+    def push_frame(self, payload, reply_to_addr, ack_id):
+        """Push the payload of an incoming STOMP frame onto the incoming message queue
+            - The frame is ACKed by ack_msg() once it has been processed, so the broker stops delivering
+               once its window of unacknowledged frames is full
+            - A frame that doesn't fit in the queue is negatively acknowledged, so the broker redelivers it"""
+        # ACK IDs are only valid on the STOMP Connection that delivered the frame
+        if not self.push(payload, reply_to_addr, (self._conn_generation, ack_id)):
+            self._logger.warning("Incoming message queue is full; NACKing the STOMP message")
+            self._conn.nack(ack_id)
+
+    def ack_frame(self, ack_id):
+        """Acknowledge an incoming STOMP frame
+            - Frames received on a lost STOMP Connection can't be acknowledged, the broker redelivers them"""
+        try:
+            self._conn.ack(ack_id)
+        except stomp.exception.NotConnectedException:
+            self._logger.warning("Unable to ACK the STOMP message, the STOMP Connection was lost")
+
+    def ack_msg(self, queue_item):
+        """The Queue Item has been processed; queue the ACK of its STOMP frame behind its Response
+            - Waits (up to ACK_QUEUE_TIMEOUT) for room in the outgoing message queue, as a lost ACK would hold up
+               the broker's window; once the Binding is closing the ACK is dropped, and the broker redelivers"""
+        if queue_item.get_ack_id() is None:
+            return
+
+        if self._closing_event.is_set():
+            self._logger.debug("Not ACKing a STOMP message, the STOMP Binding is closing")
+            return
+
+        try:
+            self._send_queue.put((None, None, time.time(), queue_item.get_ack_id()), timeout=ACK_QUEUE_TIMEOUT)
+        except queue.Full:
+            self._logger.warning("The outgoing message queue stayed full, dropping the ACK of a STOMP message")
+            return
+
+        STOMP_SEND_QUEUE_DEPTH_GAUGE_METRIC.inc()
+
+    def handle_receipt(self, receipt_id):
+        """The broker has received the outgoing message sent with the provided receipt ID"""
+        with self._conn_lock:
+            pending_msg = self._pending_receipt_dict.pop(receipt_id, None)
+
+        if pending_msg is not None:
+            STOMP_RECEIPT_LATENCY_SUMMARY_METRIC.observe(time.time() - pending_msg[2])
+        else:
+            self._logger.debug("Received a RECEIPT for an unknown outgoing message [%s]", receipt_id)
 
     def send_msg(self, serialized_msg, to_addr):
-        """Send the ProtoBuf Serialized message to the provided STOMP address"""
+        """Queue the ProtoBuf Serialized message to be sent to the provided STOMP address
+            - Returns False (dropping the message) if the outgoing message queue is full"""
+        try:
+            self._send_queue.put_nowait((serialized_msg, to_addr, time.time(), None))
+        except queue.Full:
+            self._logger.warning("The outgoing message queue is full, dropping the message for: %s", to_addr)
+            NUM_STOMP_SEND_QUEUE_FULL_DROPS_METRIC.inc()
+            return False
+
+        STOMP_SEND_QUEUE_DEPTH_GAUGE_METRIC.inc()
+        return True
+
+    def send_batch(self, msg_batch):
+        """Send a batch of queued (serialized_msg, to_addr, queued_time, ack_id) items on the STOMP Connection
+            - Items with an ack_id are the ACKs of processed incoming frames
+            - While the STOMP Connection is down the messages are buffered until it is re-established"""
+        with self._conn_lock:
+            for serialized_msg, to_addr, queued_time, ack_id in msg_batch:
+                if ack_id is not None:
+                    self._ack_processed_frame(ack_id)
+                    continue
+
+                if self._is_connected:
+                    try:
+                        self._send_frame(serialized_msg, to_addr)
+                        STOMP_SEND_LATENCY_SUMMARY_METRIC.observe(time.time() - queued_time)
+                        continue
+                    except stomp.exception.NotConnectedException:
+                        self._logger.warning("The STOMP Connection was lost while sending a message")
+
+                self._buffer_msg(serialized_msg, to_addr)
+
+    def _ack_processed_frame(self, ack_id):
+        """ACK a processed incoming frame, unless its STOMP Connection was lost (caller holds the lock)"""
+        conn_generation, frame_ack_id = ack_id
+
+        if self._is_connected and conn_generation == self._conn_generation:
+            self.ack_frame(frame_ack_id)
+        else:
+            self._logger.debug("Not ACKing a STOMP message from a lost STOMP Connection; the broker redelivers it")
+
+    def _send_frame(self, serialized_msg, to_addr):
+        """Send the ProtoBuf Serialized message on the STOMP Connection (caller holds the lock)"""
+        receipt_id = None
         content_type = "application/vnd.bbf.usp.msg"
         usp_headers = {"reply-to-dest": self._my_dest}
         self._logger.debug("Using [%s] as the value of the reply-to-dest header", self._my_dest)
-        self._conn.send(to_addr, serialized_msg, content_type, usp_headers)
+
+        if self._use_receipts:
+            self._expire_pending_receipts()
+            receipt_id = "usp-" + str(next(self._receipt_counter))
+            usp_headers["receipt"] = receipt_id
+            self._pending_receipt_dict[receipt_id] = (serialized_msg, to_addr, time.time())
+
+        try:
+            self._conn.send(to_addr, serialized_msg, content_type, usp_headers)
+        except stomp.exception.NotConnectedException:
+            self._pending_receipt_dict.pop(receipt_id, None)
+            raise
+
         self._logger.info("Sending a STOMP message to the following address: %s", to_addr)
         self._logger.debug("Payload being sent: [%s]", serialized_msg)
 
+    def _expire_pending_receipts(self):
+        """Give up on the sent messages that have waited longer than the receipt timeout (caller holds the lock)
+            - The pending messages are in the order they were sent, so only the oldest need to be checked"""
+        expiry_time = time.time() - self._receipt_timeout
+
+        while self._pending_receipt_dict:
+            receipt_id, (_msg, to_addr, sent_time) = next(iter(self._pending_receipt_dict.items()))
+            if sent_time > expiry_time:
+                break
+
+            self._logger.warning("No RECEIPT [%s] received for the message sent to: %s", receipt_id, to_addr)
+            NUM_STOMP_RECEIPT_TIMEOUTS_METRIC.inc()
+            del self._pending_receipt_dict[receipt_id]
+
+    def _buffer_msg(self, serialized_msg, to_addr):
+        """Buffer an outgoing message until the STOMP Connection is re-established (caller holds the lock)"""
+        if len(self._outage_buffer) == self._outage_buffer.maxlen:
+            self._logger.warning("The STOMP outage buffer is full, dropping the oldest buffered message")
+            NUM_STOMP_OUTAGE_DROPS_METRIC.inc()
+
+        self._logger.info("The STOMP Connection is down, buffering a message for: %s", to_addr)
+        self._outage_buffer.append((serialized_msg, to_addr))
+
+    def _flush_outage_buffer(self):
+        """Send the messages buffered while the STOMP Connection was down (caller holds the lock)"""
+        if self._outage_buffer:
+            self._logger.info("Sending [%s] messages buffered while the STOMP Connection was down",
+                              str(len(self._outage_buffer)))
+
+        while self._outage_buffer:
+            serialized_msg, to_addr = self._outage_buffer[0]
+            try:
+                self._send_frame(serialized_msg, to_addr)
+            except stomp.exception.NotConnectedException:
+                self._logger.warning("The STOMP Connection was lost while sending the buffered messages")
+                return
+
+            self._outage_buffer.popleft()
+
+    def _requeue_unreceipted_msgs(self):
+        """Buffer the messages the broker never sent a RECEIPT for, ahead of the others (caller holds the lock)"""
+        if self._pending_receipt_dict:
+            self._logger.info("Re-sending [%s] messages without a RECEIPT once the STOMP Connection is re-established",
+                              str(len(self._pending_receipt_dict)))
+            unreceipted_msg_list = [(msg, to_addr) for msg, to_addr, _ in self._pending_receipt_dict.values()]
+            self._outage_buffer = collections.deque(itertools.chain(unreceipted_msg_list, self._outage_buffer),
+                                                    maxlen=self._outage_buffer.maxlen)
+            self._pending_receipt_dict.clear()
+
     def listen(self, agent_addr):
-        """Listen to a STOMP destination for incoming messages"""
+        """Listen to a STOMP destination for incoming messages
+            - The destination is subscribed to now if connected, and again whenever the Connection is re-established"""
+        with self._conn_lock:
+            self._listen_dest = agent_addr
+            if self._is_connected:
+                self._subscribe()
+
+    def _subscribe(self):
+        """Subscribe to the STOMP destination for incoming messages (caller holds the lock)"""
         msg_id = 1
+        agent_addr = self._listen_dest
 
         self._my_dest = self._listener.get_subscribe_dest()
         if self._my_dest is None:
@@ -148,9 +571,26 @@ class StompUspBinding(generic_usp_binding.GenericUspBinding):
         #   - Bulld the full destination: self._build_dest(dest)
         #   - Retrieve the ID from the dictionary for the destination
         #   - Unsubscribe: self._conn.unsubscribe(id)
-        self._conn.subscribe(self._my_dest, id=str(msg_id), ack="auto")
+        # Individual Client ACKs let the incoming message queue apply backpressure to the broker
+        #  - The prefetch window is requested with both the RabbitMQ and the ActiveMQ header
+        subscribe_headers = {"prefetch-count": str(self._prefetch_count),
+                             "activemq.prefetchSize": str(self._prefetch_count)}
+
+        self._conn.subscribe(self._my_dest, id=str(msg_id), ack="client-individual", headers=subscribe_headers)
         self._logger.info("Subscribed to Destination: %s", self._my_dest)
 
     def clean_up(self):
-        """Clean up the STOMP Connection"""
-        self._conn.disconnect()
+        """Clean up the STOMP Connection, and stop re-establishing it
+            - The messages already queued are sent before disconnecting"""
+        self._send_queue.put(None)
+        self._sending_thread.join(5)
+        self._closing_event.set()
+
+        with self._conn_lock:
+            was_connected = self._is_connected
+            self._is_connected = False
+
+        if was_connected:
+            self._conn.disconnect()
+        else:
+            self._stop_conn()
@@ -0,0 +1,226 @@
+"""
+Copyright (c) 2016 John Blackford
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+# File Name: supported_dm.py
+#
+# Description: Compiled Supported Data Model (built once from the *-dm.json file)
+#
+# Functionality:
+#   Class: SupportedDataModel(object)
+#    - __init__(dm_dict)
+#    - get_generic_path(path) :: replace instance numbers and wildcards with {i}
+#    - is_implemented(path) :: validate a full or partial path against the data model
+#    - get_param_access(param_path) / is_param_writable(param_path)
+#    - is_object(obj_path) / is_multi_instance(obj_path) / is_table(table_path)
+#    - get_child_objects(obj_path) / get_param_objects(obj_path)
+#    - get_instance_param_names(table_path) :: parameters to create for a new instance of the table
+#    - get_default_value(param_path) :: value of the parameter in a newly created instance
+#    - get_supported_objects(obj_path, first_level_only) :: SupportedObject entries for GetSupportedDM
+#   Class: SupportedObject(object)
+#    - A supported object with its parameters (and their access), commands ("()") and events ("!")
+#
+#  - Each DM file entry maps a generic parameter path to either its access ("readOnly"/"readWrite")
+#     or to an object with the access and a default value: {"access": "readWrite", "default": false}
+#
+"""
+
+
+from agent import utils
+
+
+READ_ONLY = "readOnly"
+READ_WRITE = "readWrite"
+INSTANCE_PLACEHOLDER = "{i}"
+NUM_ENTRIES_SUFFIX = "NumberOfEntries"
+NUM_ENTRIES_SENTINEL = "__NUM_ENTRIES__"
+
+
+class SupportedDataModel:
+    """The Supported Data Model, compiled into lookup tables keyed by generic path
+        - Generic Paths use {i} in place of instance numbers (e.g. Device.LocalAgent.MTP.{i}.Enable)
+        - Validation, access and multi-instance checks are dictionary/set lookups"""
+    def __init__(self, dm_dict):
+        """Compile the Supported Data Model from the contents of the DM file"""
+        self._obj_set = set()
+        self._param_access_dict = {}
+        self._param_default_dict = {}
+        self._multi_instance_set = set()
+        self._supported_obj_dict = {}
+        self._index = utils.PathTrie(dm_dict)
+
+        for param_path, param_def in dm_dict.items():
+            if isinstance(param_def, dict):
+                self._param_access_dict[param_path] = param_def.get("access", READ_ONLY)
+                if "default" in param_def:
+                    self._param_default_dict[param_path] = param_def["default"]
+            else:
+                self._param_access_dict[param_path] = param_def
+
+            path_parts = param_path.split(".")
+            obj_path = ""
+
+            # Every "." separated prefix of a parameter path is a supported object
+            for part in path_parts[:-1]:
+                obj_path += part + "."
+                self._obj_set.add(obj_path)
+
+                if part == INSTANCE_PLACEHOLDER:
+                    self._multi_instance_set.add(obj_path)
+
+        # Build the Supported Object tree (a table path, e.g. Device.LocalAgent.MTP., is not an object itself)
+        for obj_path in self._obj_set:
+            if obj_path + INSTANCE_PLACEHOLDER + "." not in self._multi_instance_set:
+                self._supported_obj_dict[obj_path] = SupportedObject(obj_path, obj_path in self._multi_instance_set)
+
+        for param_path, access in self._param_access_dict.items():
+            obj_path, name = param_path.rsplit(".", 1)
+            self._supported_obj_dict[obj_path + "."].add_item(name, access)
+
+    def get_generic_path(self, path):
+        """Turn a DM Path into a Generic one by replacing instance numbers and wildcards"""
+        path_parts = path.split(".")
+
+        # The last part is either the parameter name or empty (partial path)
+        for inx in range(len(path_parts) - 1):
+            if path_parts[inx] == "*" or path_parts[inx].isdigit():
+                path_parts[inx] = INSTANCE_PLACEHOLDER
+
+        return ".".join(path_parts)
+
+    def is_implemented(self, path):
+        """Validate that a full (parameter) or partial (object) path is in the Supported Data Model"""
+        generic_path = self.get_generic_path(path)
+
+        if generic_path.endswith("."):
+            return generic_path in self._obj_set
+
+        return generic_path in self._param_access_dict
+
+    def get_param_access(self, param_path):
+        """Retrieve the access ("readOnly" or "readWrite") of the parameter, None if it isn't supported"""
+        return self._param_access_dict.get(self.get_generic_path(param_path))
+
+    def is_param_writable(self, param_path):
+        """Determine if the parameter is a supported readWrite parameter"""
+        return self.get_param_access(param_path) == READ_WRITE
+
+    def is_object(self, obj_path):
+        """Determine if the partial path refers to a supported object"""
+        return self.get_generic_path(obj_path) in self._obj_set
+
+    def is_multi_instance(self, obj_path):
+        """Determine if the partial path refers to an instance of a multi-instance object (ends in {i}.)"""
+        return self.get_generic_path(obj_path) in self._multi_instance_set
+
+    def is_table(self, table_path):
+        """Determine if the partial path refers to a multi-instance object's table (e.g. Device.LocalAgent.MTP.)"""
+        return self.get_generic_path(table_path) + INSTANCE_PLACEHOLDER + "." in self._multi_instance_set
+
+    def get_child_objects(self, obj_path):
+        """Retrieve the generic paths of the direct child objects of the supported object"""
+        generic_path = self.get_generic_path(obj_path)
+        return [generic_path + child_name + "." for child_name in self._index.get_child_objects(generic_path)]
+
+    def get_param_objects(self, obj_path):
+        """Retrieve the generic paths of the descendant objects (excluding the object itself) with parameters"""
+        found_list = []
+        generic_path = self.get_generic_path(obj_path)
+
+        for descendant_path in self._index.iter_objects(generic_path):
+            if descendant_path != generic_path and self._index.get_child_params(descendant_path):
+                found_list.append(descendant_path)
+
+        return found_list
+
+    def get_instance_param_names(self, table_path):
+        """Retrieve the parameter names (relative to the instance) that make up a new instance of the table
+            - Parameters of nested tables are not included, a new instance starts with empty nested tables
+            - Commands ("()") and Events ("!") are not parameters"""
+        found_list = []
+        generic_inst_path = self.get_generic_path(table_path) + INSTANCE_PLACEHOLDER + "."
+
+        for param_path in self._index.iter_params(generic_inst_path):
+            param_name = param_path[len(generic_inst_path):]
+
+            if INSTANCE_PLACEHOLDER in param_name.split(".") or param_name.endswith(("()", "!")):
+                continue
+            found_list.append(param_name)
+
+        return found_list
+
+    def get_default_value(self, param_path):
+        """Retrieve the value of the parameter in a newly created instance
+            - The default declared in the DM file, otherwise
+            - The NumberOfEntries sentinel for a parameter that counts a supported table, otherwise
+            - An empty string"""
+        generic_path = self.get_generic_path(param_path)
+
+        if generic_path in self._param_default_dict:
+            return self._param_default_dict[generic_path]
+
+        if generic_path.endswith(NUM_ENTRIES_SUFFIX):
+            if self.is_table(generic_path[:-len(NUM_ENTRIES_SUFFIX)] + "."):
+                return NUM_ENTRIES_SENTINEL
+
+        return ""
+
+    def get_supported_objects(self, obj_path, first_level_only=False):
+        """Retrieve the SupportedObject entries for the supported object (or table) and its descendants
+            - first_level_only: only the object itself and its direct child objects (a table's {i} counts
+               as part of the same level)"""
+        generic_path = self.get_generic_path(obj_path)
+        base_depth = self._get_obj_depth(generic_path)
+
+        if generic_path not in self._obj_set:
+            return None
+
+        found_list = []
+        for descendant_path in self._index.iter_objects(generic_path):
+            if descendant_path in self._supported_obj_dict:
+                if not first_level_only or self._get_obj_depth(descendant_path) - base_depth <= 1:
+                    found_list.append(self._supported_obj_dict[descendant_path])
+
+        return found_list
+
+    @staticmethod
+    def _get_obj_depth(obj_path):
+        """Retrieve the number of named levels in the object path (instance placeholders don't count)"""
+        return len([part for part in obj_path.split(".")[:-1] if part != INSTANCE_PLACEHOLDER])
+
+
+class SupportedObject:
+    """A Supported Object with its Parameters, Commands and Events"""
+    def __init__(self, obj_path, is_multi_instance):
+        """Initialize the Supported Object"""
+        self.obj_path = obj_path
+        self.is_multi_instance = is_multi_instance
+        self.param_access_dict = {}
+        self.command_list = []
+        self.event_list = []
+
+    def add_item(self, name, access):
+        """Add a Parameter, Command (name ending in "()") or Event (name ending in "!") to the Object"""
+        if name.endswith("()"):
+            self.command_list.append(name)
+        elif name.endswith("!"):
+            self.event_list.append(name)
+        else:
+            self.param_access_dict[name] = access
@@ -27,6 +27,12 @@ SOFTWARE.
 #   Class: ConfigMgr(object)
 #    - __init__(config_file_name, default_config_value_map)
 #    - get_cfg_item(config_key_name)
+#   Class: PathTrie(object)
+#    - __init__(path_list=None)
+#    - add(path) / remove(path) / contains(path)
+#    - resolve(path) :: expands wildcards into matching paths
+#    - get_child_names(obj_path) / get_child_objects(obj_path) / get_child_params(obj_path)
+#    - iter_objects(obj_path) / iter_params(obj_path)
 #   Class: IPAddr(object)
 #    - static: get_ip_addr(interface=None)
 #   Class: UspErrMsg(object)
@@ -143,6 +149,172 @@ class PathHelper:
 
 
 
+class PathTrie:
+    """A Segment-based Index of Parameter Paths
+        - Each node of the tree is a path segment (e.g. Device -> LocalAgent -> MTP -> 1 -> Enable)
+        - Object paths end with a "." and Parameter paths do not
+        - Wildcards ("*") in a path match any instance number segment"""
+    def __init__(self, path_list=None):
+        """Initialize the Index, optionally populating it with the provided paths"""
+        self._root = PathTrieNode()
+
+        if path_list is not None:
+            for path in path_list:
+                self.add(path)
+
+    def add(self, path):
+        """Add a Parameter Path to the Index"""
+        node = self._root
+
+        for part in path.split("."):
+            if part not in node.children:
+                node.children[part] = PathTrieNode()
+            node = node.children[part]
+
+        node.is_leaf = True
+
+    def remove(self, path):
+        """Remove a Parameter Path from the Index, pruning any branches left without Parameters"""
+        node = self._root
+        node_stack = []
+
+        for part in path.split("."):
+            if part not in node.children:
+                return
+            node_stack.append((node, part))
+            node = node.children[part]
+
+        node.is_leaf = False
+
+        # Prune the now empty nodes from the bottom up
+        for parent_node, part in reversed(node_stack):
+            child_node = parent_node.children[part]
+            if child_node.is_leaf or child_node.children:
+                break
+            del parent_node.children[part]
+
+    def contains(self, path):
+        """Determine if the Path (Parameter or Object) is in the Index"""
+        node = self._get_node(path)
+        if node is None:
+            return False
+
+        if path.endswith("."):
+            return True
+
+        return node.is_leaf
+
+    def resolve(self, path):
+        """Resolve a Path that might contain wildcards into the list of matching Paths in the Index
+            - Partial Paths (ending with a ".") resolve to Object Paths
+            - Full Paths resolve to Parameter Paths"""
+        found_list = [("", self._root)]
+        is_partial_path = path.endswith(".")
+        path_parts = path.split(".")
+
+        if is_partial_path:
+            path_parts = path_parts[:-1]
+
+        for part in path_parts:
+            next_found_list = []
+
+            for built_path, node in found_list:
+                if part == "*":
+                    for child_name, child_node in node.children.items():
+                        if child_name.isdigit():
+                            next_found_list.append((built_path + child_name + ".", child_node))
+                elif part in node.children:
+                    next_found_list.append((built_path + part + ".", node.children[part]))
+
+            found_list = next_found_list
+            if not found_list:
+                break
+
+        if is_partial_path:
+            return [built_path for built_path, node in found_list]
+
+        return [built_path[:-1] for built_path, node in found_list if node.is_leaf]
+
+    def get_child_names(self, obj_path):
+        """Retrieve the names of the direct children (Parameters and Objects) of the Object Path"""
+        node = self._get_node(obj_path)
+        if node is None:
+            return []
+
+        return list(node.children)
+
+    def get_child_objects(self, obj_path):
+        """Retrieve the names of the direct child Objects of the Object Path"""
+        node = self._get_node(obj_path)
+        if node is None:
+            return []
+
+        return [child_name for child_name, child_node in node.children.items() if child_node.children]
+
+    def get_child_params(self, obj_path):
+        """Retrieve the names of the direct child Parameters of the Object Path"""
+        node = self._get_node(obj_path)
+        if node is None:
+            return []
+
+        return [child_name for child_name, child_node in node.children.items() if child_node.is_leaf]
+
+    def iter_objects(self, obj_path):
+        """Iterate over the Object Path and all of its descendant Object Paths"""
+        node = self._get_node(obj_path)
+        if node is not None:
+            node_stack = [(obj_path, node)]
+
+            while node_stack:
+                built_path, node = node_stack.pop()
+                yield built_path
+                child_list = [(built_path + child_name + ".", child_node)
+                              for child_name, child_node in node.children.items() if child_node.children]
+                node_stack.extend(reversed(child_list))
+
+    def iter_params(self, obj_path):
+        """Iterate over all of the Parameter Paths contained within the Object Path"""
+        node = self._get_node(obj_path)
+        if node is not None:
+            node_stack = [(obj_path, node)]
+
+            while node_stack:
+                built_path, node = node_stack.pop()
+                child_list = []
+
+                for child_name, child_node in node.children.items():
+                    if child_node.is_leaf:
+                        yield built_path + child_name
+                    if child_node.children:
+                        child_list.append((built_path + child_name + ".", child_node))
+
+                node_stack.extend(reversed(child_list))
+
+    def _get_node(self, path):
+        """Retrieve the node for a Path without wildcards, or None if it isn't in the Index"""
+        node = self._root
+        path_parts = path.split(".")
+
+        if path.endswith("."):
+            path_parts = path_parts[:-1]
+
+        for part in path_parts:
+            if part not in node.children:
+                return None
+            node = node.children[part]
+
+        return node
+
+
+class PathTrieNode:
+    """A single Path Segment within the PathTrie"""
+    def __init__(self):
+        """Initialize the Path Segment"""
+        self.is_leaf = False
+        self.children = {}
+
+
+
 class IPAddr:
     """IP Address Retrieval Tool"""
     @staticmethod
@@ -0,0 +1,107 @@
+"""
+Copyright (c) 2016 John Blackford
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+# File Name: value_provider.py
+#
+# Description: Providers for the dynamic (computed on read) values of the Agent Database
+#
+# Functionality:
+#   Class: ValueProvider(object)
+#    - __init__(value_func, ttl=None)
+#    - get_value(path) :: the cached value for the path, or a freshly computed one
+#    - invalidate(path=None) :: drop the cached value for the path (or for every path)
+#   Class: ValueProviderRegistry(object)
+#    - register(sentinel, value_provider)
+#    - is_provided(stored_value) :: is the stored value a registered sentinel (e.g. "__UPTIME__")
+#    - get_value(sentinel, path)
+#    - invalidate(sentinel, path=None)
+#
+#  - A Provider's TTL declares how long a computed value stays valid:
+#     0 - never cached, computed on every read
+#     N - cached for N seconds
+#     None - cached until the Provider is explicitly invalidated
+#
+"""
+
+
+import time
+import threading
+
+
+class ValueProvider:
+    """Computes the value of a dynamic parameter, caching it per parameter path according to its TTL"""
+    def __init__(self, value_func, ttl=None):
+        """Initialize the Value Provider with the function that computes a value for a parameter path"""
+        self._ttl = ttl
+        self._cache = {}
+        self._value_func = value_func
+        self._cache_lock = threading.Lock()
+
+    def get_value(self, path):
+        """Retrieve the value for the parameter path, computing it if there is no valid cached value"""
+        if self._ttl == 0:
+            return self._value_func(path)
+
+        with self._cache_lock:
+            if path in self._cache:
+                value, expiration = self._cache[path]
+                if expiration is None or time.time() < expiration:
+                    return value
+
+        value = self._value_func(path)
+        expiration = None if self._ttl is None else time.time() + self._ttl
+
+        with self._cache_lock:
+            self._cache[path] = (value, expiration)
+
+        return value
+
+    def invalidate(self, path=None):
+        """Drop the cached value for the parameter path, or all cached values if no path is provided"""
+        with self._cache_lock:
+            if path is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(path, None)
+
+
+class ValueProviderRegistry:
+    """The Value Providers for each of the sentinel values that can be stored in the Database"""
+    def __init__(self):
+        """Initialize the empty Registry"""
+        self._provider_map = {}
+
+    def register(self, sentinel, value_provider):
+        """Register the Value Provider that computes the value of parameters storing the sentinel"""
+        self._provider_map[sentinel] = value_provider
+
+    def is_provided(self, stored_value):
+        """Determine if the stored value is a sentinel with a registered Value Provider"""
+        return isinstance(stored_value, str) and stored_value in self._provider_map
+
+    def get_value(self, sentinel, path):
+        """Retrieve the value of the parameter path from the sentinel's Value Provider"""
+        return self._provider_map[sentinel].get_value(path)
+
+    def invalidate(self, sentinel, path=None):
+        """Drop the values cached by the sentinel's Value Provider"""
+        if sentinel in self._provider_map:
+            self._provider_map[sentinel].invalidate(path)
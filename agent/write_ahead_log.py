@@ -0,0 +1,167 @@
+"""
+Copyright (c) 2016 John Blackford
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+# File Name: write_ahead_log.py
+#
+# Description: Append-only Write-Ahead Log for the Agent Database
+#
+# Functionality:
+#   Class: WriteAheadLog(object)
+#    - __init__(db_filename, fsync_policy="always", fsync_interval=1, compact_threshold=1000)
+#    - replay(db_dict) :: apply any logged transactions on top of the loaded DB snapshot
+#    - append(updated_param_dict, deleted_param_list) :: log 1 transaction (1 write)
+#    - compact(db_dict) :: rewrite the DB snapshot file and truncate the log
+#
+#  - The log lives next to the DB file (<db_filename>.wal)
+#  - Each line of the log is a single JSON encoded transaction:
+#     {"set": {param_path: value, ...}, "del": [param_path, ...]}
+#  - fsync policies:
+#     "always" - fsync after every transaction (durable once append returns)
+#     "interval" - fsync at most once every fsync_interval seconds
+#     "never" - leave flushing to the OS
+#
+"""
+
+
+import os
+import json
+import time
+import logging
+
+
+FSYNC_ALWAYS = "always"
+FSYNC_INTERVAL = "interval"
+FSYNC_NEVER = "never"
+FSYNC_POLICY_LIST = [FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER]
+
+
+class WriteAheadLog:
+    """An Append-only Log of Database Transactions that is periodically compacted into the DB file"""
+    def __init__(self, db_filename, fsync_policy=FSYNC_ALWAYS, fsync_interval=1, compact_threshold=1000):
+        """Initialize the Write-Ahead Log for the provided DB file"""
+        self._log_file = None
+        self._last_fsync_time = 0
+        self._num_log_entries = 0
+        self._db_filename = db_filename
+        self._fsync_interval = fsync_interval
+        self._compact_threshold = compact_threshold
+        self._log_filename = db_filename + ".wal"
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        if fsync_policy in FSYNC_POLICY_LIST:
+            self._fsync_policy = fsync_policy
+        else:
+            self._fsync_policy = FSYNC_ALWAYS
+            self._logger.warning("Unknown fsync policy [%s], using [%s]", fsync_policy, FSYNC_ALWAYS)
+
+    def replay(self, db_dict):
+        """Apply the transactions found in the log to the provided DB contents
+            - A partially written (last) transaction is discarded, and truncated from the log so that
+               the transactions appended after it aren't written onto the end of it
+            - Returns the number of transactions applied"""
+        num_applied = 0
+
+        if os.path.exists(self._log_filename):
+            good_offset = 0
+            is_torn = False
+
+            with open(self._log_filename, "rb") as log_file:
+                for line in log_file:
+                    try:
+                        # A transaction is only complete once its line is terminated
+                        if not line.endswith(b"\n"):
+                            raise ValueError("Unterminated transaction")
+                        transaction = json.loads(line.decode("utf-8"))
+                    except ValueError:
+                        self._logger.warning("Discarding a partially written transaction from [%s]",
+                                             self._log_filename)
+                        is_torn = True
+                        break
+
+                    for param_path in transaction.get("del", []):
+                        db_dict.pop(param_path, None)
+
+                    db_dict.update(transaction.get("set", {}))
+                    good_offset += len(line)
+                    num_applied += 1
+
+            if is_torn:
+                os.truncate(self._log_filename, good_offset)
+
+            self._num_log_entries = num_applied
+            self._logger.info("Replayed %d transactions from [%s]", num_applied, self._log_filename)
+
+        return num_applied
+
+    def append(self, updated_param_dict, deleted_param_list):
+        """Log a single transaction, returns True if the log should now be compacted"""
+        transaction = {}
+
+        if updated_param_dict:
+            transaction["set"] = updated_param_dict
+        if deleted_param_list:
+            transaction["del"] = list(deleted_param_list)
+
+        if self._log_file is None:
+            self._log_file = open(self._log_filename, "a")
+
+        self._log_file.write(json.dumps(transaction) + "\n")
+        self._log_file.flush()
+        self._sync()
+        self._num_log_entries += 1
+
+        return self._num_log_entries >= self._compact_threshold
+
+    def compact(self, db_dict):
+        """Rewrite the DB snapshot file with the provided contents and empty the log"""
+        tmp_db_filename = self._db_filename + ".tmp"
+
+        with open(tmp_db_filename, "w") as db_file:
+            json.dump(db_dict, db_file, indent=4)
+            db_file.flush()
+            os.fsync(db_file.fileno())
+
+        # The snapshot replaces the DB file atomically; the log is only emptied once it is in place
+        os.replace(tmp_db_filename, self._db_filename)
+
+        if self._log_file is not None:
+            self._log_file.close()
+        self._log_file = open(self._log_filename, "w")
+        self._num_log_entries = 0
+        self._logger.info("Compacted [%s] into [%s]", self._log_filename, self._db_filename)
+
+    def close(self):
+        """Flush and close the log"""
+        if self._log_file is not None:
+            self._log_file.flush()
+            os.fsync(self._log_file.fileno())
+            self._log_file.close()
+            self._log_file = None
+
+    def _sync(self):
+        """fsync the log as per the configured policy"""
+        if self._fsync_policy == FSYNC_ALWAYS:
+            os.fsync(self._log_file.fileno())
+        elif self._fsync_policy == FSYNC_INTERVAL:
+            now = time.time()
+            if now - self._last_fsync_time >= self._fsync_interval:
+                os.fsync(self._log_file.fileno())
+                self._last_fsync_time = now
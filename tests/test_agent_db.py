@@ -25,8 +25,12 @@ SOFTWARE.
 #
 """
 
+import os
 import time
+import shutil
 import datetime
+import tempfile
+import threading
 import unittest.mock as mock
 
 from agent import agent_db
@@ -851,6 +855,25 @@ def test_get_num_entries():
     assert get_value4 == 3
 
 
+def test_get_num_entries_does_not_search_the_db():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+
+        with mock.patch.object(my_db, "find_instances") as find_instances_mock:
+            with mock.patch.object(my_db, "_storage") as storage_mock:
+                storage_mock.contains.return_value = True
+                storage_mock.get.return_value = "__NUM_ENTRIES__"
+                get_value1 = my_db.get("Device.Services.HomeAutomation.1.Camera.1.PicNumberOfEntries")
+
+    find_instances_mock.assert_not_called()
+    storage_mock.resolve.assert_not_called()
+    assert get_value1 == 2
+
+
 def test_get_ip_addr():
     ip_mock = mock.Mock()
     ip_mock.return_value = "10.99.12.8"
@@ -867,6 +890,45 @@ def test_get_ip_addr():
     assert get_value1 == "10.99.12.8"
 
 
+def test_get_ip_addr_is_cached():
+    ip_mock = mock.Mock()
+    ip_mock.return_value = "10.99.12.8"
+
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch("agent.utils.IPAddr.get_ip_addr", ip_mock):
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+            my_db.get("Device.LocalAgent.X_ARRIS-COM_IPAddr")
+            my_db.get("Device.LocalAgent.X_ARRIS-COM_IPAddr")
+            my_db.invalidate_dynamic_value(agent_db.IP_ADDR_SENTINEL)
+            my_db.get("Device.LocalAgent.X_ARRIS-COM_IPAddr")
+
+    assert ip_mock.call_count == 2
+
+
+def test_get_num_entries_after_insert_and_delete():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save'):
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+            get_value1 = my_db.get("Device.Services.HomeAutomation.1.Camera.2.PicNumberOfEntries")
+            my_db.insert("Device.Services.HomeAutomation.1.Camera.2.Pic.")
+            get_value2 = my_db.get("Device.Services.HomeAutomation.1.Camera.2.PicNumberOfEntries")
+            my_db.delete("Device.Services.HomeAutomation.1.Camera.2.Pic.90.")
+            my_db.delete("Device.Services.HomeAutomation.1.Camera.2.Pic.100.")
+            get_value3 = my_db.get("Device.Services.HomeAutomation.1.Camera.2.PicNumberOfEntries")
+
+    assert get_value1 == 3
+    assert get_value2 == 4
+    assert get_value3 == 2
+
+
 def test_get_currrent_local_time():
     time_mock = mock.Mock()
     time_mock.now.return_value = datetime.datetime(2016, 9, 20, 20, 15, 10)
@@ -915,6 +977,105 @@ def test_get_no_such_path():
             pass
 
 
+def test_get_resolved_params_partial_path():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+        resolved_dict = my_db.get_resolved_params("Device.Controller.*.STOMP.")
+
+    assert len(resolved_dict) == 2
+    assert resolved_dict["Device.Controller.1.STOMP."] == {
+        "Host": "stomp.johnblackford.org", "Port": 61613, "Username": "jab", "Password": "johnb23"}
+    assert resolved_dict["Device.Controller.2.STOMP."]["Host"] == ""
+
+
+def test_get_resolved_params_full_path():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+        resolved_dict = my_db.get_resolved_params("Device.Controller.*.Protocol")
+        num_entries_dict = my_db.get_resolved_params("Device.ControllerNumberOfEntries")
+
+    assert resolved_dict == {"Device.Controller.1.": {"Protocol": "STOMP"},
+                             "Device.Controller.2.": {"Protocol": "CoAP"}}
+    assert num_entries_dict == {"Device.": {"ControllerNumberOfEntries": 2}}
+
+
+def test_get_resolved_params_cached_until_generation_changes():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+        my_db._storage.commit = mock.MagicMock()
+        generation = my_db.get_generation()
+        my_db.get_resolved_params("Device.Controller.*.Protocol")
+
+        with mock.patch.object(my_db._storage, "resolve") as resolve_mock:
+            my_db.update("Device.Controller.1.Protocol", "CoAP")
+            resolved_dict = my_db.get_resolved_params("Device.Controller.*.Protocol")
+            resolve_mock.assert_not_called()
+
+        my_db.insert("Device.Controller.")
+        resolved_after_insert_dict = my_db.get_resolved_params("Device.Controller.*.Protocol")
+
+    assert resolved_dict == {"Device.Controller.1.": {"Protocol": "CoAP"},
+                             "Device.Controller.2.": {"Protocol": "CoAP"}}
+    assert my_db.get_generation() == generation + 1
+    assert len(resolved_after_insert_dict) == 3
+
+
+def test_get_resolved_params_computes_dynamic_values_outside_lock():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+    is_lock_free_list = []
+
+    def get_value(_stored_value, _path):
+        # Another thread can only take the DB lock if the Value Provider is called without holding it
+        lock_thread = threading.Thread(target=lambda: is_lock_free_list.append(try_lock(my_db)))
+        lock_thread.start()
+        lock_thread.join()
+        return 2
+
+    with mock.patch("builtins.open", file_mock):
+        my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+        with mock.patch.object(my_db._value_providers, "get_value", side_effect=get_value):
+            resolved_dict = my_db.get_resolved_params("Device.ControllerNumberOfEntries")
+
+    assert resolved_dict == {"Device.": {"ControllerNumberOfEntries": 2}}
+    assert is_lock_free_list == [True]
+
+
+def try_lock(my_db):
+    is_acquired = my_db._db_lock.acquire(blocking=False)
+    if is_acquired:
+        my_db._db_lock.release()
+
+    return is_acquired
+
+
+def test_get_resolved_params_no_such_path():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+        try:
+            my_db.get_resolved_params("Device.Controller.*.NoSuchParam")
+            assert False, "NoSuchPathError Expected"
+        except agent_db.NoSuchPathError:
+            pass
+
+
 """
  Tests for update
    NOTE: Mocking the _save method
@@ -950,6 +1111,115 @@ def test_update_no_such_path():
             pass
 
 
+def test_update_is_replayed_from_write_ahead_log():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dm_filename = os.path.join(tmp_dir, "dm.json")
+        db_filename = os.path.join(tmp_dir, "db.json")
+        with open(dm_filename, "w") as dm_file:
+            dm_file.write(get_dm_file_contents())
+        with open(db_filename, "w") as db_file:
+            db_file.write(get_db_file_contents())
+
+        my_db = agent_db.Database(dm_filename, db_filename, "intf")
+        my_db.update("Device.LocalAgent.PeriodicInterval", 60)
+        wal_size = os.path.getsize(db_filename + ".wal")
+
+        # Simulate a restart without a clean shutdown
+        my_restarted_db = agent_db.Database(dm_filename, db_filename, "intf")
+        get_value1 = my_restarted_db.get("Device.LocalAgent.PeriodicInterval")
+        my_restarted_db.close()
+
+    assert wal_size > 0
+    assert get_value1 == 60
+
+
+"""
+ Tests for update_many and transaction
+   NOTE: Mocking the _save method
+"""
+
+
+def test_update_many_params():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save') as save_mock:
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+            my_db.update_many({"Device.LocalAgent.PeriodicInterval": 60,
+                               "Device.Controller.1.Enable": False})
+            get_value1 = my_db.get("Device.LocalAgent.PeriodicInterval")
+            get_value2 = my_db.get("Device.Controller.1.Enable")
+
+    save_mock.assert_called_once_with()
+    assert get_value1 == 60
+    assert not get_value2
+
+
+def test_update_many_no_such_path_changes_nothing():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save') as save_mock:
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+
+            try:
+                my_db.update_many({"Device.LocalAgent.PeriodicInterval": 60, "Device.NoSuchParam": "ZZZ"})
+                assert False, "NoSuchPathError Expected"
+            except agent_db.NoSuchPathError:
+                pass
+
+            get_value1 = my_db.get("Device.LocalAgent.PeriodicInterval")
+
+    save_mock.assert_not_called()
+    assert get_value1 == 300
+
+
+def test_transaction_commits_once_on_exit():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save') as save_mock:
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+
+            with my_db.transaction() as db_txn:
+                db_txn.update("Device.LocalAgent.PeriodicInterval", 60)
+                db_txn.update("Device.Controller.1.Enable", False)
+                save_mock.assert_not_called()
+
+            get_value1 = my_db.get("Device.LocalAgent.PeriodicInterval")
+
+    save_mock.assert_called_once_with()
+    assert get_value1 == 60
+
+
+def test_transaction_discarded_on_error():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save') as save_mock:
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+
+            try:
+                with my_db.transaction() as db_txn:
+                    db_txn.update("Device.LocalAgent.PeriodicInterval", 60)
+                    raise ValueError("Abort the Transaction")
+            except ValueError:
+                pass
+
+            get_value1 = my_db.get("Device.LocalAgent.PeriodicInterval")
+
+    save_mock.assert_not_called()
+    assert get_value1 == 300
+
+
 """
  Tests for insert
    NOTE: Mocking the _save method
@@ -966,8 +1236,70 @@ def test_insert_instance():
             my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
             my_db.insert("Device.Services.HomeAutomation.1.Camera.2.Pic.")
 
-    # _save gets called twice during an insert
-    save_mock.assert_called()
+    # The whole new instance is persisted at once
+    save_mock.assert_called_once_with()
+
+
+def test_insert_instance_creates_all_params():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save'):
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+            inst_num = my_db.insert("Device.Services.HomeAutomation.1.Camera.")
+            found_param_list = my_db.find_params("Device.Services.HomeAutomation.1.Camera.3.")
+            get_value1 = my_db.get("Device.Services.HomeAutomation.1.Camera.3.PicNumberOfEntries")
+            get_value2 = my_db.get("Device.Services.HomeAutomation.1.CameraNumberOfEntries")
+            get_value3 = my_db.get("Device.Services.HomeAutomation.1.Camera.3.MaxNumberOfPics")
+
+    # The table has no __NextInstNum__, so the instance number follows the highest one in use
+    assert inst_num == 3
+    assert sorted(found_param_list) == ["Device.Services.HomeAutomation.1.Camera.3.MaxNumberOfPics",
+                                        "Device.Services.HomeAutomation.1.Camera.3.PicNumberOfEntries"]
+    assert get_value1 == 0
+    assert get_value2 == 3
+    assert get_value3 == ""
+
+
+def test_insert_instance_gets_typed_defaults_from_shipped_dm():
+    database_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database")
+
+    for client_type in ("test", "camera", "motion"):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_filename = os.path.join(tmp_dir, "db.json")
+            shutil.copyfile(os.path.join(database_dir, client_type + "-db.json"), db_filename)
+
+            my_db = agent_db.Database(os.path.join(database_dir, client_type + "-dm.json"), db_filename, "intf")
+            inst_num = my_db.insert("Device.LocalAgent.Subscription.")
+            inst_path = "Device.LocalAgent.Subscription.{}.".format(inst_num)
+            get_value1 = my_db.get(inst_path + "Enable")
+            get_value2 = my_db.get(inst_path + "Persistent")
+            get_value3 = my_db.get(inst_path + "TimeToLive")
+            get_value4 = my_db.get(inst_path + "ID")
+            my_db.close()
+
+        assert get_value1 is False
+        assert get_value2 is False
+        assert get_value3 == 0 and not isinstance(get_value3, bool)
+        assert get_value4 == ""
+
+
+def test_insert_instance_no_such_parent_instance():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save'):
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+
+            try:
+                my_db.insert("Device.Services.HomeAutomation.1.Camera.7.Pic.")
+                assert False, "NoSuchPathError Expected"
+            except agent_db.NoSuchPathError:
+                pass
 
 
 def test_insert_instance_no_such_path():
@@ -1005,6 +1337,30 @@ def test_delete_instance():
     save_mock.assert_called_once_with()
 
 
+def test_delete_instance_removes_nested_instances():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save') as save_mock:
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+            my_db.delete("Device.Services.HomeAutomation.1.Camera.2.")
+            found_instances_list = my_db.find_instances("Device.Services.HomeAutomation.1.Camera.*.Pic.")
+            get_value1 = my_db.get("Device.Services.HomeAutomation.1.CameraNumberOfEntries")
+
+            try:
+                my_db.get("Device.Services.HomeAutomation.1.Camera.2.Pic.90.URL")
+                assert False, "NoSuchPathError Expected"
+            except agent_db.NoSuchPathError:
+                pass
+
+    save_mock.assert_called_once_with()
+    assert sorted(found_instances_list) == ["Device.Services.HomeAutomation.1.Camera.1.Pic.10.",
+                                            "Device.Services.HomeAutomation.1.Camera.1.Pic.9."]
+    assert get_value1 == 1
+
+
 def test_delete_instance_no_such_path():
     file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
     db_mock = mock.mock_open(read_data=get_db_file_contents())
@@ -1036,3 +1392,180 @@ def test_delete_instance_no_such_instance():
             assert False, "NoSuchPathError Expected"
         except agent_db.NoSuchPathError:
             pass
+
+
+def test_insert_and_delete_keep_index_in_sync():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save'):
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+            inst_num = my_db.insert("Device.Services.HomeAutomation.1.Camera.2.Pic.")
+            found_instances_list1 = my_db.find_instances("Device.Services.HomeAutomation.1.Camera.2.Pic.")
+            my_db.delete("Device.Services.HomeAutomation.1.Camera.2.Pic.90.")
+            found_instances_list2 = my_db.find_instances("Device.Services.HomeAutomation.1.Camera.2.Pic.")
+            found_param_list = my_db.find_params("Device.Services.HomeAutomation.1.Camera.*.Pic.*.URL")
+
+    assert inst_num == 11
+    assert len(found_instances_list1) == 4
+    assert "Device.Services.HomeAutomation.1.Camera.2.Pic.11." in found_instances_list1
+    assert len(found_instances_list2) == 3
+    assert "Device.Services.HomeAutomation.1.Camera.2.Pic.90." not in found_instances_list2
+    assert len(found_param_list) == 5
+    assert "Device.Services.HomeAutomation.1.Camera.2.Pic.11.URL" in found_param_list
+
+
+def test_batch_rolled_back_on_exception():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save'):
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+
+            try:
+                with my_db.batch():
+                    my_db.update("Device.LocalAgent.PeriodicInterval", 60)
+                    my_db.insert("Device.Services.HomeAutomation.1.Camera.2.Pic.")
+                    my_db.delete("Device.Services.HomeAutomation.1.Camera.2.Pic.90.")
+                    my_db.delete("Device.NoSuchPath.1.")
+                assert False, "NoSuchPathError Expected"
+            except agent_db.NoSuchPathError:
+                pass
+
+            found_instances_list = my_db.find_instances("Device.Services.HomeAutomation.1.Camera.2.Pic.")
+            get_value1 = my_db.get("Device.LocalAgent.PeriodicInterval")
+            get_value2 = my_db.get("Device.Services.HomeAutomation.1.Camera.2.Pic.90.URL")
+
+    assert get_value1 == 300
+    assert len(found_instances_list) == 3
+    assert "Device.Services.HomeAutomation.1.Camera.2.Pic.90." in found_instances_list
+    assert get_value2 is not None
+
+
+def test_change_listener_called_for_writes():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+    change_listener = mock.MagicMock()
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save'):
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+            my_db.add_change_listener(change_listener)
+            my_db.update("Device.LocalAgent.PeriodicInterval", 60)
+            my_db.update_many({"Device.Time.NTPServer1": "ntp1.yyy.com", "Device.Time.NTPServer2": "ntp2.yyy.com"})
+            inst_num = my_db.insert("Device.Services.HomeAutomation.1.Camera.2.Pic.")
+            my_db.delete("Device.Services.HomeAutomation.1.Camera.2.Pic.90.")
+            my_db.remove_change_listener(change_listener)
+            my_db.update("Device.LocalAgent.PeriodicInterval", 120)
+
+    changed_path_lists = [call[0][0] for call in change_listener.call_args_list]
+    assert len(changed_path_lists) == 4
+    assert changed_path_lists[0] == ["Device.LocalAgent.PeriodicInterval"]
+    assert sorted(changed_path_lists[1]) == ["Device.Time.NTPServer1", "Device.Time.NTPServer2"]
+    assert "Device.Services.HomeAutomation.1.Camera.2.Pic." + str(inst_num) + ".URL" in changed_path_lists[2]
+    assert "Device.Services.HomeAutomation.1.Camera.2.Pic.90.URL" in changed_path_lists[3]
+
+
+def test_change_listener_not_called_for_failed_update():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+    change_listener = mock.MagicMock()
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save'):
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+            my_db.add_change_listener(change_listener)
+
+            try:
+                my_db.update_many({"Device.Time.NTPServer1": "ntp1.yyy.com", "Device.NoSuchPath": "value"})
+                assert False, "NoSuchPathError Expected"
+            except agent_db.NoSuchPathError:
+                pass
+
+    change_listener.assert_not_called()
+
+
+def test_change_listener_called_once_after_outermost_batch():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+    lock_held_list = []
+    changed_path_lists = []
+
+    def change_listener(changed_path_list):
+        lock_held_list.append(my_db._db_lock._is_owned())
+        changed_path_lists.append(changed_path_list)
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save'):
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+            my_db.add_change_listener(change_listener)
+
+            with my_db.batch():
+                my_db.update("Device.LocalAgent.PeriodicInterval", 60)
+                with my_db.batch():
+                    my_db.update("Device.Time.NTPServer1", "ntp1.yyy.com")
+                num_calls_in_batch = len(changed_path_lists)
+
+    assert num_calls_in_batch == 0
+    assert changed_path_lists == [["Device.LocalAgent.PeriodicInterval", "Device.Time.NTPServer1"]]
+    assert lock_held_list == [False]
+
+
+def test_change_listener_not_called_for_rolled_back_batch():
+    file_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
+    db_mock = mock.mock_open(read_data=get_db_file_contents())
+    file_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
+    change_listener = mock.MagicMock()
+
+    with mock.patch("builtins.open", file_mock):
+        with mock.patch.object(agent_db.Database, '_save'):
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+            my_db.add_change_listener(change_listener)
+
+            try:
+                with my_db.batch():
+                    my_db.update("Device.LocalAgent.PeriodicInterval", 60)
+                    my_db.insert("Device.Services.HomeAutomation.1.Camera.2.Pic.")
+                    my_db.delete("Device.NoSuchPath.1.")
+                assert False, "NoSuchPathError Expected"
+            except agent_db.NoSuchPathError:
+                pass
+
+            change_listener.assert_not_called()
+            my_db.update("Device.Time.NTPServer1", "ntp1.yyy.com")
+
+    # Neither the rolled back writes nor their restoration leak into the next publish
+    change_listener.assert_called_once_with(["Device.Time.NTPServer1"])
+
+
+def test_insert_and_delete_with_sqlite_storage():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dm_filename = os.path.join(tmp_dir, "dm.json")
+        db_filename = os.path.join(tmp_dir, "db.json")
+        with open(dm_filename, "w") as dm_file:
+            dm_file.write(get_dm_file_contents())
+        with open(db_filename, "w") as db_file:
+            db_file.write(get_db_file_contents())
+
+        my_db = agent_db.Database(dm_filename, db_filename, "intf", storage_engine="sqlite")
+        inst_num = my_db.insert("Device.Services.HomeAutomation.1.Camera.2.Pic.")
+        my_db.delete("Device.Services.HomeAutomation.1.Camera.2.Pic.90.")
+        my_db.close()
+
+        my_restarted_db = agent_db.Database(dm_filename, db_filename, "intf", storage_engine="sqlite")
+        found_instances_list = my_restarted_db.find_instances("Device.Services.HomeAutomation.1.Camera.2.Pic.")
+        get_value1 = my_restarted_db.get("Device.Services.HomeAutomation.1.Camera.2.Pic.__NextInstNum__")
+        my_restarted_db.close()
+
+    assert inst_num == 11
+    assert len(found_instances_list) == 3
+    assert "Device.Services.HomeAutomation.1.Camera.2.Pic.11." in found_instances_list
+    assert "Device.Services.HomeAutomation.1.Camera.2.Pic.90." not in found_instances_list
+    assert get_value1 == 12
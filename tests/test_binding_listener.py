@@ -0,0 +1,155 @@
+# Copyright (c) 2016 John Blackford
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+#
+# File Name: test_binding_listener.py
+#
+# Description: Unit tests for the BindingListener's pool of BindingWorkers
+#
+# Functionality: Test the BindingListener and BindingWorker Classes
+#
+"""
+
+import threading
+import unittest.mock as mock
+
+from agent import abstract_agent
+from agent import request_handler
+from agent import generic_usp_binding
+
+
+
+def handle_request(payload):
+    resp_msg = mock.MagicMock()
+    return mock.MagicMock(), mock.MagicMock(), resp_msg, payload
+
+
+def test_workers_preserve_order_per_source():
+    binding = mock.MagicMock()
+    msg_handler = mock.MagicMock()
+    msg_handler.handle_request.side_effect = handle_request
+    listener = abstract_agent.BindingListener("TEST", binding, msg_handler, num_workers=3)
+
+    for worker in listener._worker_list:
+        worker.start()
+
+    for index in range(20):
+        for reply_to_addr in ["ADDR1", "ADDR2", "ADDR3"]:
+            payload = reply_to_addr + "-" + str(index)
+            listener._dispatch_request(generic_usp_binding.ExpiringQueueItem(payload, reply_to_addr))
+
+    for worker in listener._worker_list:
+        worker.stop()
+        worker.join(5)
+
+    for reply_to_addr in ["ADDR1", "ADDR2", "ADDR3"]:
+        sent_list = [call[0][0] for call in binding.send_msg.call_args_list if call[0][1] == reply_to_addr]
+        assert sent_list == [reply_to_addr + "-" + str(index) for index in range(20)]
+
+
+def test_slow_request_does_not_block_other_sources():
+    slow_event = threading.Event()
+    fast_event = threading.Event()
+
+    def handle_slow_request(payload):
+        if payload == "SLOW":
+            # Only completes once the request from the other source has been handled
+            fast_event.wait(5)
+            slow_event.set()
+        else:
+            fast_event.set()
+        return handle_request(payload)
+
+    binding = mock.MagicMock()
+    msg_handler = mock.MagicMock()
+    msg_handler.handle_request.side_effect = handle_slow_request
+    listener = abstract_agent.BindingListener("TEST", binding, msg_handler, num_workers=2)
+    listener._worker_list[0].start()
+    listener._worker_list[1].start()
+
+    listener._worker_list[0].put(generic_usp_binding.ExpiringQueueItem("SLOW", "ADDR1"))
+    listener._worker_list[1].put(generic_usp_binding.ExpiringQueueItem("FAST", "ADDR2"))
+
+    for worker in listener._worker_list:
+        worker.stop()
+        worker.join(5)
+
+    assert slow_event.is_set()
+    assert fast_event.is_set()
+
+
+def test_single_worker_handles_inline():
+    binding = mock.MagicMock()
+    msg_handler = mock.MagicMock()
+    msg_handler.handle_request.side_effect = handle_request
+    listener = abstract_agent.BindingListener("TEST", binding, msg_handler)
+
+    listener._dispatch_request(generic_usp_binding.ExpiringQueueItem("PAYLOAD", "ADDR1"))
+
+    assert listener._worker_list == []
+    binding.send_msg.assert_called_once_with("PAYLOAD", "ADDR1")
+
+
+def test_process_request_without_address():
+    binding = mock.MagicMock()
+    msg_handler = mock.MagicMock()
+    msg_handler.handle_request.side_effect = handle_request
+    listener = abstract_agent.BindingListener("TEST", binding, msg_handler)
+
+    assert listener.process_request("PAYLOAD", "ADDR1") == "PAYLOAD"
+    assert listener.process_request("PAYLOAD", None) is None
+    binding.send_msg.assert_not_called()
+
+
+def test_process_request_protocol_violation():
+    binding = mock.MagicMock()
+    msg_handler = mock.MagicMock()
+    msg_handler.handle_request.side_effect = request_handler.ProtocolViolationError("Invalid")
+    listener = abstract_agent.BindingListener("TEST", binding, msg_handler)
+
+    listener._dispatch_request(generic_usp_binding.ExpiringQueueItem("PAYLOAD", "ADDR1"))
+
+    binding.send_msg.assert_not_called()
+
+
+def test_request_acked_after_response_sent():
+    binding = mock.MagicMock()
+    msg_handler = mock.MagicMock()
+    msg_handler.handle_request.side_effect = handle_request
+    listener = abstract_agent.BindingListener("TEST", binding, msg_handler)
+    queue_item = generic_usp_binding.ExpiringQueueItem("PAYLOAD", "ADDR1", ack_id="ACK1")
+
+    listener._dispatch_request(queue_item)
+
+    assert binding.method_calls == [mock.call.send_msg("PAYLOAD", "ADDR1"), mock.call.ack_msg(queue_item)]
+
+
+def test_protocol_violation_acked():
+    binding = mock.MagicMock()
+    msg_handler = mock.MagicMock()
+    msg_handler.handle_request.side_effect = request_handler.ProtocolViolationError("Invalid")
+    listener = abstract_agent.BindingListener("TEST", binding, msg_handler)
+    queue_item = generic_usp_binding.ExpiringQueueItem("PAYLOAD", "ADDR1", ack_id="ACK1")
+
+    listener._dispatch_request(queue_item)
+
+    binding.send_msg.assert_not_called()
+    binding.ack_msg.assert_called_once_with(queue_item)
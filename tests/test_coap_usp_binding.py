@@ -0,0 +1,256 @@
+# Copyright (c) 2016 John Blackford
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+#
+# File Name: test_coap_usp_binding.py
+#
+# Description: Unit tests for the coap_usp_binding
+#
+# Functionality: Test the CoapUspBinding Class over the loopback interface
+#  - The messages go through aiocoap's Client Context and Server Context (Responder), not hand-built Requests
+#
+"""
+
+import time
+import socket
+import asyncio
+import unittest
+import threading
+import concurrent.futures
+
+try:
+    import aiocoap
+    from agent import coap_usp_binding
+except ImportError:
+    raise unittest.SkipTest("aiocoap is not installed")
+
+
+def get_bindings(block_size, port, **kwargs):
+    recv_binding = coap_usp_binding.CoapUspBinding("127.0.0.1", "RECV-ID", listen_port=port, **kwargs)
+    send_binding = coap_usp_binding.CoapUspBinding("127.0.0.1", "SEND-ID", listen_port=port + 1,
+                                                   block_size=block_size)
+    recv_binding.listen("coap://127.0.0.1:{}/usp".format(port))
+    # The Server Context is created on the Event Loop Thread
+    time.sleep(0.5)
+
+    return recv_binding, send_binding
+
+
+def wait_until(condition_func, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition_func() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@asyncio.coroutine
+def post_request(binding, payload, to_addr):
+    """POST through the binding's Client Context, returning the whole CoAP Response (not just its code)"""
+    msg = aiocoap.Message(code=aiocoap.Code.POST, payload=payload)
+    msg.opt.content_format = 42
+    msg.set_request_uri(to_addr + "?reply-to=" + binding._reply_to)
+    context = yield from binding._get_client_context()
+    resp = yield from context.request(msg).response
+    return resp
+
+
+def get_piggyback_bindings(port, handle_request, piggyback_deadline):
+    recv_binding, send_binding = get_bindings(1024, port)
+    recv_binding.set_request_handler(handle_request, concurrent.futures.ThreadPoolExecutor(2),
+                                     piggyback_deadline=piggyback_deadline)
+    # The deferred Responses are POSTed to the sender's reply-to address
+    send_binding.listen("coap://127.0.0.1:{}/usp".format(port + 1))
+    time.sleep(0.5)
+
+    return recv_binding, send_binding
+
+
+def test_send_msg_block1_transfer_reassembled():
+    payload = bytes(range(256)) * 20
+    recv_binding, send_binding = get_bindings(64, 15683)
+
+    try:
+        resp_code = send_binding.send_msg(payload, "coap://127.0.0.1:15683/usp").result(10)
+        queue_item = recv_binding.get_msg(5)
+    finally:
+        send_binding.clean_up()
+        recv_binding.clean_up()
+
+    assert resp_code == aiocoap.Code.CHANGED
+    assert queue_item.get_payload() == payload
+    assert queue_item.get_reply_to_addr() == "coap://127.0.0.1:15684/usp"
+
+
+def test_send_msg_single_block():
+    payload = b"usp-record"
+    recv_binding, send_binding = get_bindings(1024, 15685)
+
+    try:
+        resp_code = send_binding.send_msg(payload, "coap://127.0.0.1:15685/usp").result(10)
+        queue_item = recv_binding.get_msg(5)
+    finally:
+        send_binding.clean_up()
+        recv_binding.clean_up()
+
+    assert resp_code == aiocoap.Code.CHANGED
+    assert queue_item.get_payload() == payload
+
+
+def test_send_msg_runs_on_shared_event_loop():
+    recv_binding, send_binding = get_bindings(1024, 15691)
+
+    try:
+        resp_future_list = [send_binding.send_msg(payload, "coap://127.0.0.1:15691/usp")
+                            for payload in (b"MSG-1", b"MSG-2", b"MSG-3")]
+        resp_code_list = [resp_future.result(10) for resp_future in resp_future_list]
+        client_context_future = send_binding._client_context_future
+        last_resp_code = send_binding.send_msg(b"MSG-4", "coap://127.0.0.1:15691/usp").result(10)
+        payload_list = [recv_binding.get_msg(5).get_payload() for _ in range(4)]
+    finally:
+        send_binding.clean_up()
+        recv_binding.clean_up()
+
+    assert all(isinstance(resp_future, concurrent.futures.Future) for resp_future in resp_future_list)
+    assert resp_code_list == [aiocoap.Code.CHANGED] * 3
+    assert last_resp_code == aiocoap.Code.CHANGED
+    # The Client Context is created once on the Event Loop, and reused for every message
+    assert send_binding._client_context_future is client_context_future
+    assert sorted(payload_list) == [b"MSG-1", b"MSG-2", b"MSG-3", b"MSG-4"]
+
+
+def test_send_msg_timeout_resolves_to_none():
+    # Swallows the CoAP message without ever responding
+    silent_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent_sock.bind(("127.0.0.1", 15693))
+    send_binding = coap_usp_binding.CoapUspBinding("127.0.0.1", "SEND-ID", listen_port=15694, send_timeout=0.5)
+
+    try:
+        start_time = time.monotonic()
+        resp_code = send_binding.send_msg(b"usp-record", "coap://127.0.0.1:15693/usp").result(10)
+        elapsed_time = time.monotonic() - start_time
+        assert silent_sock.recv(1024)
+    finally:
+        send_binding.clean_up()
+        silent_sock.close()
+
+    assert resp_code is None
+    assert elapsed_time < 3
+
+
+def test_send_msg_invalid_address_resolves_to_none():
+    send_binding = coap_usp_binding.CoapUspBinding("127.0.0.1", "SEND-ID", listen_port=15696)
+
+    try:
+        resp_code = send_binding.send_msg(b"usp-record", "coap://[::1/usp").result(10)
+    finally:
+        send_binding.clean_up()
+
+    assert resp_code is None
+
+
+def test_congested_queue_rejects_request():
+    recv_binding, send_binding = get_bindings(1024, 15687, max_queue_size=1, busy_max_age=7)
+
+    try:
+        resp_code = send_binding.send_msg(b"REQ-1", "coap://127.0.0.1:15687/usp").result(10)
+        busy_resp_code = send_binding.send_msg(b"REQ-2", "coap://127.0.0.1:15687/usp").result(10)
+        queue_item = recv_binding.get_msg(5)
+    finally:
+        send_binding.clean_up()
+        recv_binding.clean_up()
+
+    assert resp_code == aiocoap.Code.CHANGED
+    assert busy_resp_code == aiocoap.Code.SERVICE_UNAVAILABLE
+    assert queue_item.get_payload() == b"REQ-1"
+
+
+def test_asyncio_native_rejects_requests_over_high_watermark():
+    handler_semaphore = threading.Semaphore(0)
+    release_event = threading.Event()
+
+    def handle_request(_payload, _reply_to_addr):
+        handler_semaphore.release()
+        release_event.wait(5)
+        return None
+
+    recv_binding, send_binding = get_bindings(1024, 15689, max_queue_size=4, high_watermark=2, low_watermark=0,
+                                              busy_max_age=7)
+    recv_binding.set_request_handler(handle_request, concurrent.futures.ThreadPoolExecutor(4))
+    to_addr = "coap://127.0.0.1:15689/usp"
+
+    try:
+        resp_future_list = [send_binding.send_msg(b"REQ-1", to_addr), send_binding.send_msg(b"REQ-2", to_addr)]
+        # Requests from the same address are handled in order, so the 2nd waits behind the 1st
+        assert handler_semaphore.acquire(timeout=5)
+        wait_until(lambda: recv_binding._num_in_flight == 2)
+        busy_resp_code = send_binding.send_msg(b"REQ-3", to_addr).result(10)
+        release_event.set()
+        resp_code_list = [resp_future.result(10) for resp_future in resp_future_list]
+        drained_resp_code = send_binding.send_msg(b"REQ-4", to_addr).result(10)
+    finally:
+        release_event.set()
+        send_binding.clean_up()
+        recv_binding.clean_up()
+
+    assert busy_resp_code == aiocoap.Code.SERVICE_UNAVAILABLE
+    assert resp_code_list == [aiocoap.Code.CHANGED, aiocoap.Code.CHANGED]
+    assert drained_resp_code == aiocoap.Code.CHANGED
+    assert recv_binding._num_in_flight == 0
+
+
+def test_piggyback_response_within_deadline():
+    def handle_request(payload, _reply_to_addr):
+        return b"RESP:" + payload
+
+    recv_binding, send_binding = get_piggyback_bindings(15697, handle_request, 2)
+
+    try:
+        resp = asyncio.run_coroutine_threadsafe(
+            post_request(send_binding, b"REQ", "coap://127.0.0.1:15697/usp"), send_binding._event_loop).result(10)
+        deferred_item = send_binding.get_msg(1)
+    finally:
+        send_binding.clean_up()
+        recv_binding.clean_up()
+
+    assert resp.code == aiocoap.Code.CHANGED
+    assert resp.payload == b"RESP:REQ"
+    # Piggybacked, so no separate POST was made
+    assert deferred_item is None
+
+
+def test_response_posted_after_piggyback_deadline():
+    def handle_request(payload, _reply_to_addr):
+        time.sleep(0.5)
+        return b"RESP:" + payload
+
+    recv_binding, send_binding = get_piggyback_bindings(15699, handle_request, 0.1)
+
+    try:
+        resp = asyncio.run_coroutine_threadsafe(
+            post_request(send_binding, b"REQ", "coap://127.0.0.1:15699/usp"), send_binding._event_loop).result(10)
+        deferred_item = send_binding.get_msg(5)
+    finally:
+        send_binding.clean_up()
+        recv_binding.clean_up()
+
+    assert resp.code == aiocoap.Code.CHANGED
+    assert resp.payload == b""
+    assert deferred_item.get_payload() == b"RESP:REQ"
+    assert deferred_item.get_reply_to_addr() == "coap://127.0.0.1:15699/usp"
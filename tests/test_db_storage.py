@@ -0,0 +1,132 @@
+"""
+Copyright (c) 2016 John Blackford
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+# File Name: test_db_storage.py
+#
+# Description: Unit tests for the Database Storage Engines
+#
+"""
+
+import os
+import json
+import tempfile
+
+from agent import db_storage
+
+
+def get_db_contents():
+    db_contents = {
+        "Device.LocalAgent.EndpointID": "agent-1",
+        "Device.LocalAgent.Controller.1.EndpointID": "controller-1",
+        "Device.LocalAgent.Controller.1.MTP.1.Protocol": "STOMP",
+        "Device.LocalAgent.Controller.1.MTP.2.Protocol": "CoAP",
+        "Device.LocalAgent.Controller.2.EndpointID": "controller-2",
+        "Device.LocalAgent.Controller.__NextInstNum__": 3,
+        "Device.LocalAgentX.Enable": True
+    }
+    return db_contents
+
+
+def create_engines(tmp_dir):
+    db_filename = os.path.join(tmp_dir, "db.json")
+    with open(db_filename, "w") as db_file:
+        json.dump(get_db_contents(), db_file)
+
+    return [db_storage.create_storage_engine(db_storage.DICT_ENGINE, db_filename),
+            db_storage.create_storage_engine(db_storage.SQLITE_ENGINE, db_filename)]
+
+
+def test_engines_resolve_the_same_paths():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for engine in create_engines(tmp_dir):
+            assert sorted(engine.resolve("Device.LocalAgent.Controller.*.")) == \
+                ["Device.LocalAgent.Controller.1.", "Device.LocalAgent.Controller.2."]
+            assert sorted(engine.resolve("Device.LocalAgent.Controller.*.MTP.*.Protocol")) == \
+                ["Device.LocalAgent.Controller.1.MTP.1.Protocol", "Device.LocalAgent.Controller.1.MTP.2.Protocol"]
+            assert engine.resolve("Device.LocalAgent.") == ["Device.LocalAgent."]
+            assert engine.resolve("Device.LocalAgent.Controller.3.") == []
+            assert engine.resolve("Device.LocalAgent.EndpointID") == ["Device.LocalAgent.EndpointID"]
+            engine.close()
+
+
+def test_engines_scan_the_same_prefix():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for engine in create_engines(tmp_dir):
+            scanned_dict = dict(engine.scan_prefix("Device.LocalAgent."))
+            child_name_list = engine.get_child_names("Device.LocalAgent.Controller.")
+            engine.close()
+
+            assert len(scanned_dict) == 6
+            assert "Device.LocalAgentX.Enable" not in scanned_dict
+            assert scanned_dict["Device.LocalAgent.Controller.__NextInstNum__"] == 3
+            assert sorted(child_name_list) == ["1", "2", "__NextInstNum__"]
+
+
+def test_engines_remove_the_same_prefix():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for engine in create_engines(tmp_dir):
+            removed_path_list = engine.remove_prefix("Device.LocalAgent.Controller.1.")
+            instance_list = engine.resolve("Device.LocalAgent.Controller.*.")
+            engine.close()
+
+            assert sorted(removed_path_list) == ["Device.LocalAgent.Controller.1.EndpointID",
+                                                 "Device.LocalAgent.Controller.1.MTP.1.Protocol",
+                                                 "Device.LocalAgent.Controller.1.MTP.2.Protocol"]
+            assert instance_list == ["Device.LocalAgent.Controller.2."]
+
+
+def test_sqlite_engine_persists_committed_changes():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_filename = os.path.join(tmp_dir, "db.json")
+        with open(db_filename, "w") as db_file:
+            json.dump(get_db_contents(), db_file)
+
+        engine = db_storage.SqliteStorageEngine(db_filename)
+        engine.set("Device.LocalAgent.Controller.3.EndpointID", "controller-3")
+        engine.set("Device.LocalAgent.EndpointID", "agent-2")
+        engine.remove("Device.LocalAgent.Controller.2.EndpointID")
+        engine.commit()
+        engine.close()
+
+        # The JSON file only seeds a new SQLite DB, so changing it now must not matter
+        with open(db_filename, "w") as db_file:
+            json.dump({}, db_file)
+
+        reopened_engine = db_storage.SqliteStorageEngine(db_filename)
+        get_value1 = reopened_engine.get("Device.LocalAgent.EndpointID")
+        instance_list = reopened_engine.resolve("Device.LocalAgent.Controller.*.")
+        reopened_engine.close()
+
+    assert get_value1 == "agent-2"
+    assert instance_list == ["Device.LocalAgent.Controller.1.", "Device.LocalAgent.Controller.3."]
+
+
+def test_sqlite_engine_remove_no_such_path():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engines(tmp_dir)[1]
+
+        try:
+            engine.remove("Device.NoSuchParam")
+            assert False, "KeyError Expected"
+        except KeyError:
+            pass
+        finally:
+            engine.close()
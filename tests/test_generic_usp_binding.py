@@ -28,6 +28,8 @@
 #
 """
 
+import time
+import threading
 import unittest.mock as mock
 
 from agent import generic_usp_binding
@@ -109,30 +111,87 @@ def test_get_msg_found():
     timeout = 15
     payload = "TEST"
     reply_to_addr = "ADDR"
-    time_mock = mock.Mock()
-    time_mock.return_value = None
 
-    binding = generic_usp_binding.GenericUspBinding(5)
+    binding = generic_usp_binding.GenericUspBinding()
     binding.push(payload, reply_to_addr)
 
-    with mock.patch("time.sleep", time_mock):
-        received_payload = binding.get_msg(timeout).get_payload()
+    received_payload = binding.get_msg(timeout).get_payload()
 
     assert payload == received_payload
 
 
 
 def test_get_msg_not_found_empty_queue():
-    timeout = 15
-    time_mock = mock.Mock()
-    time_mock.return_value = None
+    timeout = 0.1
 
-    binding = generic_usp_binding.GenericUspBinding(5)
+    binding = generic_usp_binding.GenericUspBinding()
 
-    with mock.patch("time.sleep", time_mock):
-        queue_item = binding.get_msg(timeout)
+    start_time = time.monotonic()
+    queue_item = binding.get_msg(timeout)
 
     assert queue_item is None
+    assert time.monotonic() - start_time >= timeout
+
+
+
+def test_get_msg_woken_by_push():
+    timeout = 15
+    payload = "TEST"
+    reply_to_addr = "ADDR"
+
+    binding = generic_usp_binding.GenericUspBinding()
+    pusher = threading.Timer(0.05, binding.push, args=(payload, reply_to_addr))
+    pusher.start()
+
+    start_time = time.monotonic()
+    received_payload = binding.get_msg(timeout).get_payload()
+    pusher.join()
+
+    assert payload == received_payload
+    assert time.monotonic() - start_time < 1
+
+
+
+def test_get_msg_skips_expired_entries():
+    timeout = 15
+    payload1 = "TEST1"
+    reply_to_addr1 = "ADDR1"
+    payload2 = "TEST2"
+    reply_to_addr2 = "ADDR2"
+
+    binding = generic_usp_binding.GenericUspBinding()
+    binding.push(payload1, reply_to_addr1)
+    binding.push(payload2, reply_to_addr2)
+    binding._incoming_queue[0]._ttl = -1
+
+    received_payload = binding.get_msg(timeout).get_payload()
+
+    assert payload2 == received_payload
+    assert binding.pop() is None
+
+
+def test_expired_entries_are_acked():
+    binding = generic_usp_binding.GenericUspBinding()
+    binding.push("TEST1", "ADDR1", "ACK1")
+    binding.push("TEST2", "ADDR2", "ACK2")
+    binding._incoming_queue[0]._ttl = -1
+
+    with mock.patch.object(binding, "ack_msg") as ack_msg:
+        queue_item = binding.get_msg(15)
+
+    assert queue_item.get_ack_id() == "ACK2"
+    assert [call[0][0].get_ack_id() for call in ack_msg.call_args_list] == ["ACK1"]
+
+
+
+def test_push_full_queue():
+    binding = generic_usp_binding.GenericUspBinding(2)
+
+    assert binding.push("TEST1", "ADDR1")
+    assert binding.push("TEST2", "ADDR2")
+    assert not binding.push("TEST3", "ADDR3")
+    assert binding.pop().get_payload() == "TEST1"
+    assert binding.push("TEST4", "ADDR4")
 
 
 
@@ -162,3 +221,25 @@ def test_get_msg_not_found_not_my_msg():
         assert queue_item.get_payload() == payload3
         queue_item = binding.get_msg(timeout)
         assert queue_item.get_payload() == payload1
+
+
+
+def test_watermarks():
+    binding = generic_usp_binding.GenericUspBinding(10, high_watermark=4, low_watermark=2)
+    binding._on_queue_congested = mock.Mock()
+    binding._on_queue_drained = mock.Mock()
+
+    for index in range(4):
+        assert binding.push("TEST" + str(index), "ADDR")
+
+    assert binding.is_congested()
+    binding._on_queue_congested.assert_called_once_with()
+
+    binding.pop()
+    assert binding.is_congested()
+    binding._on_queue_drained.assert_not_called()
+
+    binding.get_msg(15)
+    assert not binding.is_congested()
+    binding._on_queue_drained.assert_called_once_with()
+    assert binding.get_queue_depth() == 2
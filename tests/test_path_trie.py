@@ -0,0 +1,110 @@
+# Copyright (c) 2016 John Blackford
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+#
+# File Name: test_path_trie.py
+#
+# Description: Unit tests for the PathTrie utils module
+#
+# Functionality: Test the PathTrie Class
+#
+"""
+
+
+from agent import utils
+
+
+def get_path_list():
+    return [
+        "Device.LocalAgent.EndpointID",
+        "Device.LocalAgent.MTP.1.Enable",
+        "Device.LocalAgent.MTP.1.CoAP.Port",
+        "Device.LocalAgent.MTP.2.Enable",
+        "Device.LocalAgent.MTP.__NextInstNum__",
+        "Device.LocalAgent.Controller.1.MTP.1.Enable",
+        "Device.LocalAgent.Controller.2.MTP.1.Enable",
+        "Device.LocalAgent.Controller.2.MTP.3.Enable"
+    ]
+
+
+def test_contains():
+    trie = utils.PathTrie(get_path_list())
+
+    assert trie.contains("Device.LocalAgent.EndpointID")
+    assert trie.contains("Device.LocalAgent.MTP.1.")
+    assert not trie.contains("Device.LocalAgent.MTP.1")
+    assert not trie.contains("Device.LocalAgent.MTP.3.")
+    assert not trie.contains("Device.LocalAgent.Endpoint")
+
+
+def test_resolve_partial_path():
+    trie = utils.PathTrie(get_path_list())
+
+    assert trie.resolve("Device.LocalAgent.") == ["Device.LocalAgent."]
+    assert trie.resolve("Device.NoSuchObject.") == []
+
+
+def test_resolve_wildcard_path():
+    trie = utils.PathTrie(get_path_list())
+    found_list1 = trie.resolve("Device.LocalAgent.MTP.*.")
+    found_list2 = trie.resolve("Device.LocalAgent.Controller.*.MTP.*.Enable")
+
+    assert found_list1 == ["Device.LocalAgent.MTP.1.", "Device.LocalAgent.MTP.2."]
+    assert len(found_list2) == 3
+    assert "Device.LocalAgent.Controller.1.MTP.1.Enable" in found_list2
+    assert "Device.LocalAgent.Controller.2.MTP.1.Enable" in found_list2
+    assert "Device.LocalAgent.Controller.2.MTP.3.Enable" in found_list2
+
+
+def test_resolve_full_path_only_matches_params():
+    trie = utils.PathTrie(get_path_list())
+
+    assert trie.resolve("Device.LocalAgent.MTP.1.Enable") == ["Device.LocalAgent.MTP.1.Enable"]
+    assert trie.resolve("Device.LocalAgent.MTP.1.CoAP") == []
+
+
+def test_children():
+    trie = utils.PathTrie(get_path_list())
+
+    assert trie.get_child_names("Device.LocalAgent.MTP.") == ["1", "2", "__NextInstNum__"]
+    assert trie.get_child_objects("Device.LocalAgent.MTP.1.") == ["CoAP"]
+    assert trie.get_child_params("Device.LocalAgent.MTP.1.") == ["Enable"]
+    assert trie.get_child_names("Device.NoSuchObject.") == []
+
+
+def test_iter_objects_and_params():
+    trie = utils.PathTrie(get_path_list())
+    obj_list = list(trie.iter_objects("Device.LocalAgent.MTP."))
+    param_list = list(trie.iter_params("Device.LocalAgent.MTP."))
+
+    assert obj_list == ["Device.LocalAgent.MTP.", "Device.LocalAgent.MTP.1.",
+                        "Device.LocalAgent.MTP.1.CoAP.", "Device.LocalAgent.MTP.2."]
+    assert param_list == ["Device.LocalAgent.MTP.__NextInstNum__", "Device.LocalAgent.MTP.1.Enable",
+                          "Device.LocalAgent.MTP.1.CoAP.Port", "Device.LocalAgent.MTP.2.Enable"]
+
+
+def test_remove_prunes_empty_objects():
+    trie = utils.PathTrie(get_path_list())
+    trie.remove("Device.LocalAgent.Controller.1.MTP.1.Enable")
+    trie.remove("Device.LocalAgent.NoSuchParam")
+
+    assert not trie.contains("Device.LocalAgent.Controller.1.")
+    assert trie.resolve("Device.LocalAgent.Controller.*.") == ["Device.LocalAgent.Controller.2."]
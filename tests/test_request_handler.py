@@ -29,6 +29,8 @@ import unittest.mock as mock
 
 from agent import agent_db
 from agent import request_handler
+from agent import usp_msg_pb2 as usp_msg
+from agent import usp_record_pb2 as usp_record
 
 
 """
@@ -61,89 +63,6 @@ def test_is_set_path_searching():
     assert req_handler._is_partial_path_searching("Device.Controller.*."), "Wildcard-based Searching Path Failure"
 
 
-"""
- Tests for _split_path
-"""
-
-
-def test_split_path_full_path():
-    endpoint_id = "ENDPOINT-ID"
-    mock_db = mock.create_autospec(agent_db.Database)
-    req_handler = request_handler.UspRequestHandler(endpoint_id, mock_db)
-    path = "Device.LocalAgent.Controller.1.MTP.1.Protocol"
-
-    partial_path, param_name = req_handler._split_path(path)
-
-    assert partial_path == "Device.LocalAgent.Controller.1.MTP.1.", "Partial Path Failure"
-    assert param_name == "Protocol", "Parameter Name Failure"
-
-def test_split_path_partial_path():
-    endpoint_id = "ENDPOINT-ID"
-    mock_db = mock.create_autospec(agent_db.Database)
-    req_handler = request_handler.UspRequestHandler(endpoint_id, mock_db)
-    path = "Device.LocalAgent.Controller.1.MTP.1."
-
-    partial_path, param_name = req_handler._split_path(path)
-
-    assert partial_path == "Device.LocalAgent.Controller.1.MTP.1.", "Partial Path Failure"
-    assert param_name is None, "Parameter Name Failure, should be None"
-
-def test_split_path_wildcard_path():
-    endpoint_id = "ENDPOINT-ID"
-    mock_db = mock.create_autospec(agent_db.Database)
-    req_handler = request_handler.UspRequestHandler(endpoint_id, mock_db)
-    path = "Device.LocalAgent.Controller.*.MTP.*."
-
-    partial_path, param_name = req_handler._split_path(path)
-
-    assert partial_path == "Device.LocalAgent.Controller.*.MTP.*.", "Partial Path Failure"
-    assert param_name is None, "Parameter Name Failure, should be None"
-
-
-
-"""
- Tests for _diff_paths
-"""
-
-
-def test_diff_paths_partial_path_req():
-    endpoint_id = "ENDPOINT-ID"
-    mock_db = mock.create_autospec(agent_db.Database)
-    req_handler = request_handler.UspRequestHandler(endpoint_id, mock_db)
-    req_path = "Device.LocalAgent.Controller."
-    param_path = "Device.LocalAgent.Controller.1.EndpointID"
-
-    diff_path = req_handler._diff_paths(req_path, param_path)
-
-    assert diff_path == "1.EndpointID"
-
-def test_diff_paths_wildcard_path_req():
-    endpoint_id = "ENDPOINT-ID"
-    mock_db = mock.create_autospec(agent_db.Database)
-    req_handler = request_handler.UspRequestHandler(endpoint_id, mock_db)
-    req_path = "Device.LocalAgent.Controller.*."
-    param_path = "Device.LocalAgent.Controller.1.EndpointID"
-
-    diff_path = req_handler._diff_paths(req_path, param_path)
-
-    assert diff_path == "1.EndpointID"
-
-def test_diff_paths_multiple_wildcard_path_req():
-    endpoint_id = "ENDPOINT-ID"
-    mock_db = mock.create_autospec(agent_db.Database)
-    req_handler = request_handler.UspRequestHandler(endpoint_id, mock_db)
-    req_path = "Device.LocalAgent.Controller.*.MTP.*."
-    param_path = "Device.LocalAgent.Controller.1.MTP.2.Protocol"
-
-    diff_path = req_handler._diff_paths(req_path, param_path)
-
-    assert diff_path == "1.MTP.2.Protocol"
-
-
-"""
- Tests for _get_affected_paths_for_get
-"""
-
 def get_db_file_contents():
     db_contents = """{
         "Device.SubscriptionNumberOfEntries": "__NUM_ENTRIES__",
@@ -204,59 +123,358 @@ def get_dm_file_contents():
     }"""
     return dm_contents
 
-def test_get_affected_paths_for_get_partial_path():
+"""
+ Tests for _process_set
+"""
+
+def test_process_set_updates_database_once():
     endpoint_id = "ENDPOINT-ID"
     my_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
     db_mock = mock.mock_open(read_data=get_db_file_contents())
     my_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
-    partial_path = "Device.Subscription."
+
+    req_msg = usp_msg.Msg()
+    req_msg.header.msg_id = "SET-1"
+    req_msg.header.msg_type = usp_msg.Header.SET
+    update_obj = req_msg.body.request.set.update_objs.add()
+    update_obj.obj_path = "Device.Subscription.*."
+    param_setting = update_obj.param_settings.add()
+    param_setting.param = "ID"
+    param_setting.value = "sub-new"
 
     with mock.patch("builtins.open", my_mock):
-        my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
-        req_handler = request_handler.UspRequestHandler(endpoint_id, my_db)
-        affected_path_list = req_handler._get_affected_paths_for_get(partial_path)
+        with mock.patch.object(agent_db.Database, '_save') as save_mock:
+            my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
+            req_handler = request_handler.UspRequestHandler(endpoint_id, my_db)
+            resp_msg = req_handler._process_set(req_msg)
+            get_value1 = my_db.get("Device.Subscription.3.ID")
 
-    assert len(affected_path_list) == 1, "expecting 1, found " + str(len(affected_path_list))
-    assert affected_path_list[0] == "Device.Subscription."
+    save_mock.assert_called_once_with()
+    assert resp_msg.header.msg_type == usp_msg.Header.SET_RESP
+    assert get_value1 == "sub-new"
 
-def test_get_affected_paths_for_get_wildcard_path():
-    endpoint_id = "ENDPOINT-ID"
+
+"""
+ Tests for _process_add and _process_delete
+"""
+
+def get_request_handler():
     my_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
     db_mock = mock.mock_open(read_data=get_db_file_contents())
     my_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
-    partial_path = "Device.Subscription.*."
 
     with mock.patch("builtins.open", my_mock):
         my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
-        req_handler = request_handler.UspRequestHandler(endpoint_id, my_db)
-        affected_path_list = req_handler._get_affected_paths_for_get(partial_path)
 
-    assert len(affected_path_list) == 3, "expecting 3, found " + str(len(affected_path_list))
+    my_db._storage.commit = mock.MagicMock()
+    return my_db, request_handler.UspRequestHandler("ENDPOINT-ID", my_db)
+
+
+def test_process_add_search_path():
+    my_db, req_handler = get_request_handler()
+    req_msg = usp_msg.Msg()
+    req_msg.header.msg_id = "ADD-1"
+    req_msg.header.msg_type = usp_msg.Header.ADD
+    create_obj = req_msg.body.request.add.create_objs.add()
+    create_obj.obj_path = "Device.Subscription."
+    param_setting = create_obj.param_settings.add()
+    param_setting.param = "ID"
+    param_setting.value = "sub-new"
+    param_setting = create_obj.param_settings.add()
+    param_setting.param = "NoSuchParam"
+    param_setting.value = "ZZZ"
+    create_obj = req_msg.body.request.add.create_objs.add()
+    create_obj.obj_path = "Device.Services.HomeAutomation.1.Camera.*.Pic."
+
+    resp_msg = req_handler._process_add(req_msg)
+    created_obj_results = resp_msg.body.response.add_resp.created_obj_results
+
+    assert resp_msg.header.msg_type == usp_msg.Header.ADD_RESP
+    assert len(created_obj_results) == 3
+    assert created_obj_results[0].oper_status.oper_success.instantiated_path == "Device.Subscription.4."
+    assert created_obj_results[0].oper_status.oper_success.param_errs[0].param == "NoSuchParam"
+    assert created_obj_results[1].oper_status.oper_success.instantiated_path == \
+        "Device.Services.HomeAutomation.1.Camera.1.Pic.11."
+    assert created_obj_results[2].oper_status.oper_success.instantiated_path == \
+        "Device.Services.HomeAutomation.1.Camera.2.Pic.11."
+    assert my_db.get("Device.Subscription.4.ID") == "sub-new"
+    assert my_db.get("Device.SubscriptionNumberOfEntries") == 4
+    my_db._storage.commit.assert_called_once_with()
+
+
+def test_process_add_invalid_path_fails_entire_add():
+    my_db, req_handler = get_request_handler()
+    req_msg = usp_msg.Msg()
+    req_msg.header.msg_id = "ADD-2"
+    req_msg.header.msg_type = usp_msg.Header.ADD
+    create_obj = req_msg.body.request.add.create_objs.add()
+    create_obj.obj_path = "Device.Subscription."
+    create_obj = req_msg.body.request.add.create_objs.add()
+    create_obj.obj_path = "Device.NoSuchTable."
+
+    resp_msg = req_handler._process_add(req_msg)
+
+    assert resp_msg.header.msg_type == usp_msg.Header.ERROR
+    assert resp_msg.body.error.param_errs[0].param_path == "Device.NoSuchTable."
+    assert my_db.get("Device.SubscriptionNumberOfEntries") == 3
+    my_db._storage.commit.assert_not_called()
+
+
+def test_process_delete_allow_partial():
+    my_db, req_handler = get_request_handler()
+    req_msg = usp_msg.Msg()
+    req_msg.header.msg_id = "DELETE-1"
+    req_msg.header.msg_type = usp_msg.Header.DELETE
+    req_msg.body.request.delete.allow_partial = True
+    req_msg.body.request.delete.obj_paths.extend(["Device.Services.HomeAutomation.1.Camera.2.Pic.*.",
+                                                  "Device.Subscription.",
+                                                  "Device.Subscription.9."])
+
+    resp_msg = req_handler._process_delete(req_msg)
+    deleted_obj_results = resp_msg.body.response.delete_resp.deleted_obj_results
+
+    assert resp_msg.header.msg_type == usp_msg.Header.DELETE_RESP
+    assert len(deleted_obj_results) == 3
+    assert len(deleted_obj_results[0].oper_status.oper_success.affected_paths) == 3
+    assert deleted_obj_results[1].oper_status.WhichOneof("oper_status") == "oper_failure"
+    assert len(deleted_obj_results[2].oper_status.oper_success.affected_paths) == 0
+    assert my_db.get("Device.Services.HomeAutomation.1.Camera.2.PicNumberOfEntries") == 0
+    my_db._storage.commit.assert_called_once_with()
+
+
+def test_process_add_db_failure_rolls_back():
+    my_db, req_handler = get_request_handler()
+    req_msg = usp_msg.Msg()
+    req_msg.header.msg_id = "ADD-3"
+    req_msg.header.msg_type = usp_msg.Header.ADD
+    create_obj = req_msg.body.request.add.create_objs.add()
+    create_obj.obj_path = "Device.Subscription."
+    create_obj = req_msg.body.request.add.create_objs.add()
+    create_obj.obj_path = "Device.Subscription."
+    db_insert = my_db.insert
+
+    def insert_then_fail(table_path, param_value_dict=None):
+        if my_db.get("Device.SubscriptionNumberOfEntries") > 3:
+            raise agent_db.NoSuchPathError(table_path)
+        return db_insert(table_path, param_value_dict)
+
+    with mock.patch.object(my_db, "insert", side_effect=insert_then_fail):
+        resp_msg = req_handler._process_add(req_msg)
+
+    assert resp_msg.header.msg_type == usp_msg.Header.ERROR
+    assert my_db.get("Device.SubscriptionNumberOfEntries") == 3
+    assert len(my_db.find_instances("Device.Subscription.")) == 3
+
+
+def test_process_delete_db_failure_rolls_back():
+    my_db, req_handler = get_request_handler()
+    req_msg = usp_msg.Msg()
+    req_msg.header.msg_id = "DELETE-2"
+    req_msg.header.msg_type = usp_msg.Header.DELETE
+    req_msg.body.request.delete.obj_paths.extend(["Device.Services.HomeAutomation.1.Camera.2.Pic.*."])
+    db_delete = my_db.delete
+
+    def delete_then_fail(partial_path):
+        if my_db.get("Device.Services.HomeAutomation.1.Camera.2.PicNumberOfEntries") < 3:
+            raise agent_db.NoSuchPathError(partial_path)
+        db_delete(partial_path)
+
+    with mock.patch.object(my_db, "delete", side_effect=delete_then_fail):
+        resp_msg = req_handler._process_delete(req_msg)
+
+    assert resp_msg.header.msg_type == usp_msg.Header.ERROR
+    assert my_db.get("Device.Services.HomeAutomation.1.Camera.2.PicNumberOfEntries") == 3
+    assert len(my_db.find_params("Device.Services.HomeAutomation.1.Camera.2.Pic.*.URL")) == 3
 
-def test_get_affected_paths_for_get_two_layers():
-    endpoint_id = "ENDPOINT-ID"
-    my_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
-    db_mock = mock.mock_open(read_data=get_db_file_contents())
-    my_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
-    partial_path = "Device.Services.HomeAutomation.*.Camera.*.Pic."
 
-    with mock.patch("builtins.open", my_mock):
-        my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
-        req_handler = request_handler.UspRequestHandler(endpoint_id, my_db)
-        affected_path_list = req_handler._get_affected_paths_for_get(partial_path)
+"""
+ Tests for _process_get_instances
+"""
 
-    assert len(affected_path_list) == 2, "expecting 2, found " + str(len(affected_path_list))
+def test_process_get_instances():
+    my_db, req_handler = get_request_handler()
+    req_msg = usp_msg.Msg()
+    req_msg.header.msg_id = "GET-INSTANCES-1"
+    req_msg.header.msg_type = usp_msg.Header.GET_INSTANCES
+    req_msg.body.request.get_instances.obj_paths.extend(["Device.Services.HomeAutomation.",
+                                                         "Device.Services.HomeAutomation.1.Camera.*.",
+                                                         "Device.NoSuchObj."])
+
+    resp_msg = req_handler._process_get_instances(req_msg)
+    req_path_results = resp_msg.body.response.get_instances_resp.req_path_results
+
+    assert resp_msg.header.msg_type == usp_msg.Header.GET_INSTANCES_RESP
+    assert len(req_path_results) == 3
+    assert [curr_inst.instantiated_obj_path for curr_inst in req_path_results[0].curr_insts] == [
+        "Device.Services.HomeAutomation.1.",
+        "Device.Services.HomeAutomation.1.Camera.1.",
+        "Device.Services.HomeAutomation.1.Camera.2.",
+        "Device.Services.HomeAutomation.1.Camera.1.Pic.9.",
+        "Device.Services.HomeAutomation.1.Camera.1.Pic.10.",
+        "Device.Services.HomeAutomation.1.Camera.2.Pic.10.",
+        "Device.Services.HomeAutomation.1.Camera.2.Pic.90.",
+        "Device.Services.HomeAutomation.1.Camera.2.Pic.100."]
+    assert len(req_path_results[1].curr_insts) == 5
+    assert req_path_results[2].err_code == 11002
+
+
+def test_process_get_instances_first_level_only():
+    my_db, req_handler = get_request_handler()
+    req_msg = usp_msg.Msg()
+    req_msg.header.msg_id = "GET-INSTANCES-2"
+    req_msg.header.msg_type = usp_msg.Header.GET_INSTANCES
+    req_msg.body.request.get_instances.first_level_only = True
+    req_msg.body.request.get_instances.obj_paths.extend(["Device.Services.HomeAutomation.1.Camera.",
+                                                         "Device.Services.HomeAutomation.1."])
+
+    resp_msg = req_handler._process_get_instances(req_msg)
+    req_path_results = resp_msg.body.response.get_instances_resp.req_path_results
+
+    assert [curr_inst.instantiated_obj_path for curr_inst in req_path_results[0].curr_insts] == [
+        "Device.Services.HomeAutomation.1.Camera.1.", "Device.Services.HomeAutomation.1.Camera.2."]
+    assert [curr_inst.instantiated_obj_path for curr_inst in req_path_results[1].curr_insts] == [
+        "Device.Services.HomeAutomation.1.Camera.1.", "Device.Services.HomeAutomation.1.Camera.2."]
 
-def test_get_affected_paths_for_get_three_layers():
-    endpoint_id = "ENDPOINT-ID"
-    my_mock = dm_mock = mock.mock_open(read_data=get_dm_file_contents())
-    db_mock = mock.mock_open(read_data=get_db_file_contents())
-    my_mock.side_effect = [dm_mock.return_value, db_mock.return_value]
-    partial_path = "Device.Services.HomeAutomation.*.Camera.*.Pic.*."
 
-    with mock.patch("builtins.open", my_mock):
-        my_db = agent_db.Database("mock_dm.json", "mock_db.json", "intf")
-        req_handler = request_handler.UspRequestHandler(endpoint_id, my_db)
-        affected_path_list = req_handler._get_affected_paths_for_get(partial_path)
+"""
+ Tests for _process_get_supported_dm
+"""
+
+def test_process_get_supported_dm():
+    my_db, req_handler = get_request_handler()
+    req_msg = usp_msg.Msg()
+    req_msg.header.msg_id = "GET-SUPPORTED-DM-1"
+    req_msg.header.msg_type = usp_msg.Header.GET_SUPPORTED_DM
+    req_msg.body.request.get_supported_dm.first_level_only = True
+    req_msg.body.request.get_supported_dm.return_commands = True
+    req_msg.body.request.get_supported_dm.return_params = True
+    req_msg.body.request.get_supported_dm.obj_paths.extend(["Device.Services.HomeAutomation.{i}.",
+                                                            "Device.NoSuchObj."])
+
+    resp_msg = req_handler._process_get_supported_dm(req_msg)
+    req_obj_results = resp_msg.body.response.get_supported_dm_resp.req_obj_results
+    supported_objs = req_obj_results[0].supported_objs
+
+    assert resp_msg.header.msg_type == usp_msg.Header.GET_SUPPORTED_DM_RESP
+    assert [supported_obj.supported_obj_path for supported_obj in supported_objs] == [
+        "Device.Services.HomeAutomation.{i}.", "Device.Services.HomeAutomation.{i}.Camera.{i}."]
+    assert supported_objs[1].access == usp_msg.GetSupportedDMResp.OBJ_ADD_DELETE
+    assert supported_objs[1].is_multi_instance
+    assert [command.command_name for command in supported_objs[1].supported_commands] == ["TakePicture()"]
+    assert {param.param_name: param.access for param in supported_objs[1].supported_params} == {
+        "MaxNumberOfPics": usp_msg.GetSupportedDMResp.PARAM_READ_WRITE,
+        "PicNumberOfEntries": usp_msg.GetSupportedDMResp.PARAM_READ_ONLY}
+    assert req_obj_results[1].err_code == 11002
+
+
+def test_process_get_supported_dm_is_cached():
+    my_db, req_handler = get_request_handler()
+    req_msg = usp_msg.Msg()
+    req_msg.header.msg_id = "GET-SUPPORTED-DM-2"
+    req_msg.header.msg_type = usp_msg.Header.GET_SUPPORTED_DM
+    req_msg.body.request.get_supported_dm.return_params = True
+    req_msg.body.request.get_supported_dm.obj_paths.extend(["Device."])
+
+    with mock.patch.object(my_db.get_supported_dm(), "get_supported_objects",
+                           wraps=my_db.get_supported_dm().get_supported_objects) as get_supported_objects_mock:
+        resp_msg1 = req_handler._process_get_supported_dm(req_msg)
+        resp_msg2 = req_handler._process_get_supported_dm(req_msg)
+        req_msg.body.request.get_supported_dm.return_params = False
+        resp_msg3 = req_handler._process_get_supported_dm(req_msg)
+
+    assert get_supported_objects_mock.call_count == 2
+    assert resp_msg1 == resp_msg2
+    assert resp_msg1 != resp_msg3
+
+
+"""
+ Tests for the GetResp Cache
+"""
+
+def get_get_req_payload(msg_id, param_path_list):
+    req_msg = usp_msg.Msg()
+    req_msg.header.msg_id = msg_id
+    req_msg.header.msg_type = usp_msg.Header.GET
+    req_msg.body.request.get.param_paths.extend(param_path_list)
+
+    req_record = usp_record.Record()
+    req_record.version = "1.0"
+    req_record.to_id = "ENDPOINT-ID"
+    req_record.from_id = "CONTROLLER-ID"
+    req_record.payload_security = usp_record.Record.PLAINTEXT
+    req_record.no_session_context.payload = req_msg.SerializeToString()
+
+    return req_record.SerializeToString()
+
+
+def parse_resp_payload(serialized_resp_record):
+    resp_record = usp_record.Record()
+    resp_record.ParseFromString(serialized_resp_record)
+    resp_msg = usp_msg.Msg()
+    resp_msg.ParseFromString(resp_record.no_session_context.payload)
+
+    return resp_record, resp_msg
+
+
+def test_get_resp_cache_splices_new_header():
+    my_db, _req_handler = get_request_handler()
+    req_handler = request_handler.UspRequestHandler("ENDPOINT-ID", my_db, get_resp_cache=True)
+    param_path_list = ["Device.Subscription.*.ID", "Device.Services.HomeAutomation.1.Camera.1.MaxNumberOfPics"]
+
+    _req, _req_record, _resp, serialized_resp1 = \
+        req_handler.handle_request(get_get_req_payload("GET-1", param_path_list))
+    with mock.patch.object(my_db, "get_resolved_params") as get_resolved_params_mock:
+        _req, _req_record, resp_msg, serialized_resp2 = \
+            req_handler.handle_request(get_get_req_payload("GET-2", param_path_list))
+        get_resolved_params_mock.assert_not_called()
+
+    resp_record1, resp_msg1 = parse_resp_payload(serialized_resp1)
+    resp_record2, resp_msg2 = parse_resp_payload(serialized_resp2)
+
+    assert resp_record2.to_id == "CONTROLLER-ID"
+    assert resp_record2.from_id == "ENDPOINT-ID"
+    assert resp_msg.header.msg_id == "GET-2"
+    assert resp_msg2.header.msg_id == "GET-2"
+    assert resp_msg2.header.msg_type == usp_msg.Header.GET_RESP
+    assert resp_msg2.body == resp_msg1.body
+    assert resp_msg2.body == resp_msg.body
+
+
+def test_get_resp_cache_keeps_request_path_order():
+    my_db, _req_handler = get_request_handler()
+    req_handler = request_handler.UspRequestHandler("ENDPOINT-ID", my_db, get_resp_cache=True)
+    param_path_list = ["Device.Subscription.*.ID", "Device.Services.HomeAutomation.1.Camera.1.MaxNumberOfPics"]
+
+    req_handler.handle_request(get_get_req_payload("GET-1", param_path_list))
+    _req, _req_record, resp_msg, serialized_resp = \
+        req_handler.handle_request(get_get_req_payload("GET-2", list(reversed(param_path_list))))
+
+    _resp_record, serialized_resp_msg = parse_resp_payload(serialized_resp)
+    for msg in [resp_msg, serialized_resp_msg]:
+        req_path_results = msg.body.response.get_resp.req_path_results
+        assert [result.requested_path for result in req_path_results] == list(reversed(param_path_list))
+
+
+def test_get_resp_cache_invalidated_by_update():
+    my_db, _req_handler = get_request_handler()
+    req_handler = request_handler.UspRequestHandler("ENDPOINT-ID", my_db, get_resp_cache=True)
+    param_path_list = ["Device.Subscription.1.NotifType"]
+
+    req_handler.handle_request(get_get_req_payload("GET-1", param_path_list))
+    my_db.update("Device.Subscription.1.NotifType", "ValueChange")
+    _req, _req_record, _resp, serialized_resp = \
+        req_handler.handle_request(get_get_req_payload("GET-2", param_path_list))
+
+    _resp_record, resp_msg = parse_resp_payload(serialized_resp)
+    resolved_path_result = resp_msg.body.response.get_resp.req_path_results[0].resolved_path_results[0]
+    assert resolved_path_result.result_params["NotifType"] == "ValueChange"
+
+
+def test_get_resp_cache_skips_dynamic_values():
+    my_db, _req_handler = get_request_handler()
+    req_handler = request_handler.UspRequestHandler("ENDPOINT-ID", my_db, get_resp_cache=True)
+
+    req_handler.handle_request(get_get_req_payload("GET-1", ["Device.SubscriptionNumberOfEntries"]))
+    req_handler.handle_request(get_get_req_payload("GET-2", ["Device.NoSuchObject.Param"]))
 
-    assert len(affected_path_list) == 5, "expecting 5, found " + str(len(affected_path_list))
+    assert req_handler._get_resp_cache == {}
@@ -0,0 +1,219 @@
+# Copyright (c) 2016 John Blackford
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+#
+# File Name: test_stomp_usp_binding.py
+#
+# Description: Unit tests for the stomp_usp_binding
+#
+# Functionality: Test the StompUspBinding Class's connection retries and outgoing messages
+#  - The STOMP Connection is mocked, but the exceptions are stomp.py's own
+#
+"""
+
+import time
+import queue
+import unittest
+import unittest.mock as mock
+
+try:
+    import stomp.exception
+    from agent import stomp_usp_binding
+    from agent import generic_usp_binding
+except ImportError:
+    raise unittest.SkipTest("stomp.py is not installed")
+
+
+def get_binding(status_list, **kwargs):
+    binding = stomp_usp_binding.StompUspBinding("ENDPOINT-ID", reconnect_initial_interval=0.01,
+                                                reconnect_max_interval=0.02, status_callback=status_list.append,
+                                                **kwargs)
+    binding._conn = mock.MagicMock()
+    binding._conn.is_connected.return_value = True
+
+    return binding
+
+
+def connect_and_clean_up(binding):
+    binding.start_connecting()
+    binding._connect_thread.join(5)
+    is_connected = binding.is_connected()
+    binding.clean_up()
+
+    return is_connected
+
+
+def test_start_failure_is_retried_without_stopping():
+    status_list = []
+    binding = get_binding(status_list)
+    binding._conn.start.side_effect = [stomp.exception.ConnectFailedException(), ConnectionRefusedError(), None]
+
+    assert connect_and_clean_up(binding)
+    assert binding._conn.start.call_count == 3
+    assert binding._conn.connect.call_count == 1
+    binding._conn.stop.assert_not_called()
+    assert status_list == ["Connecting", "Enabled"]
+
+
+def test_connect_failure_closes_socket_and_is_retried():
+    status_list = []
+    binding = get_binding(status_list)
+    binding._conn.connect.side_effect = [stomp.exception.ConnectFailedException(), None]
+
+    assert connect_and_clean_up(binding)
+    assert binding._conn.start.call_count == 2
+    assert binding._conn.transport.disconnect_socket.call_count == 1
+    assert binding._conn.stop.call_count == 1
+    assert status_list == ["Connecting", "Enabled"]
+
+
+def test_clean_up_never_started_does_not_stop():
+    binding = get_binding([])
+    binding.clean_up()
+
+    binding._conn.stop.assert_not_called()
+
+
+def test_send_batch_acks_are_not_buffered():
+    binding = get_binding([])
+    binding._is_connected = True
+    binding._conn_generation = 1
+    msg_batch = [(None, None, 0, (1, "ACK-1")), (b"MSG-1", "/queue/ctrl", 0, None), (None, None, 0, (1, "ACK-2"))]
+
+    binding.send_batch(msg_batch)
+    binding.clean_up()
+
+    assert len(binding._outage_buffer) == 0
+    assert [call[0][0] for call in binding._conn.ack.call_args_list] == ["ACK-1", "ACK-2"]
+    assert binding._conn.send.call_count == 1
+
+
+def get_sent_payloads(binding):
+    return [call[0][1] for call in binding._conn.send.call_args_list]
+
+
+def test_sending_thread_sends_in_batches():
+    binding = mock.MagicMock()
+    send_queue = queue.Queue()
+    for index in range(5):
+        send_queue.put(("MSG-" + str(index), "/queue/ctrl", 0, None))
+    send_queue.put(None)
+
+    stomp_usp_binding.StompSendingThread(binding, send_queue, batch_size=2).run()
+
+    msg_batch_list = [call[0][0] for call in binding.send_batch.call_args_list]
+    assert [len(msg_batch) for msg_batch in msg_batch_list] == [2, 2, 1]
+    assert [item[0] for msg_batch in msg_batch_list for item in msg_batch] == ["MSG-0", "MSG-1", "MSG-2",
+                                                                                "MSG-3", "MSG-4"]
+
+
+def test_send_msg_written_by_sending_thread():
+    binding = get_binding([])
+    binding._is_connected = True
+
+    assert binding.send_msg(b"MSG-1", "/queue/ctrl")
+    binding.clean_up()
+
+    assert get_sent_payloads(binding) == [b"MSG-1"]
+
+
+def test_receipt_tracked_until_received():
+    binding = get_binding([], use_receipts=True)
+    binding._is_connected = True
+
+    binding.send_batch([(b"MSG-1", "/queue/ctrl", 0, None)])
+    receipt_id = binding._conn.send.call_args[0][3]["receipt"]
+    assert list(binding._pending_receipt_dict) == [receipt_id]
+
+    binding.handle_receipt(receipt_id)
+    binding.clean_up()
+
+    assert len(binding._pending_receipt_dict) == 0
+
+
+def test_receipt_given_up_after_timeout():
+    binding = get_binding([], use_receipts=True, receipt_timeout=30)
+    binding._is_connected = True
+
+    binding.send_batch([(b"MSG-1", "/queue/ctrl", 0, None)])
+    with mock.patch("time.time", return_value=time.time() + 60):
+        binding.send_batch([(b"MSG-2", "/queue/ctrl", 0, None)])
+    binding.clean_up()
+
+    assert [pending_msg[0] for pending_msg in binding._pending_receipt_dict.values()] == [b"MSG-2"]
+
+
+def test_unreceipted_msgs_resent_after_reconnect():
+    status_list = []
+    binding = get_binding(status_list, use_receipts=True)
+    binding._is_connected = True
+
+    binding.send_batch([(b"MSG-1", "/queue/ctrl", 0, None), (b"MSG-2", "/queue/ctrl", 0, None)])
+    binding.handle_receipt(binding._conn.send.call_args_list[0][0][3]["receipt"])
+    binding.handle_disconnect()
+    binding._connect_thread.join(5)
+    binding.clean_up()
+
+    assert get_sent_payloads(binding) == [b"MSG-1", b"MSG-2", b"MSG-2"]
+    assert status_list == ["Error", "Connecting", "Enabled"]
+
+
+def test_outage_buffer_flushed_on_connect():
+    binding = get_binding([])
+
+    binding.send_batch([(b"MSG-1", "/queue/ctrl", 0, None), (b"MSG-2", "/queue/ctrl", 0, None)])
+    assert binding._conn.send.call_count == 0
+    assert len(binding._outage_buffer) == 2
+
+    assert connect_and_clean_up(binding)
+    assert get_sent_payloads(binding) == [b"MSG-1", b"MSG-2"]
+    assert len(binding._outage_buffer) == 0
+
+
+def test_prefetch_count_clamped_to_queue_size():
+    for prefetch_count in [0, 50]:
+        binding = get_binding([], max_queue_size=10, prefetch_count=prefetch_count)
+        binding._is_connected = True
+        binding.listen("/queue/agent")
+        binding.clean_up()
+
+        subscribe_headers = binding._conn.subscribe.call_args[1]["headers"]
+        assert subscribe_headers["prefetch-count"] == "10"
+
+
+def test_ack_msg_does_not_block():
+    binding = get_binding([], send_queue_size=1)
+    queue_item = generic_usp_binding.ExpiringQueueItem(b"REQ", "/queue/ctrl", ack_id=(1, "ACK-1"))
+    binding._send_queue.put(None)
+    binding._sending_thread.join(5)
+    binding._send_queue.put((b"MSG-1", "/queue/ctrl", 0, None))
+
+    # The outgoing message queue stays full
+    with mock.patch.object(stomp_usp_binding, "ACK_QUEUE_TIMEOUT", 0.01):
+        binding.ack_msg(queue_item)
+    assert binding._send_queue.get_nowait()[0] == b"MSG-1"
+
+    # The Binding is closing (and its sending thread has stopped)
+    binding.clean_up()
+    binding.ack_msg(queue_item)
+
+    assert binding._send_queue.get_nowait() is None
+    assert binding._send_queue.empty()
@@ -0,0 +1,127 @@
+"""
+Copyright (c) 2016 John Blackford
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+# File Name: test_supported_dm.py
+#
+# Description: Unit tests for the SupportedDataModel Class
+#
+"""
+
+from agent import supported_dm
+
+
+def get_dm_contents():
+    return {
+        "Device.LocalAgent.EndpointID": "readOnly",
+        "Device.LocalAgent.MTPNumberOfEntries": "readOnly",
+        "Device.LocalAgent.MTP.{i}.Enable": "readWrite",
+        "Device.LocalAgent.MTP.{i}.CoAP.Port": "readWrite",
+        "Device.LocalAgent.Controller.{i}.EndpointID": "readWrite",
+        "Device.LocalAgent.Controller.{i}.MTP.{i}.Protocol": "readWrite"
+    }
+
+
+def test_get_generic_path():
+    schema = supported_dm.SupportedDataModel(get_dm_contents())
+
+    assert schema.get_generic_path("Device.LocalAgent.MTP.1.Enable") == "Device.LocalAgent.MTP.{i}.Enable"
+    assert schema.get_generic_path("Device.LocalAgent.MTP.*.") == "Device.LocalAgent.MTP.{i}."
+    assert schema.get_generic_path("Device.LocalAgent.Controller.2.MTP.10.") == \
+        "Device.LocalAgent.Controller.{i}.MTP.{i}."
+
+
+def test_is_implemented():
+    schema = supported_dm.SupportedDataModel(get_dm_contents())
+
+    assert schema.is_implemented("Device.")
+    assert schema.is_implemented("Device.LocalAgent.MTP.3.CoAP.")
+    assert schema.is_implemented("Device.LocalAgent.Controller.*.MTP.*.Protocol")
+    assert not schema.is_implemented("Device.LocalAgent.MTP.1.CoAP")
+    assert not schema.is_implemented("Device.LocalAgent.Endpoint")
+    assert not schema.is_implemented("Device.NoSuchObject.")
+
+
+def test_param_access():
+    schema = supported_dm.SupportedDataModel(get_dm_contents())
+
+    assert schema.get_param_access("Device.LocalAgent.EndpointID") == "readOnly"
+    assert schema.get_param_access("Device.LocalAgent.NoSuchParam") is None
+    assert schema.is_param_writable("Device.LocalAgent.MTP.2.Enable")
+    assert not schema.is_param_writable("Device.LocalAgent.MTPNumberOfEntries")
+
+
+def test_multi_instance():
+    schema = supported_dm.SupportedDataModel(get_dm_contents())
+
+    assert schema.is_table("Device.LocalAgent.MTP.")
+    assert schema.is_table("Device.LocalAgent.Controller.1.MTP.")
+    assert not schema.is_table("Device.LocalAgent.")
+    assert not schema.is_table("Device.LocalAgent.MTP.1.CoAP.")
+    assert schema.is_multi_instance("Device.LocalAgent.MTP.1.")
+    assert not schema.is_multi_instance("Device.LocalAgent.MTP.")
+    assert schema.is_object("Device.LocalAgent.MTP.")
+
+
+def test_child_and_param_objects():
+    schema = supported_dm.SupportedDataModel(get_dm_contents())
+
+    assert schema.get_child_objects("Device.LocalAgent.") == ["Device.LocalAgent.MTP.", "Device.LocalAgent.Controller."]
+    assert schema.get_child_objects("Device.LocalAgent.MTP.1.") == ["Device.LocalAgent.MTP.{i}.CoAP."]
+    assert schema.get_param_objects("Device.LocalAgent.") == [
+        "Device.LocalAgent.MTP.{i}.", "Device.LocalAgent.MTP.{i}.CoAP.",
+        "Device.LocalAgent.Controller.{i}.", "Device.LocalAgent.Controller.{i}.MTP.{i}."]
+
+
+def test_instance_params_and_defaults():
+    dm_contents = get_dm_contents()
+    dm_contents["Device.LocalAgent.Controller.{i}.Enable"] = {"access": "readWrite", "default": False}
+    dm_contents["Device.LocalAgent.Controller.{i}.MTPNumberOfEntries"] = "readOnly"
+    dm_contents["Device.LocalAgent.Controller.{i}.Reboot()"] = "readWrite"
+    schema = supported_dm.SupportedDataModel(dm_contents)
+
+    assert schema.get_instance_param_names("Device.LocalAgent.MTP.") == ["Enable", "CoAP.Port"]
+    assert schema.get_instance_param_names("Device.LocalAgent.Controller.") == [
+        "EndpointID", "Enable", "MTPNumberOfEntries"]
+    assert schema.is_param_writable("Device.LocalAgent.Controller.1.Enable")
+    assert schema.get_default_value("Device.LocalAgent.Controller.1.Enable") is False
+    assert schema.get_default_value("Device.LocalAgent.Controller.1.MTPNumberOfEntries") == "__NUM_ENTRIES__"
+    assert schema.get_default_value("Device.LocalAgent.Controller.1.EndpointID") == ""
+
+
+def test_supported_objects():
+    dm_contents = get_dm_contents()
+    dm_contents["Device.LocalAgent.MTP.{i}.Reset()"] = "readWrite"
+    dm_contents["Device.LocalAgent.Boot!"] = "readOnly"
+    schema = supported_dm.SupportedDataModel(dm_contents)
+
+    supported_obj_list = schema.get_supported_objects("Device.LocalAgent.", True)
+    all_supported_obj_list = schema.get_supported_objects("Device.LocalAgent.MTP.")
+
+    assert [supported_obj.obj_path for supported_obj in supported_obj_list] == [
+        "Device.LocalAgent.", "Device.LocalAgent.MTP.{i}.", "Device.LocalAgent.Controller.{i}."]
+    assert supported_obj_list[0].event_list == ["Boot!"]
+    assert not supported_obj_list[0].is_multi_instance
+    assert supported_obj_list[1].is_multi_instance
+    assert supported_obj_list[1].command_list == ["Reset()"]
+    assert supported_obj_list[1].param_access_dict == {"Enable": "readWrite"}
+    assert [supported_obj.obj_path for supported_obj in all_supported_obj_list] == [
+        "Device.LocalAgent.MTP.{i}.", "Device.LocalAgent.MTP.{i}.CoAP."]
+    assert schema.get_supported_objects("Device.NoSuchObj.") is None
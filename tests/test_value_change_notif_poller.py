@@ -0,0 +1,137 @@
+# Copyright (c) 2016 John Blackford
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+#
+# File Name: test_value_change_notif_poller.py
+#
+# Description: Unit tests for the event-driven ValueChange Notification Poller
+#
+# Functionality: Test the AbstractValueChangeNotifPoller Class
+#
+"""
+
+import unittest.mock as mock
+
+from agent import agent_db
+from agent import abstract_agent
+
+
+
+class RecordingValueChangeNotifPoller(abstract_agent.AbstractValueChangeNotifPoller):
+    def __init__(self, database):
+        abstract_agent.AbstractValueChangeNotifPoller.__init__(self, database)
+        self.value_change_list = []
+
+    def _handle_value_change(self, param, value, to_id, from_id, subscription_id, mtp_param_path):
+        self.value_change_list.append((param, value, to_id, subscription_id))
+
+
+def get_db_mock(value_dict, dynamic_param_list=()):
+    def get_value(param):
+        if param not in value_dict:
+            raise agent_db.NoSuchPathError(param)
+        return value_dict[param]
+
+    db_mock = mock.MagicMock()
+    db_mock.get.side_effect = get_value
+    db_mock.has_dynamic_values.side_effect = lambda param: param in dynamic_param_list
+    return db_mock
+
+
+def test_registers_change_listener_when_run():
+    value_dict = {"Device.Time.NTPServer1": "ntp1.zzz.com"}
+    db_mock = get_db_mock(value_dict)
+    poller = RecordingValueChangeNotifPoller(db_mock)
+    poller.add_param("Device.Time.NTPServer1", "AGENT", "CTRL", "MTP", "SUB1")
+
+    db_mock.add_change_listener.assert_not_called()
+
+    # A change made before the thread runs is caught by its first check
+    value_dict["Device.Time.NTPServer1"] = "ntp1.yyy.com"
+    with mock.patch.object(poller, "_wait_for_changes", side_effect=StopIteration):
+        try:
+            poller.run()
+        except StopIteration:
+            pass
+
+    db_mock.add_change_listener.assert_called_once_with(poller._queue_subscribed_changes)
+    assert poller.value_change_list == [("Device.Time.NTPServer1", "ntp1.yyy.com", "CTRL", "SUB1")]
+
+
+def test_only_subscribed_changes_queued():
+    poller = RecordingValueChangeNotifPoller(get_db_mock({"Device.Time.NTPServer1": "ntp1.zzz.com"}))
+    poller.add_param("Device.Time.NTPServer1", "AGENT", "CTRL", "MTP", "SUB1")
+    poller._wait_for_changes(0)
+
+    poller._queue_subscribed_changes(["Device.Time.NTPServer2", "Device.Time.NTPServer3"])
+    poller._queue_subscribed_changes(["Device.Time.NTPServer1", "Device.Time.NTPServer2"])
+
+    assert poller._changed_param_queue.qsize() == 1
+    assert poller._wait_for_changes(0) == {"Device.Time.NTPServer1"}
+
+
+def test_change_event_sends_value_change():
+    value_dict = {"Device.Time.NTPServer1": "ntp1.zzz.com", "Device.Time.NTPServer2": "ntp2.zzz.com"}
+    poller = RecordingValueChangeNotifPoller(get_db_mock(value_dict))
+    poller.add_param("Device.Time.NTPServer1", "AGENT", "CTRL", "MTP", "SUB1")
+
+    value_dict["Device.Time.NTPServer1"] = "ntp1.yyy.com"
+    value_dict["Device.Time.NTPServer2"] = "ntp2.yyy.com"
+    poller._queue_subscribed_changes(["Device.Time.NTPServer1", "Device.Time.NTPServer2"])
+    poller._check_value_changes(poller._wait_for_changes(0))
+
+    assert poller.value_change_list == [("Device.Time.NTPServer1", "ntp1.yyy.com", "CTRL", "SUB1")]
+    assert poller._param_poll_list == []
+
+
+def test_unchanged_value_not_sent():
+    value_dict = {"Device.Time.NTPServer1": "ntp1.zzz.com"}
+    poller = RecordingValueChangeNotifPoller(get_db_mock(value_dict))
+    poller.add_param("Device.Time.NTPServer1", "AGENT", "CTRL", "MTP", "SUB1")
+
+    poller._check_value_changes({"Device.Time.NTPServer1"})
+
+    assert poller.value_change_list == []
+
+
+def test_deleted_param_not_sent():
+    value_dict = {"Device.Time.NTPServer1": "ntp1.zzz.com"}
+    poller = RecordingValueChangeNotifPoller(get_db_mock(value_dict))
+    poller.add_param("Device.Time.NTPServer1", "AGENT", "CTRL", "MTP", "SUB1")
+
+    del value_dict["Device.Time.NTPServer1"]
+    poller._check_value_changes({"Device.Time.NTPServer1"})
+
+    assert poller.value_change_list == []
+
+
+def test_dynamic_param_polled():
+    value_dict = {"Device.LocalAgent.UpTime": 10, "Device.Time.NTPServer1": "ntp1.zzz.com"}
+    db_mock = get_db_mock(value_dict, ["Device.LocalAgent.UpTime"])
+    poller = RecordingValueChangeNotifPoller(db_mock)
+    poller.add_param("Device.LocalAgent.UpTime", "AGENT", "CTRL", "MTP", "SUB1")
+    poller.add_param("Device.Time.NTPServer1", "AGENT", "CTRL", "MTP", "SUB2")
+
+    assert poller._param_poll_list == ["Device.LocalAgent.UpTime"]
+
+    poller.remove_param("Device.LocalAgent.UpTime")
+
+    assert poller._param_poll_list == []
@@ -0,0 +1,78 @@
+"""
+Copyright (c) 2016 John Blackford
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+# File Name: test_value_provider.py
+#
+# Description: Unit tests for the ValueProvider and ValueProviderRegistry Classes
+#
+"""
+
+import unittest.mock as mock
+
+from agent import value_provider
+
+
+def test_no_ttl_is_cached_until_invalidated():
+    value_func = mock.Mock(side_effect=[1, 2])
+    provider = value_provider.ValueProvider(value_func)
+
+    get_value1 = provider.get_value("Device.A")
+    get_value2 = provider.get_value("Device.A")
+    provider.invalidate("Device.A")
+    get_value3 = provider.get_value("Device.A")
+
+    assert get_value1 == 1
+    assert get_value2 == 1
+    assert get_value3 == 2
+    assert value_func.call_count == 2
+
+
+def test_zero_ttl_is_never_cached():
+    value_func = mock.Mock(side_effect=[1, 2])
+    provider = value_provider.ValueProvider(value_func, ttl=0)
+
+    assert provider.get_value("Device.A") == 1
+    assert provider.get_value("Device.A") == 2
+
+
+def test_ttl_expires():
+    time_mock = mock.Mock(side_effect=[100, 130, 170, 170])
+    value_func = mock.Mock(side_effect=[1, 2])
+    provider = value_provider.ValueProvider(value_func, ttl=60)
+
+    with mock.patch("time.time", time_mock):
+        get_value1 = provider.get_value("Device.A")
+        get_value2 = provider.get_value("Device.A")
+        get_value3 = provider.get_value("Device.A")
+
+    assert get_value1 == 1
+    assert get_value2 == 1
+    assert get_value3 == 2
+
+
+def test_registry_only_provides_registered_sentinels():
+    registry = value_provider.ValueProviderRegistry()
+    registry.register("__TEST__", value_provider.ValueProvider(lambda path: path + " value", ttl=0))
+
+    assert registry.is_provided("__TEST__")
+    assert not registry.is_provided("__OTHER__")
+    assert not registry.is_provided(42)
+    assert registry.get_value("__TEST__", "Device.A") == "Device.A value"
@@ -0,0 +1,112 @@
+"""
+Copyright (c) 2016 John Blackford
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+# File Name: test_write_ahead_log.py
+#
+# Description: Unit tests for the WriteAheadLog Class
+#
+"""
+
+import os
+import json
+import tempfile
+
+from agent import write_ahead_log
+
+
+def test_append_and_replay():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_filename = os.path.join(tmp_dir, "db.json")
+        wal = write_ahead_log.WriteAheadLog(db_filename)
+        wal.append({"Device.A": 1, "Device.B": "x"}, [])
+        wal.append({"Device.A": 2}, ["Device.B"])
+        wal.close()
+
+        db_dict = {"Device.B": "y", "Device.C": True}
+        num_applied = write_ahead_log.WriteAheadLog(db_filename).replay(db_dict)
+
+    assert num_applied == 2
+    assert db_dict == {"Device.A": 2, "Device.C": True}
+
+
+def test_replay_discards_partial_transaction():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_filename = os.path.join(tmp_dir, "db.json")
+        with open(db_filename + ".wal", "w") as log_file:
+            log_file.write(json.dumps({"set": {"Device.A": 1}}) + "\n")
+            log_file.write("{\"set\": {\"Device.A\": ")
+
+        db_dict = {}
+        num_applied = write_ahead_log.WriteAheadLog(db_filename).replay(db_dict)
+
+    assert num_applied == 1
+    assert db_dict == {"Device.A": 1}
+
+
+def test_replay_truncates_partial_transaction():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_filename = os.path.join(tmp_dir, "db.json")
+        with open(db_filename + ".wal", "w") as log_file:
+            log_file.write("{\"set\": {\"Device.A\": 2")
+
+        # Restart after the torn write, then log more transactions
+        db_dict1 = {}
+        wal = write_ahead_log.WriteAheadLog(db_filename)
+        num_applied1 = wal.replay(db_dict1)
+        wal.append({"Device.A": 3}, [])
+        wal.append({"Device.B": 4}, [])
+        wal.close()
+
+        # Restart again, every transaction logged after the torn write must survive
+        db_dict2 = {}
+        num_applied2 = write_ahead_log.WriteAheadLog(db_filename).replay(db_dict2)
+
+    assert num_applied1 == 0
+    assert db_dict1 == {}
+    assert num_applied2 == 2
+    assert db_dict2 == {"Device.A": 3, "Device.B": 4}
+
+
+def test_replay_without_log():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_dict = {"Device.A": 1}
+        num_applied = write_ahead_log.WriteAheadLog(os.path.join(tmp_dir, "db.json")).replay(db_dict)
+
+    assert num_applied == 0
+    assert db_dict == {"Device.A": 1}
+
+
+def test_compact_threshold():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_filename = os.path.join(tmp_dir, "db.json")
+        wal = write_ahead_log.WriteAheadLog(db_filename, write_ahead_log.FSYNC_NEVER, compact_threshold=2)
+        should_compact1 = wal.append({"Device.A": 1}, [])
+        should_compact2 = wal.append({"Device.A": 2}, [])
+        wal.compact({"Device.A": 2})
+        wal.close()
+
+        with open(db_filename, "r") as db_file:
+            db_contents = json.load(db_file)
+        log_size = os.path.getsize(db_filename + ".wal")
+
+    assert not should_compact1
+    assert should_compact2
+    assert db_contents == {"Device.A": 2}
+    assert log_size == 0